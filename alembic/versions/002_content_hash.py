@@ -0,0 +1,27 @@
+"""Content hash and processor version on documents
+
+Revision ID: 002_content_hash
+Revises: 001_initial
+Create Date: 2024-02-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002_content_hash'
+down_revision = '001_initial'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('documents', sa.Column('processor_version', sa.String(length=32), nullable=True))
+    op.create_index('ix_documents_tenant_content_hash', 'documents', ['tenant_id', 'content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_documents_tenant_content_hash', table_name='documents')
+    op.drop_column('documents', 'processor_version')
+    op.drop_column('documents', 'content_hash')
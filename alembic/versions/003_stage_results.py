@@ -0,0 +1,23 @@
+"""Versioned stage results on documents
+
+Revision ID: 003_stage_results
+Revises: 002_content_hash
+Create Date: 2024-03-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003_stage_results'
+down_revision = '002_content_hash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('stage_results', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('documents', 'stage_results')
@@ -13,9 +13,11 @@ from app.database import get_db
 from app.api.dependencies import get_current_active_user
 from app.models.user import User
 from app.models.document import DocumentStatus
-from app.schemas.document import DocumentResponse, DocumentListResponse
+from app.schemas.document import DocumentResponse, DocumentListResponse, DocumentPage, DocumentTextResponse
 from app.services.document_service import DocumentService
+from app.services.lanes import classify
 from app.services.queue_service import QueueService
+from app.services.text_store import TextStore, TextStoreError
 from app.config import settings
 from app.middleware.rate_limit import limiter
 
@@ -42,9 +44,10 @@ def upload_document(
         user_id=current_user.id
     )
     
-    # Enqueue processing job
+    # Enqueue processing job, in the express lane unless the document is large
     try:
-        QueueService.enqueue_document_processing(document.id, current_user.tenant_id)
+        lane = classify(document.file_size, document.file_path, document.mime_type)
+        QueueService.enqueue_document_processing(document.id, current_user.tenant_id, lane=lane)
     except Exception as e:
         # If queue fails, mark document as failed
         DocumentService.update_document_status(
@@ -156,10 +159,56 @@ def download_document(
     )
 
 
+@router.get("/{document_id}/text", response_model=DocumentTextResponse)
+@limiter.limit(f"{settings.rate_limit_per_minute}/minute")
+def get_document_text(
+    request: Request,
+    document_id: int,
+    start_page: int = Query(1, ge=1, description="First page (1-indexed)"),
+    end_page: int | None = Query(None, ge=1, description="Last page, inclusive; defaults to the last page"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the full extracted text of a document, page by page (tenant-isolated).
+    The text is read from the text store, never extracted again.
+    """
+    document = DocumentService.get_document_by_id(
+        db=db,
+        document_id=document_id,
+        tenant_id=current_user.tenant_id
+    )
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    try:
+        page_count = TextStore.page_count(current_user.tenant_id, document_id)
+        last_page = min(end_page or page_count, page_count)
+        texts = list(TextStore.iter_pages(current_user.tenant_id, document_id, start_page - 1, last_page))
+    except TextStoreError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Extracted text not available"
+        )
+    
+    return DocumentTextResponse(
+        document_id=document_id,
+        page_count=page_count,
+        start_page=start_page,
+        end_page=max(last_page, start_page - 1),
+        pages=[DocumentPage(page_number=start_page + offset, text=text) for offset, text in enumerate(texts)]
+    )
+
+
 @router.get("/export/json")
 @limiter.limit(f"{settings.rate_limit_per_minute}/minute")
 def export_documents_json(
     request: Request,
+    include_text: bool = Query(False, description="Include the full extracted text of each page"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -189,6 +238,11 @@ def export_documents_json(
             "processed_at": doc.processed_at.isoformat() if doc.processed_at else None,
             "extracted_metadata": doc.extracted_metadata if isinstance(doc.extracted_metadata, dict) else json.loads(doc.extracted_metadata) if doc.extracted_metadata else None
         }
+        if include_text:
+            try:
+                doc_dict["pages"] = list(TextStore.iter_pages(current_user.tenant_id, doc.id))
+            except TextStoreError:
+                doc_dict["pages"] = None
         export_data.append(doc_dict)
     
     return Response(
@@ -2,7 +2,7 @@
 Application configuration using Pydantic settings.
 """
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -26,12 +26,63 @@ class Settings(BaseSettings):
     # Redis
     redis_url: str
     redis_queue_name: str = "document_processing"
+    redis_backfill_queue_name: str = "document_backfill"  # Reprocessing jobs, taken only when the main queue is empty
+    redis_bulk_queue_name: str = "document_bulk"  # Large documents; redis_queue_name is the express lane
+    queue_backend: str = "rq"  # rq, or redis_streams for acknowledged jobs that survive a worker dying mid-job
+    queue_visibility_timeout_seconds: int = 60  # redis_streams: a claim not extended for this long is taken over
+    queue_max_deliveries: int = 3  # redis_streams: a job delivered this many times without finishing fails
+    tenant_queue_weights: Dict[str, float] = {}  # Share of the workers per tenant id, e.g. {"7": 2}; others weigh 1
     
     # JWT
     jwt_secret_key: str
     jwt_algorithm: str = "HS256"
     jwt_access_token_expire_minutes: int = 30
     
+    # Worker
+    worker_warm_mode: bool = True  # Reuse one processor per worker process instead of forking per job
+    worker_batch_size: int = 1  # Documents taken per micro-batch; NER for a batch runs in one nlp.pipe call
+    worker_batch_max_wait_ms: int = 200  # How long a batch waits to fill up once its first job arrived
+    worker_metrics_port: int = 0  # Serve Prometheus /metrics from the worker on this port; 0 = off
+    worker_processes: int = 0  # Pre-forked worker processes; 0 = one per CPU, 1 = one worker in the main process
+    worker_max_jobs: int = 1000  # A pool worker is replaced after this many jobs; 0 = never
+    worker_max_memory_mb: int = 2048  # A pool worker is replaced once its resident memory passes this; 0 = no limit
+    worker_shutdown_timeout_seconds: float = 600  # Pool workers still busy this long after SIGTERM are killed
+    worker_express_processes: int = 1  # Pool workers serving only the express lane; at least one worker serves bulk
+    
+    # Express and bulk lanes (a document over either limit goes to the bulk lane)
+    express_max_bytes: int = 5 * 1024 * 1024
+    express_max_pages: int = 20  # Counted at upload for PDFs and TIFFs
+    express_job_timeout_seconds: int = 600  # Raised to the stage budgets plus overhead if below
+    bulk_job_timeout_seconds: int = 3600
+    
+    # PDF extraction
+    pdf_parallel_page_threshold: int = 40  # Fan out across processes from this many pages
+    pdf_parallel_workers: int = 0  # 0 = one process per CPU, divided among pool workers
+    pdf_parallel_range_pages: int = 8  # Pages per task sent to a process
+    pdf_ocr_dpi: int = 300  # Resolution scanned PDF pages are rendered at for OCR
+    
+    # OCR
+    ocr_target_dpi: int = 300  # Scans above this resolution are downscaled to it before OCR
+    ocr_tile_rows: int = 2400  # Taller images are cut into tiles of about this many rows, OCRed in parallel
+    ocr_workers: int = 0  # Processes OCRing frames and tiles; 0 = one per CPU, divided among pool workers
+    
+    # Text files
+    text_chunk_chars: int = 4 * 1024 * 1024  # Longer text files and stored pages are read in chunks of at most this size
+    
+    # Language detection
+    language_sample_windows: int = 5  # Windows sampled across the document that vote on the language
+    language_window_chars: int = 300
+    language_seed: int = 0  # Seed for langdetect, so the same text always gets the same language
+    
+    # Stage time budgets in seconds (0 = none); a stage over budget is skipped and partial metadata saved
+    stage_budget_extraction_seconds: float = 300
+    stage_budget_language_seconds: float = 15
+    stage_budget_ner_seconds: float = 60
+    
+    # Backfill (reprocessing documents after a stage version changed)
+    backfill_rate_per_second: float = 2.0  # Reprocessing jobs enqueued per second
+    backfill_max_queue_depth: int = 100  # Pause enqueueing while this many backfill jobs are waiting
+    
     # File Storage
     storage_type: str = "local"
     storage_path: str = "/app/storage"
@@ -1,7 +1,7 @@
 """
 Document model for storing document metadata and processing status.
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -23,6 +23,10 @@ class Document(Base):
     Documents are tenant-isolated.
     """
     __tablename__ = "documents"
+    __table_args__ = (
+        # Finds an already processed copy of the same file within a tenant
+        Index("ix_documents_tenant_content_hash", "tenant_id", "content_hash"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(255), nullable=False)
@@ -30,11 +34,18 @@ class Document(Base):
     file_path = Column(String(512), nullable=False)
     file_size = Column(Integer, nullable=False)  # Size in bytes
     mime_type = Column(String(100), nullable=True)
+    content_hash = Column(String(64), nullable=True)  # SHA-256 of the stored file
     status = Column(Enum(DocumentStatus), default=DocumentStatus.PENDING, nullable=False, index=True)
     
     # Extracted metadata (stored as JSON)
     extracted_metadata = Column(JSON, nullable=True)
     
+    # Processor version that produced extracted_metadata
+    processor_version = Column(String(32), nullable=True)
+    
+    # Versioned result of each processing stage, so reprocessing can rerun only stale stages
+    stage_results = Column(JSON, nullable=True)
+    
     # Error information if processing failed
     error_message = Column(Text, nullable=True)
     
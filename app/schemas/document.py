@@ -2,7 +2,7 @@
 Document-related Pydantic schemas.
 """
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 from app.models.document import DocumentStatus
@@ -22,6 +22,7 @@ class DocumentResponse(BaseModel):
     original_filename: str
     file_size: int
     mime_type: Optional[str]
+    content_hash: Optional[str] = None
     status: DocumentStatus
     extracted_metadata: Optional[Dict[str, Any]]
     error_message: Optional[str]
@@ -44,6 +45,21 @@ class DocumentListResponse(BaseModel):
     total_pages: int
 
 
+class DocumentPage(BaseModel):
+    """Extracted text of one page."""
+    page_number: int
+    text: str
+
+
+class DocumentTextResponse(BaseModel):
+    """Schema for a page range of a document's extracted text."""
+    document_id: int
+    page_count: int
+    start_page: int
+    end_page: int
+    pages: List[DocumentPage]
+
+
 class DocumentQueryParams(BaseModel):
     """Schema for document query parameters."""
     status: Optional[DocumentStatus] = None
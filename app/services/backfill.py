@@ -0,0 +1,108 @@
+"""
+Tenant-wide backfill: reprocess documents whose stage results are out of date.
+
+After a stage version is bumped, every processed document of a tenant needs
+that stage rerun. The backfill walks the tenant's completed documents in id
+order and enqueues a reprocessing job for each stale one, on the backfill
+queue that workers only serve while no uploads are waiting. It throttles
+itself twice: jobs are enqueued at no more than a fixed rate, and enqueueing
+pauses while the backfill queue is already deep.
+"""
+import logging
+import time
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.document import Document, DocumentStatus
+from app.services.document_processor import DocumentProcessor
+
+logger = logging.getLogger("document_platform")
+
+# Seconds between queue depth checks while the backfill queue is full
+DEPTH_POLL_SECONDS = 5.0
+
+
+class BackfillService:
+    """Enqueue reprocessing for the stale documents of a tenant."""
+    
+    @staticmethod
+    def iter_stale_documents(db: Session, tenant_id: int, page_size: int = 200):
+        """
+        Yield ``(document_id, stale_stages)`` for the tenant's completed documents
+        with stale stages, reading ``page_size`` rows at a time by id.
+        """
+        last_id = 0
+        while True:
+            rows = (
+                db.query(Document.id, Document.stage_results)
+                .filter(
+                    Document.tenant_id == tenant_id,  # Tenant isolation - REQUIRED
+                    Document.status == DocumentStatus.COMPLETED,
+                    Document.id > last_id
+                )
+                .order_by(Document.id)
+                .limit(page_size)
+                .all()
+            )
+            if not rows:
+                return
+            for document_id, stage_results in rows:
+                stale = DocumentProcessor.stale_stages(stage_results)
+                if stale:
+                    yield document_id, stale
+            last_id = rows[-1][0]
+    
+    @staticmethod
+    def backfill_tenant(
+        db: Session,
+        tenant_id: int,
+        rate_per_second: Optional[float] = None,
+        max_queue_depth: Optional[int] = None,
+        limit: Optional[int] = None,
+        dry_run: bool = False,
+        enqueue: Optional[Callable[[int, int], str]] = None,
+        queue_depth: Optional[Callable[[], int]] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic
+    ) -> dict:
+        """
+        Enqueue reprocessing for up to ``limit`` stale documents of a tenant.
+        With ``dry_run`` nothing is enqueued, the stale documents are only counted.
+        Returns counts of stale and enqueued documents and of stale stages.
+        """
+        if rate_per_second is None:
+            rate_per_second = settings.backfill_rate_per_second
+        if max_queue_depth is None:
+            max_queue_depth = settings.backfill_max_queue_depth
+        if enqueue is None or queue_depth is None:
+            from app.services.queue_service import QueueService
+            enqueue = enqueue or QueueService.enqueue_document_reprocessing
+            queue_depth = queue_depth or QueueService.backfill_queue_depth
+        
+        interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        summary = {"tenant_id": tenant_id, "stale": 0, "enqueued": 0, "stages": {}}
+        next_at = clock()
+        for document_id, stale in BackfillService.iter_stale_documents(db, tenant_id):
+            if limit is not None and summary["stale"] >= limit:
+                break
+            summary["stale"] += 1
+            for stage in stale:
+                summary["stages"][stage] = summary["stages"].get(stage, 0) + 1
+            if dry_run:
+                continue
+            
+            # Rate limit, then wait for the workers to drain the queue if it is deep
+            delay = next_at - clock()
+            if delay > 0:
+                sleep(delay)
+            while max_queue_depth > 0 and queue_depth() >= max_queue_depth:
+                sleep(DEPTH_POLL_SECONDS)
+            next_at = max(next_at, clock()) + interval
+            
+            enqueue(document_id, tenant_id)
+            summary["enqueued"] += 1
+        
+        logger.info("Backfill finished", extra={**summary, "dry_run": dry_run})
+        return summary
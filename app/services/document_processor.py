@@ -1,12 +1,25 @@
 """
 Document processing service for extracting real metadata from documents.
 """
+import itertools
 import os
-import re
-from pathlib import Path
-from typing import Dict, Any, Optional
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 from datetime import datetime
 
+from app.config import settings
+from app.services.entity_extractor import EntityExtractor, EntityAccumulator, ENTITY_LIMITS, top_unique
+from app.services.extractors import EXTRACTORS, PageContinuation, UnsupportedFormatError
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.language_detector import LanguageDetector
+from app.services.ocr import OCR_AVAILABLE, iter_frames, ocr_image, ocr_tile, preprocess, split_tiles
+from app.services.stage_budget import StageTimeout, stage_budget, time_limit
+from app.services.text_analysis import DocumentAnalysis, PAGE_SEPARATOR, TextStats
+from app.services.text_store import PageTextWriter
+
 try:
     import pdfplumber
     PDFPLUMBER_AVAILABLE = True
@@ -19,12 +32,6 @@ try:
 except ImportError:
     PYPDF_AVAILABLE = False
 
-try:
-    from langdetect import detect, LangDetectException
-    LANGDETECT_AVAILABLE = True
-except ImportError:
-    LANGDETECT_AVAILABLE = False
-
 try:
     import spacy
     SPACY_AVAILABLE = True
@@ -32,11 +39,223 @@ except ImportError:
     SPACY_AVAILABLE = False
 
 try:
-    from PIL import Image
-    import pytesseract
-    OCR_AVAILABLE = True
+    # Installed with pdfplumber; renders scanned PDF pages for OCR
+    import pypdfium2
+    PDFIUM_AVAILABLE = True
 except ImportError:
-    OCR_AVAILABLE = False
+    PDFIUM_AVAILABLE = False
+
+
+# Version of each stage's stored result, keyed like the stage timings. Bump a stage
+# when its output changes: reprocessing reruns only the stages whose stored version
+# differs, and every stage when extraction itself changed.
+STAGE_VERSIONS = {
+    "extraction": "3",
+    "extract_document_info": "1",
+    "text_metrics": "1",
+    "extract_entities": "1",
+    "match_keywords": "1",
+    "detect_language": "1",
+    "extract_organizations": "1",
+}
+
+# Version of the metadata as a whole, so the result cache never reuses results of older
+# versions. The leading number covers changes outside the stages (the metadata layout).
+PROCESSOR_VERSION = ".".join(["5"] + list(STAGE_VERSIONS.values()))
+
+# NER organisations that are almost always false positives
+NER_ORG_STOPWORDS = frozenset([
+    'FE', 'DNS', 'CAP', 'FS', 'SQL', 'API', 'URL', 'HTTP', 'HTTPS', 'PDF', 'XML',
+    'JSON', 'HTML', 'CSS', 'JS', 'AWS', 'RDS', 'RDBMS'
+])
+
+# Only the start of the document goes through NER
+NER_MAX_CHARS = 15000
+# Pipeline components NER does not need; skipping them speeds up every call
+NER_UNUSED_PIPES = ["tagger", "parser", "attribute_ruler", "lemmatizer"]
+# With fewer NER organisations than this, regex company matches are added
+MIN_NER_COMPANIES = 5
+
+# Content keywords per document type, checked in order
+DOCUMENT_TYPE_KEYWORDS = [
+    ('invoice', ['invoice', 'bill to', 'amount due', 'total', 'subtotal']),
+    ('receipt', ['receipt', 'payment received', 'thank you for your purchase']),
+    ('contract', ['agreement', 'contract', 'terms and conditions', 'party']),
+]
+
+# Content categories and the keywords that put a document in them
+CONTENT_CATEGORY_KEYWORDS = [
+    ("financial", ['invoice', 'payment', 'bill', 'amount due', 'total', 'subtotal']),
+    ("technical", ['api', 'database', 'server', 'code', 'programming', 'software', 'architecture']),
+    ("legal", ['contract', 'agreement', 'terms', 'legal', 'party', 'obligation']),
+    ("business", ['business', 'company', 'organization', 'strategy', 'market']),
+    ("academic", ['research', 'study', 'analysis', 'paper', 'thesis', 'university']),
+]
+
+# One matcher serves both document type detection and content categorization
+KEYWORD_MATCHER = KeywordMatcher({
+    **{("document_type", name): keywords for name, keywords in DOCUMENT_TYPE_KEYWORDS},
+    **{("category", name): keywords for name, keywords in CONTENT_CATEGORY_KEYWORDS},
+})
+
+
+class PdfProbe(NamedTuple):
+    """How a PDF's pages have to be extracted."""
+    kind: str  # "text", "scanned" (every page image-only), "mixed" or "encrypted"
+    page_count: int
+    ocr_pages: List[int]  # 0-based indexes of the image-only pages
+
+
+def probe_pdf(file_path: str) -> PdfProbe:
+    """
+    Classify a PDF from its structure alone: a page whose resources hold images
+    but no fonts is a scan that needs OCR. No content stream is parsed, so this
+    costs about as much as counting the pages. Scans that already carry an OCR
+    text layer have fonts, and count as text.
+    """
+    return read_pdf_structure(file_path)[0]
+
+
+def _image_only_page(page) -> bool:
+    resources = page.get("/Resources")
+    if resources is None:
+        return False
+    fonts, images = _resource_kinds(resources.get_object())
+    return images and not fonts
+
+
+def _resource_kinds(resources, depth: int = 0) -> Tuple[bool, bool]:
+    """Whether a resource dictionary, including nested form XObjects, uses fonts and images."""
+    fonts = bool(resources.get("/Font"))
+    images = False
+    xobjects = resources.get("/XObject")
+    for ref in (xobjects.get_object().values() if xobjects is not None else ()):
+        xobject = ref.get_object()
+        subtype = xobject.get("/Subtype")
+        if subtype == "/Image":
+            images = True
+        elif subtype == "/Form" and depth < 3 and "/Resources" in xobject:
+            form_fonts, form_images = _resource_kinds(xobject["/Resources"].get_object(), depth + 1)
+            fonts = fonts or form_fonts
+            images = images or form_images
+    return fonts, images
+
+
+def ocr_pdf_pages(file_path: str, page_indexes: List[int], dpi: int) -> List[str]:
+    """Render PDF pages with pdfium and OCR them; also a process pool task."""
+    pdf = pypdfium2.PdfDocument(file_path)
+    try:
+        texts = []
+        for index in page_indexes:
+            page = pdf[index]
+            try:
+                texts.append(ocr_image(preprocess(page.render(scale=dpi / 72).to_pil(), dpi=dpi)))
+            finally:
+                page.close()
+        return texts
+    finally:
+        pdf.close()
+
+
+# Document information dictionary entries reported by pdf_document_info
+PDF_INFO_FIELDS = ("title", "author", "subject", "creator", "producer")
+
+
+def pdf_document_info(file_path: str) -> Dict[str, Any]:
+    """
+    Page count and document information of a PDF, read from its trailer,
+    cross-reference table and page tree only; no page content is parsed.
+    Returns an empty dictionary when the file cannot be read.
+    """
+    return read_pdf_structure(file_path)[1]
+
+
+def read_pdf_structure(file_path: str) -> Tuple[PdfProbe, Dict[str, Any]]:
+    """
+    ``probe_pdf`` and ``pdf_document_info`` of a PDF from one parse of its
+    trailer, cross-reference table and page tree.
+    """
+    if not PYPDF_AVAILABLE:
+        return PdfProbe("text", 0, []), {}
+    try:
+        reader = PdfReader(file_path)
+        info = {"pdf_version": reader.pdf_header.replace("%PDF-", ""), "encrypted": reader.is_encrypted}
+        # Many encrypted PDFs only restrict permissions and open with an empty password
+        if reader.is_encrypted and not reader.decrypt(""):
+            return PdfProbe("encrypted", 0, []), info
+        info["page_count"] = len(reader.pages)
+        metadata = reader.metadata
+        if metadata is not None:
+            for field in PDF_INFO_FIELDS:
+                value = getattr(metadata, field)
+                if value:
+                    info[field] = str(value).strip()
+            for field, attribute in (("created", "creation_date"), ("modified", "modification_date")):
+                try:
+                    value = getattr(metadata, attribute)
+                except Exception:
+                    value = None  # malformed date strings are common
+                if value is not None:
+                    info[field] = value.isoformat()
+    except Exception as e:
+        print(f"pypdf failed: {e}")
+        return PdfProbe("text", 0, []), {}
+    try:
+        ocr_pages = [index for index, page in enumerate(reader.pages) if _image_only_page(page)]
+    except Exception as e:
+        # Leave it to the extractors and their fallbacks
+        print(f"pypdf failed: {e}")
+        return PdfProbe("text", 0, []), info
+    page_count = info["page_count"]
+    if not ocr_pages:
+        kind = "text"
+    elif len(ocr_pages) == page_count:
+        kind = "scanned"
+    else:
+        kind = "mixed"
+    return PdfProbe(kind, page_count, ocr_pages), info
+
+
+def iter_pdf_page_range(file_path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield the text of pages ``start`` to ``stop`` (exclusive; all pages when None).
+    pdfplumber is tried first; if it fails, pypdf continues from the page it stopped at.
+    """
+    next_page = start
+    
+    # Try pdfplumber first (better text extraction)
+    if PDFPLUMBER_AVAILABLE:
+        try:
+            # pdfplumber numbers pages from 1; only the requested pages get parsed
+            page_numbers = None
+            if start or stop is not None:
+                page_numbers = range(start + 1, stop + 1 if stop is not None else sys.maxsize)
+            with pdfplumber.open(file_path, pages=page_numbers) as pdf:
+                for page in pdf.pages:
+                    page_text = page.extract_text() or ""
+                    # Drop the parsed layout so memory does not build up page after page
+                    page.flush_cache()
+                    page.get_textmap.cache_clear()
+                    next_page += 1
+                    yield page_text
+            return
+        except Exception as e:
+            print(f"pdfplumber failed: {e}, trying pypdf")
+    
+    # Fallback to pypdf, continuing after the pages already produced
+    if PYPDF_AVAILABLE:
+        try:
+            reader = PdfReader(file_path)
+            last = len(reader.pages) if stop is None else min(stop, len(reader.pages))
+            for index in range(next_page, last):
+                yield reader.pages[index].extract_text() or ""
+        except Exception as e:
+            print(f"pypdf failed: {e}")
+
+
+def extract_pdf_page_range(file_path: str, start: int, stop: int) -> List[str]:
+    """Process pool task: the texts of one page range."""
+    return list(iter_pdf_page_range(file_path, start, stop))
 
 
 class DocumentProcessor:
@@ -44,6 +263,27 @@ class DocumentProcessor:
     
     def __init__(self):
         self.nlp = None
+        self.entity_extractor = EntityExtractor()
+        self.parallel_page_threshold = settings.pdf_parallel_page_threshold
+        self.parallel_workers = settings.pdf_parallel_workers
+        self.parallel_range_pages = settings.pdf_parallel_range_pages
+        self.ocr_dpi = settings.pdf_ocr_dpi
+        self.ocr_target_dpi = settings.ocr_target_dpi
+        self.ocr_tile_rows = settings.ocr_tile_rows
+        self.ocr_workers = settings.ocr_workers
+        self.text_chunk_chars = settings.text_chunk_chars
+        # The last PDF structure read, keyed by path, size and mtime: the document info shown
+        # before extraction and the probe that routes extraction come from one parse
+        self._pdf_structure: Optional[Tuple[tuple, PdfProbe, Dict[str, Any]]] = None
+        self.language_detector = LanguageDetector(
+            window_chars=settings.language_window_chars,
+            samples=settings.language_sample_windows,
+            seed=settings.language_seed,
+        )
+        # Time spent building the NLP pipeline, reported separately from per-job time
+        self.model_load_seconds = 0.0
+        load_start = time.perf_counter()
+        self.language_detector.load()
         if SPACY_AVAILABLE:
             try:
                 # Try to load spaCy model (download if needed: python -m spacy download en_core_web_sm)
@@ -51,6 +291,110 @@ class DocumentProcessor:
             except OSError:
                 # Model not installed, will use regex fallback
                 pass
+        self.model_load_seconds = time.perf_counter() - load_start
+    
+    def iter_pdf_pages(self, file_path: str) -> Iterator[str]:
+        """
+        Yield the text of each PDF page in order, one page at a time.
+        Pages without text yield an empty string, so the number of items is the page count.
+        
+        A structural probe first routes the file (see ``probe_pdf``): image-only
+        pages are rendered and OCRed instead of going through the text
+        extractors, and PDFs that cannot be opened without a password are
+        rejected with UnsupportedFormatError.
+        
+        PDFs with at least ``parallel_page_threshold`` pages are split into page
+        ranges that are extracted in a process pool; pages still come out in order.
+        Pages to OCR always go to the pool when there is more than one CPU.
+        """
+        probe = self.pdf_structure(file_path)[0]
+        if probe.kind == "encrypted":
+            raise UnsupportedFormatError("encrypted pdf")
+        workers = self.parallel_workers or os.cpu_count() or 1
+        ocr_pages = probe.ocr_pages if OCR_AVAILABLE and PDFIUM_AVAILABLE else []
+        if ocr_pages and probe.kind == "scanned":
+            yield from self._iter_ocr_pages(file_path, ocr_pages, workers)
+            return
+        
+        if workers > 1 and self.parallel_page_threshold > 0 and probe.page_count >= self.parallel_page_threshold:
+            text_pages = self._iter_pdf_pages_parallel(file_path, probe.page_count, workers)
+        else:
+            text_pages = iter_pdf_page_range(file_path)
+        if not ocr_pages:
+            yield from text_pages
+            return
+        
+        # Mixed: the text extractors skip over image-only pages quickly, their OCR text replaces them
+        ocr_texts = self._iter_ocr_pages(file_path, ocr_pages, workers)
+        scanned = set(ocr_pages)
+        try:
+            for index, page_text in enumerate(text_pages):
+                yield next(ocr_texts, "") if index in scanned else page_text
+        finally:
+            text_pages.close()
+            ocr_texts.close()
+    
+    def _iter_ocr_pages(self, file_path: str, page_indexes: List[int], workers: int) -> Iterator[str]:
+        """OCR text of the given PDF pages in order; one page per task when they go to a process pool."""
+        if workers <= 1 or len(page_indexes) <= 1:
+            for index in page_indexes:
+                yield from ocr_pdf_pages(file_path, [index], self.ocr_dpi)
+            return
+        tasks = [(ocr_pdf_pages, (file_path, [index], self.ocr_dpi)) for index in page_indexes]
+        yield from self._iter_in_pool(tasks, workers)
+    
+    def _iter_pdf_pages_parallel(self, file_path: str, page_count: int, workers: int) -> Iterator[str]:
+        """Extract page ranges in worker processes."""
+        range_pages = max(1, self.parallel_range_pages)
+        tasks = [
+            (extract_pdf_page_range, (file_path, start, min(start + range_pages, page_count)))
+            for start in range(0, page_count, range_pages)
+        ]
+        yield from self._iter_in_pool(tasks, workers)
+    
+    def _iter_in_pool(self, tasks: Iterable[Tuple[Callable[..., List[str]], tuple]], workers: int) -> Iterator[str]:
+        """
+        Run page tasks in worker processes, keeping a bounded number in flight,
+        and yield the pages each returns in task order. ``tasks`` is consumed
+        lazily, only as far as the tasks in flight; a single task runs inline.
+        """
+        tasks = iter(tasks)
+        first = list(itertools.islice(tasks, 2 * workers))
+        if len(first) <= 1:
+            for function, args in first:
+                yield from function(*args)
+            return
+        pending = deque()
+        pool = Pool(processes=min(workers, len(first)))
+        finished = False
+        try:
+            for function, args in itertools.chain(first, tasks):
+                pending.append(pool.apply_async(function, args))
+                # Results are consumed in order; at most two tasks per process wait in memory
+                if len(pending) >= 2 * workers:
+                    yield from pending.popleft().get()
+            while pending:
+                yield from pending.popleft().get()
+            finished = True
+        finally:
+            if finished:
+                pool.close()
+                pool.join()
+            else:
+                # Abandoned (stage timeout, consumer stopped): stop tasks still running instead of waiting
+                pool.terminate()
+    
+    def pdf_structure(self, file_path: str) -> Tuple[PdfProbe, Dict[str, Any]]:
+        """``read_pdf_structure`` of a file, parsed again only when it is another file or has changed."""
+        stat = os.stat(file_path)
+        key = (file_path, stat.st_size, stat.st_mtime_ns)
+        if self._pdf_structure is None or self._pdf_structure[0] != key:
+            self._pdf_structure = (key, *read_pdf_structure(file_path))
+        return self._pdf_structure[1], dict(self._pdf_structure[2])
+    
+    def read_pdf_info(self, file_path: str) -> Dict[str, Any]:
+        """Page count, title, producer and other document information of a PDF, without text extraction."""
+        return self.pdf_structure(file_path)[1]
     
     def extract_text_from_pdf(self, file_path: str) -> tuple[str, int]:
         """
@@ -59,171 +403,98 @@ class DocumentProcessor:
         """
         text_parts = []
         page_count = 0
-        
-        # Try pdfplumber first (better text extraction)
-        if PDFPLUMBER_AVAILABLE:
-            try:
-                with pdfplumber.open(file_path) as pdf:
-                    page_count = len(pdf.pages)
-                    for page in pdf.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text_parts.append(page_text)
-                return "\n\n".join(text_parts), page_count
-            except Exception as e:
-                print(f"pdfplumber failed: {e}, trying pypdf")
-        
-        # Fallback to pypdf
-        if PYPDF_AVAILABLE:
-            try:
-                reader = PdfReader(file_path)
-                page_count = len(reader.pages)
-                for page in reader.pages:
-                    text = page.extract_text()
-                    if text:
-                        text_parts.append(text)
-                return "\n\n".join(text_parts), page_count
-            except Exception as e:
-                print(f"pypdf failed: {e}")
-        
-        return "", 0
+        for page_text in self.iter_pdf_pages(file_path):
+            page_count += 1
+            if page_text:
+                text_parts.append(page_text)
+        return PAGE_SEPARATOR.join(text_parts), page_count
     
     def extract_text_from_image(self, file_path: str) -> str:
-        """Extract text from image using OCR."""
-        if not OCR_AVAILABLE:
-            return ""
-        
-        try:
-            image = Image.open(file_path)
-            text = pytesseract.image_to_string(image)
-            return text
-        except Exception as e:
-            print(f"OCR failed: {e}")
-            return ""
+        """Extract text from image using OCR; the frames of a multi-page TIFF are joined like PDF pages."""
+        return PAGE_SEPARATOR.join(page for page in self.iter_image_pages(file_path) if page)
+    
+    def text_metrics(self, text: str) -> Dict[str, Any]:
+        """Word and sentence counts, preview and summary of ``text``, in the shape of the processing metadata."""
+        stats = TextStats()
+        stats.feed(text)
+        return stats.metrics()
     
     def detect_language(self, text: str) -> str:
-        """Detect language of text."""
-        if not LANGDETECT_AVAILABLE or not text:
-            return "en"  # Default to English
-        
+        """Detect language of text, voting over windows sampled across it."""
+        return self.language_detector.detect(text)
+    
+    def extract_organizations(self, text: str) -> list:
+        """Organisation names found by NER in ``text``; empty without a model."""
+        if not self.nlp or not text:
+            return []
         try:
-            return detect(text)
-        except LangDetectException:
-            return "en"
+            return self._organizations_from_doc(self.nlp(text, disable=NER_UNUSED_PIPES))
+        except Exception:
+            return []
+    
+    def extract_organizations_batch(self, texts: List[str], batch_size: int = 8) -> List[list]:
+        """
+        NER for several texts in one ``nlp.pipe`` call, which is much faster than
+        one call per text. Returns one organisation list per text, in order.
+        """
+        if not self.nlp or not texts:
+            return [[] for _ in texts]
+        try:
+            docs = self.nlp.pipe(texts, batch_size=batch_size, disable=NER_UNUSED_PIPES)
+            return [self._organizations_from_doc(doc) if text else [] for text, doc in zip(texts, docs)]
+        except Exception:
+            # Fall back to one call per text so one bad document does not cost the batch its NER
+            return [self.extract_organizations(text) for text in texts]
+    
+    def _organizations_from_doc(self, doc) -> list:
+        orgs = []
+        for ent in doc.ents:
+            if ent.label_ == "ORG":
+                org_text = ent.text.strip()
+                # Filter out common false positives
+                if len(org_text) > 2 and not org_text.upper() in NER_ORG_STOPWORDS:
+                    orgs.append(org_text)
+        return top_unique(orgs, ENTITY_LIMITS["companies"])
     
     def extract_entities(self, text: str) -> Dict[str, list]:
         """Extract useful entities (dates, amounts, companies, emails, phones, etc.) from text."""
-        entities = {
-            "dates": [],
-            "amounts": [],
-            "companies": [],
-            "emails": [],
-            "phone_numbers": [],
-            "urls": [],
-            "keywords": []
-        }
-        
+        accumulator = EntityAccumulator()
         if not text:
-            return entities
-        
-        # Extract dates (various formats) - more comprehensive
-        date_patterns = [
-            r'\b\d{4}-\d{2}-\d{2}\b',  # YYYY-MM-DD
-            r'\b\d{1,2}/\d{1,2}/\d{4}\b',  # MM/DD/YYYY
-            r'\b\d{1,2}-\d{1,2}-\d{4}\b',  # MM-DD-YYYY
-            r'\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{1,2},?\s+\d{4}\b',  # Month DD, YYYY
-            r'\b\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{4}\b',  # DD Month YYYY
-        ]
-        
-        for pattern in date_patterns:
-            dates = re.findall(pattern, text, re.IGNORECASE)
-            entities["dates"].extend(dates)
-        
-        # Remove duplicates and invalid dates
-        entities["dates"] = sorted(list(set(entities["dates"])))[:15]
-        
-        # Extract amounts (currency) - more comprehensive
-        amount_patterns = [
-            r'\$[\d,]+\.?\d{0,2}',  # $1,234.56
-            r'USD\s*[\d,]+\.?\d{0,2}',  # USD 1234.56
-            r'[\d,]+\.?\d{0,2}\s*(?:dollars|USD|EUR|GBP)',  # 1234.56 dollars
-            r'€[\d,]+\.?\d{0,2}',  # Euro
-            r'£[\d,]+\.?\d{0,2}',  # Pound
-        ]
-        
-        for pattern in amount_patterns:
-            amounts = re.findall(pattern, text, re.IGNORECASE)
-            entities["amounts"].extend(amounts)
-        
-        # Remove duplicates
-        entities["amounts"] = sorted(list(set(entities["amounts"])))[:15]
+            return accumulator.result()
         
-        # Extract email addresses
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = re.findall(email_pattern, text)
-        entities["emails"] = sorted(list(set(emails)))[:10]
-        
-        # Extract phone numbers
-        phone_patterns = [
-            r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b',  # US format: 123-456-7890
-            r'\b\(\d{3}\)\s?\d{3}[-.]?\d{4}\b',  # (123) 456-7890
-            r'\b\+?\d{1,3}[-.\s]?\d{1,4}[-.\s]?\d{1,4}[-.\s]?\d{1,9}\b',  # International
-        ]
-        for pattern in phone_patterns:
-            phones = re.findall(pattern, text)
-            entities["phone_numbers"].extend(phones)
-        entities["phone_numbers"] = sorted(list(set(entities["phone_numbers"])))[:10]
-        
-        # Extract URLs
-        url_pattern = r'https?://[^\s<>"{}|\\^`\[\]]+'
-        urls = re.findall(url_pattern, text)
-        entities["urls"] = sorted(list(set(urls)))[:10]
-        
-        # Extract companies/organizations - improved filtering
-        if self.nlp:
-            try:
-                doc = self.nlp(text[:15000])  # Process more text
-                orgs = []
-                for ent in doc.ents:
-                    if ent.label_ == "ORG":
-                        org_text = ent.text.strip()
-                        # Filter out common false positives
-                        if len(org_text) > 2 and not org_text.upper() in ['FE', 'DNS', 'CAP', 'FS', 'SQL', 'API', 'URL', 'HTTP', 'HTTPS', 'PDF', 'XML', 'JSON', 'HTML', 'CSS', 'JS', 'AWS', 'RDS', 'RDBMS']:
-                            orgs.append(org_text)
-                entities["companies"] = sorted(list(set(orgs)))[:15]
-            except Exception:
-                pass
-        
-        # Fallback: Extract meaningful company names (better filtering)
-        if len(entities["companies"]) < 5:
-            # Look for patterns like "Company Name Inc", "Corp", "LLC", etc.
-            company_patterns = [
-                r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,3}(?:\s+(?:Inc|Corp|LLC|Ltd|Limited|Company|Co|Corporation|Technologies|Systems|Solutions|Group|Industries))\.?\b',
-                r'\b(?:Amazon|Google|Microsoft|Apple|Facebook|Meta|Twitter|LinkedIn|Netflix|Uber|Airbnb|Salesforce|Oracle|IBM|Intel|NVIDIA|Adobe|PayPal|Stripe|Shopify)\b',  # Known companies
-            ]
-            for pattern in company_patterns:
-                companies = re.findall(pattern, text, re.IGNORECASE)
-                # Filter out short acronyms
-                companies = [c for c in companies if len(c.split()) > 1 or len(c) > 4]
-                entities["companies"].extend(companies)
-            entities["companies"] = sorted(list(set(entities["companies"])))[:15]
-        
-        # Extract important keywords (topics, technologies, etc.)
-        # Common technical/business keywords
-        keyword_patterns = [
-            r'\b(?:cloud|database|server|client|API|REST|GraphQL|microservices|container|docker|kubernetes|scalability|performance|security|authentication|authorization|encryption|blockchain|AI|machine learning|data science|analytics|business intelligence)\b',
-        ]
-        keywords = []
-        for pattern in keyword_patterns:
-            found = re.findall(pattern, text, re.IGNORECASE)
-            keywords.extend(found)
-        entities["keywords"] = sorted(list(set([k.lower() for k in keywords])))[:20]
+        # Extract companies/organizations with NER first; regex patterns are the fallback
+        organizations = self.extract_organizations(text[:NER_MAX_CHARS])
         
+        # Dates, amounts, emails, phones, URLs, keywords and fallback companies in one scan
+        need_companies = len(organizations) < MIN_NER_COMPANIES
+        accumulator.add(self.entity_extractor.scan(text, include_companies=need_companies))
+        return self._merge_entities(organizations, accumulator.result())
+    
+    def _merge_entities(self, organizations: list, regex_entities: Dict[str, list]) -> Dict[str, list]:
+        """Combine NER organisations with the regex entities, falling back to regex companies."""
+        entities = {category: list(values) for category, values in regex_entities.items()}
+        if len(organizations) < MIN_NER_COMPANIES:
+            entities["companies"] = top_unique(organizations + entities["companies"], ENTITY_LIMITS["companies"])
+        else:
+            entities["companies"] = organizations
         return entities
     
-    def detect_document_type(self, text: str, filename: str) -> str:
+    def match_keywords(self, text: str) -> set:
+        """
+        Document type and category keyword groups that occur in ``text``, from one
+        matcher pass. Pass the result to detect_document_type and _categorize_content
+        to share it between them.
+        """
+        return KEYWORD_MATCHER.match(text.lower())
+    
+    def detect_document_type(self, text: str, filename: str, matched_groups: Optional[set] = None) -> str:
         """Detect document type based on content and filename."""
-        text_lower = text.lower()
+        if matched_groups is None:
+            matched_groups = self.match_keywords(text)
+        return self._classify_document(matched_groups, filename)
+    
+    def _classify_document(self, matched_groups: set, filename: str) -> str:
+        """Pick the document type from the filename, then from the keyword groups found in the text."""
         filename_lower = filename.lower()
         
         # Check filename first
@@ -239,125 +510,332 @@ class DocumentProcessor:
             return 'letter'
         
         # Check content
-        invoice_keywords = ['invoice', 'bill to', 'amount due', 'total', 'subtotal']
-        if any(keyword in text_lower for keyword in invoice_keywords):
-            return 'invoice'
-        
-        receipt_keywords = ['receipt', 'payment received', 'thank you for your purchase']
-        if any(keyword in text_lower for keyword in receipt_keywords):
-            return 'receipt'
-        
-        contract_keywords = ['agreement', 'contract', 'terms and conditions', 'party']
-        if any(keyword in text_lower for keyword in contract_keywords):
-            return 'contract'
+        for document_type, _ in DOCUMENT_TYPE_KEYWORDS:
+            if ("document_type", document_type) in matched_groups:
+                return document_type
         
         return 'document'  # Default
     
-    def process_document(self, file_path: str, filename: str) -> Dict[str, Any]:
+    def iter_document_pages(self, file_path: str, filename: str) -> Iterator[str]:
         """
-        Process a document and extract all metadata.
-        Returns dictionary with extracted metadata.
+        Yield the document text page by page; one item per page, plus a
+        ``PageContinuation`` per further chunk of a page read in chunks. The extractor is
+        picked from the file's magic bytes, see ``app.services.extractors``.
+        Raises UnsupportedFormatError for binary formats without an extractor.
         """
-        start_time = datetime.utcnow()
-        file_ext = Path(filename).suffix.lower()
-        
-        extracted_text = ""
-        page_count = 0
+        extractor = EXTRACTORS.sniff(file_path, filename)
+        yield from extractor.extract(self, file_path)
+    
+    def extract_document_info(self, file_path: str, filename: str) -> Dict[str, Any]:
+        """
+        What the file structure tells without extracting any text, e.g. a PDF's
+        page count and title; empty for formats without an info reader.
+        Raises UnsupportedFormatError like ``iter_document_pages``.
+        """
+        extractor = EXTRACTORS.sniff(file_path, filename)
+        if extractor.info is None:
+            return {}
+        return extractor.info(self, file_path)
+    
+    @staticmethod
+    def preview_metadata(document_info: Dict[str, Any]) -> Dict[str, Any]:
+        """Partial metadata to show from the document information while the text is being extracted."""
+        return {
+            "page_count": document_info.get("page_count"),
+            "document_info": document_info,
+            # Replaced by the full metadata once processing completes
+            "processing_phase": "document_info",
+        }
+    
+    def iter_image_pages(self, file_path: str) -> Iterator[str]:
+        """
+        Yield the OCR text of each frame of an image, e.g. of each page of a
+        multi-page TIFF. Frames are preprocessed and cut into tiles (see
+        ``app.services.ocr``); with more than one CPU the tiles are OCRed in a
+        process pool while the next frames are prepared.
+        """
+        if not OCR_AVAILABLE:
+            return
+        tiles_per_frame = deque()
         
-        # Extract text based on file type
-        if file_ext == '.pdf':
-            extracted_text, page_count = self.extract_text_from_pdf(file_path)
-        elif file_ext in ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff']:
-            extracted_text = self.extract_text_from_image(file_path)
-            page_count = 1 if extracted_text else 0
-        elif file_ext in ['.txt', '.md']:
+        def tasks():
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    extracted_text = f.read()
-                page_count = 1
+                for frame in iter_frames(file_path):
+                    tiles = split_tiles(preprocess(frame, self.ocr_target_dpi), self.ocr_tile_rows)
+                    tiles_per_frame.append(len(tiles))
+                    for tile in tiles:
+                        yield ocr_tile, (tile,)
             except Exception as e:
-                print(f"Error reading text file: {e}")
-                extracted_text = ""
-                page_count = 0
-        else:
-            # Try to read as text
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    extracted_text = f.read()
-                page_count = 1
-            except Exception:
-                extracted_text = ""
-                page_count = 0
+                # Unreadable or truncated image: keep the frames read so far
+                print(f"OCR failed: {e}")
         
-        # Calculate word count
-        words = extracted_text.split()
-        word_count = len(words)
-        
-        # Detect language
-        language = self.detect_language(extracted_text[:1000]) if extracted_text else "en"
-        
-        # Detect document type
-        document_type = self.detect_document_type(extracted_text, filename)
+        workers = self.ocr_workers or os.cpu_count() or 1
+        if workers > 1:
+            texts = self._iter_in_pool(tasks(), workers)
+        else:
+            texts = (text for function, args in tasks() for text in function(*args))
+        try:
+            for first in texts:
+                # A frame's tiles were queued before its first tile came back
+                rest = [next(texts) for _ in range(tiles_per_frame.popleft() - 1)]
+                yield "\n".join([first] + rest)
+        finally:
+            texts.close()
+    
+    def iter_text_pages(self, file_path: str) -> Iterator[str]:
+        """
+        Yield a text file as a single page. A file longer than ``text_chunk_chars``
+        is read in chunks of that size, each after the first yielded as a
+        ``PageContinuation``, so memory stays bounded whatever the file size.
+        """
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                chunk = f.read(self.text_chunk_chars)
+                yield chunk
+                while chunk:
+                    chunk = f.read(self.text_chunk_chars)
+                    if chunk:
+                        yield PageContinuation(chunk)
+        except Exception as e:
+            print(f"Error reading text file: {e}")
+    
+    def process_document(self, file_path: str, filename: str) -> Dict[str, Any]:
+        """
+        Process a document and extract all metadata.
+        Returns dictionary with extracted metadata.
         
-        # Extract entities
-        entities = self.extract_entities(extracted_text)
+        Pages are streamed through incremental analyzers, so the full text is
+        never held in memory at once.
+        """
+        analysis = self.analyze_document(file_path, filename)
+        organizations, = self.run_ner([analysis])
+        return self.build_metadata(analysis, filename, organizations)
+    
+    def analyze_document(self, file_path: str, filename: str,
+                         text_writer: Optional[PageTextWriter] = None,
+                         document_info: Optional[Dict[str, Any]] = None) -> DocumentAnalysis:
+        """
+        Run every per-document stage except NER. The returned analysis keeps the
+        start of the text, so NER can run later, possibly batched with other documents.
+        With ``text_writer``, every extracted page is also written to the text store.
+        ``document_info`` from an earlier ``extract_document_info`` call is reused.
         
-        # Get text preview (first 200 characters)
-        text_preview = extracted_text[:200].strip() if extracted_text else ""
-        if len(extracted_text) > 200:
-            text_preview += "..."
+        Extraction runs within its stage budget. Past it, the pages analyzed so
+        far are kept and the stage is recorded as skipped.
+        """
+        analysis = DocumentAnalysis(
+            self.entity_extractor, KEYWORD_MATCHER, head_chars=NER_MAX_CHARS,
+            language_sampler=self.language_detector.sampler(),
+        )
+        budget = stage_budget("extraction")
+        deadline = time.monotonic() + budget if budget > 0 else None
+        start = time.perf_counter()
+        extractor = EXTRACTORS.sniff(file_path, filename)
+        # Extraction time is recorded under the extractor's name, e.g. iter_pdf_pages
+        stage = extractor.extract.__name__
+        analysis.add_timing(stage, time.perf_counter() - start)
+        if document_info is None and extractor.info is not None:
+            start = time.perf_counter()
+            document_info = extractor.info(self, file_path)
+            analysis.add_timing("extract_document_info", time.perf_counter() - start)
+        analysis.document_info = document_info or {}
+        pages = extractor.extract(self, file_path)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    # Only extraction is interrupted, so a page is either analyzed whole or not at all
+                    with time_limit(budget, deadline):
+                        page_text = next(pages, None)
+                    if text_writer is not None and page_text is not None:
+                        text_writer.add_page(page_text)
+                finally:
+                    analysis.add_timing(stage, time.perf_counter() - start)
+                if page_text is None:
+                    break
+                analysis.add_page(page_text)
+        except StageTimeout:
+            analysis.skip_stage("extraction")
+        finally:
+            pages.close()
+        return analysis
+    
+    def analyze_stored_pages(self, pages: Iterable[str], stages: Iterable[str]) -> DocumentAnalysis:
+        """Run only the given per-page stages over text extracted earlier, e.g. from the text store."""
+        analysis = DocumentAnalysis(
+            self.entity_extractor, KEYWORD_MATCHER, head_chars=NER_MAX_CHARS,
+            language_sampler=self.language_detector.sampler(), stages=stages,
+        )
+        for page_text in pages:
+            analysis.add_page(page_text)
+        return analysis
+    
+    def run_ner(self, analyses: List[DocumentAnalysis]) -> List[list]:
+        """
+        NER organisations for each analysis, in one ``nlp.pipe`` call within the
+        NER stage budget. Past it, every analysis gets no NER organisations and
+        records the stage as skipped.
+        """
+        heads = [analysis.head for analysis in analyses]
+        start = time.perf_counter()
+        try:
+            with time_limit(stage_budget("ner")):
+                return self.extract_organizations_batch(heads, batch_size=max(1, len(heads)))
+        except StageTimeout:
+            for analysis in analyses:
+                analysis.skip_stage("ner")
+            return [[] for _ in analyses]
+        finally:
+            # A batch shares one nlp.pipe call; each document is charged an equal share
+            share = (time.perf_counter() - start) / max(1, len(analyses))
+            for analysis in analyses:
+                analysis.add_timing("extract_organizations", share)
+    
+    def build_metadata(self, analysis: DocumentAnalysis, filename: str, organizations: list) -> Dict[str, Any]:
+        """Turn an analysis and its NER organisations into the metadata dictionary."""
+        return self.metadata_from_stages(self.stage_results(analysis, organizations), filename, analysis)
+    
+    def stage_results(self, analysis: DocumentAnalysis, organizations: list,
+                      stages: Optional[Iterable[str]] = None) -> Dict[str, dict]:
+        """
+        Result of each stage that ran on ``analysis`` (all of them by default),
+        stored under the stage's current version. Stages that ran over their
+        time budget have no result, so reprocessing picks them up again.
+        """
+        stages = set(STAGE_VERSIONS if stages is None else stages)
+        results = {}
+        if "extraction" in stages:
+            results["extraction"] = {
+                "page_count": analysis.page_count,
+                "complete": "extraction" not in analysis.skipped_stages,
+            }
+        if "extract_document_info" in stages:
+            results["extract_document_info"] = analysis.document_info
+        if "text_metrics" in stages:
+            results["text_metrics"] = analysis.text_metrics()
+        if "extract_entities" in stages:
+            results["extract_entities"] = analysis.entities.result()
+        if "match_keywords" in stages:
+            results["match_keywords"] = sorted(list(group) for group in analysis.keywords.matched)
+        if "detect_language" in stages:
+            # Detect language from windows sampled across the whole document
+            language = "en"
+            if analysis.text_length:
+                start = time.perf_counter()
+                try:
+                    with time_limit(stage_budget("language")):
+                        language = self.language_detector.vote(analysis.language.windows())
+                except StageTimeout:
+                    analysis.skip_stage("language")
+                    language = None
+                analysis.add_timing("detect_language", time.perf_counter() - start)
+            if language is not None:
+                results["detect_language"] = language
+        if "extract_organizations" in stages and "ner" not in analysis.skipped_stages:
+            results["extract_organizations"] = organizations
+        return {stage: {"version": STAGE_VERSIONS[stage], "result": result} for stage, result in results.items()}
+    
+    def metadata_from_stages(self, stage_results: Dict[str, dict], filename: str,
+                             analysis: DocumentAnalysis) -> Dict[str, Any]:
+        """Assemble the metadata dictionary from stage results, stored or fresh."""
+        results = {stage: entry["result"] for stage, entry in stage_results.items()}
+        metrics = results.get("text_metrics") or TextStats().metrics()
+        matched_groups = {tuple(group) for group in results.get("match_keywords", [])}
+        
+        # Entities: NER over the head of the document, regex matches from every page
+        entities = self._merge_entities(
+            results.get("extract_organizations", []),
+            results.get("extract_entities") or EntityAccumulator().result()
+        )
         
         # Calculate processing time
-        processing_time = (datetime.utcnow() - start_time).total_seconds()
-        
-        # Calculate additional useful metrics
-        sentences = [s.strip() for s in extracted_text.split('.') if s.strip()]
-        sentence_count = len(sentences)
-        avg_words_per_sentence = round(word_count / sentence_count, 2) if sentence_count > 0 else 0
-        
-        # Extract summary (first few sentences)
-        summary = '. '.join(sentences[:3]) + '.' if len(sentences) >= 3 else text_preview
+        processing_time = (datetime.utcnow() - analysis.started_at).total_seconds()
         
         return {
-            "page_count": page_count,
-            "word_count": word_count,
-            "sentence_count": sentence_count,
-            "avg_words_per_sentence": avg_words_per_sentence,
-            "language": language,
-            "document_type": document_type,
-            "extracted_text_preview": text_preview,
-            "summary": summary[:300],  # First 300 chars of summary
+            "page_count": results.get("extraction", {}).get("page_count", analysis.page_count),
+            "word_count": metrics["word_count"],
+            "sentence_count": metrics["sentence_count"],
+            "avg_words_per_sentence": metrics["avg_words_per_sentence"],
+            "language": results.get("detect_language"),
+            "document_type": self._classify_document(matched_groups, filename),
+            "extracted_text_preview": metrics["extracted_text_preview"],
+            "summary": metrics["summary"],  # First 300 chars of summary
             "entities": entities,
             "processing_time_seconds": round(processing_time, 2),
-            "text_length": len(extracted_text),
+            "text_length": metrics["text_length"],
             "has_structured_data": bool(entities.get("dates") or entities.get("amounts") or entities.get("emails")),
-            "content_categories": self._categorize_content(extracted_text, entities)
+            "content_categories": self._categories_from_groups(matched_groups),
+            # What the file structure says, e.g. a PDF's title and producer
+            "document_info": results.get("extract_document_info", {}),
+            # Stages that ran over their time budget; the metadata is partial when not empty
+            "skipped_stages": list(analysis.skipped_stages),
+            # Seconds per stage, keyed by DocumentProcessor function name
+            "stage_timings": {stage: round(seconds, 4) for stage, seconds in analysis.stage_timings.items()},
         }
     
-    def _categorize_content(self, text: str, entities: Dict[str, list]) -> list:
+    @staticmethod
+    def stale_stages(stage_results: Optional[Dict[str, dict]]) -> List[str]:
+        """
+        Stages whose stored result is missing or from another version. When the
+        text itself is stale or was only partly extracted, that is every stage.
+        """
+        stage_results = stage_results or {}
+        stale = [
+            stage for stage, version in STAGE_VERSIONS.items()
+            if (stage_results.get(stage) or {}).get("version") != version
+        ]
+        extraction = (stage_results.get("extraction") or {}).get("result") or {}
+        if "extraction" in stale or not extraction.get("complete"):
+            return list(STAGE_VERSIONS)
+        return stale
+    
+    def reprocess(self, file_path: str, filename: str, stage_results: Optional[Dict[str, dict]],
+                  stored_pages: Optional[Iterable[str]] = None,
+                  text_writer: Optional[PageTextWriter] = None) -> Tuple[Dict[str, Any], Dict[str, dict], List[str]]:
+        """
+        Rerun only the stale stages of a processed document, reusing the stored
+        results of the others. The text comes from ``stored_pages`` unless it has
+        to be extracted again, in which case it also goes to ``text_writer``.
+        Returns the metadata, the updated stage results and the stages that ran.
+        """
+        stale = self.stale_stages(stage_results)
+        if "extraction" in stale or stored_pages is None:
+            stale = list(STAGE_VERSIONS)
+            previous = {}
+            analysis = self.analyze_document(file_path, filename, text_writer=text_writer)
+        else:
+            previous = {stage: entry for stage, entry in stage_results.items() if stage in STAGE_VERSIONS}
+            analysis = self.analyze_stored_pages(stored_pages, stale)
+            if "extract_document_info" in stale:
+                start = time.perf_counter()
+                analysis.document_info = self.extract_document_info(file_path, filename)
+                analysis.add_timing("extract_document_info", time.perf_counter() - start)
+        organizations = self.run_ner([analysis])[0] if "extract_organizations" in stale else []
+        results = {**previous, **self.stage_results(analysis, organizations, stale)}
+        return self.metadata_from_stages(results, filename, analysis), results, stale
+    
+    def _categorize_content(self, text: str, entities: Dict[str, list], matched_groups: Optional[set] = None) -> list:
         """Categorize document content based on keywords and entities."""
-        categories = []
-        text_lower = text.lower()
-        
-        # Financial documents
-        if any(kw in text_lower for kw in ['invoice', 'payment', 'bill', 'amount due', 'total', 'subtotal']):
-            categories.append("financial")
-        
-        # Technical documents
-        if any(kw in text_lower for kw in ['api', 'database', 'server', 'code', 'programming', 'software', 'architecture']):
-            categories.append("technical")
-        
-        # Legal documents
-        if any(kw in text_lower for kw in ['contract', 'agreement', 'terms', 'legal', 'party', 'obligation']):
-            categories.append("legal")
-        
-        # Business documents
-        if any(kw in text_lower for kw in ['business', 'company', 'organization', 'strategy', 'market']):
-            categories.append("business")
-        
-        # Academic/Educational
-        if any(kw in text_lower for kw in ['research', 'study', 'analysis', 'paper', 'thesis', 'university']):
-            categories.append("academic")
-        
-        return categories
+        if matched_groups is None:
+            matched_groups = self.match_keywords(text)
+        return self._categories_from_groups(matched_groups)
+    
+    def _categories_from_groups(self, matched_groups: set) -> list:
+        """Content categories whose keyword group was found, in a fixed order."""
+        return [category for category, _ in CONTENT_CATEGORY_KEYWORDS if ("category", category) in matched_groups]
+
 
+# Built-in extractors; unsupported binary formats are registered in app.services.extractors
+EXTRACTORS.register(
+    "pdf", DocumentProcessor.iter_pdf_pages, signatures=[b"%PDF-"], extensions=[".pdf"],
+    info=DocumentProcessor.read_pdf_info,
+)
+EXTRACTORS.register(
+    "image",
+    DocumentProcessor.iter_image_pages,
+    signatures=[
+        b"\x89PNG\r\n\x1a\n", b"\xff\xd8\xff", b"GIF87a", b"GIF89a", b"BM",
+        b"II*\x00", b"MM\x00*",
+    ],
+)
+EXTRACTORS.register("text", DocumentProcessor.iter_text_pages, extensions=[".txt", ".md"])
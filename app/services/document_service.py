@@ -3,10 +3,12 @@ Document service for document management and processing.
 """
 import os
 import uuid
+import hashlib
 from pathlib import Path
-from typing import Optional, List, Tuple
+from datetime import datetime
+from typing import Dict, Iterable, Optional, List, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, bindparam, update
 from fastapi import UploadFile, HTTPException, status
 
 from app.config import settings
@@ -14,15 +16,22 @@ from app.models.document import Document, DocumentStatus
 from app.models.user import User
 from app.services.tenant_service import TenantService
 
+# Uploads are copied to storage (and hashed) in chunks of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Columns a status update sets when given; left unchanged when None
+STATUS_UPDATE_COLUMNS = ("extracted_metadata", "error_message", "processor_version", "stage_results", "processed_at")
+
 
 class DocumentService:
     """Service for document operations."""
     
     @staticmethod
-    def save_uploaded_file(file: UploadFile, tenant_id: int, user_id: int) -> Tuple[str, str]:
+    def save_uploaded_file(file: UploadFile, tenant_id: int, user_id: int) -> Tuple[str, str, str]:
         """
-        Save uploaded file to storage and return file path and filename.
-        Returns: (file_path, stored_filename)
+        Save uploaded file to storage and return file path, filename and content hash.
+        The file is hashed while it is written, so it is only read once.
+        Returns: (file_path, stored_filename, content_hash)
         """
         # Create tenant-specific directory
         storage_path = Path(settings.storage_path)
@@ -35,11 +44,13 @@ class DocumentService:
         file_path = tenant_dir / stored_filename
         
         # Save file
+        digest = hashlib.sha256()
         with open(file_path, "wb") as f:
-            content = file.file.read()
-            f.write(content)
+            for chunk in iter(lambda: file.file.read(UPLOAD_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                f.write(chunk)
         
-        return str(file_path), stored_filename
+        return str(file_path), stored_filename, digest.hexdigest()
     
     @staticmethod
     def create_document(
@@ -52,7 +63,7 @@ class DocumentService:
         Create a document record and save the file.
         """
         # Save file
-        file_path, stored_filename = DocumentService.save_uploaded_file(file, tenant_id, user_id)
+        file_path, stored_filename, content_hash = DocumentService.save_uploaded_file(file, tenant_id, user_id)
         
         # Get file size
         file_size = os.path.getsize(file_path)
@@ -64,6 +75,7 @@ class DocumentService:
             file_path=file_path,
             file_size=file_size,
             mime_type=file.content_type,
+            content_hash=content_hash,
             status=DocumentStatus.PENDING,
             tenant_id=tenant_id,
             uploaded_by_user_id=user_id
@@ -95,6 +107,32 @@ class DocumentService:
         
         return document
     
+    @staticmethod
+    def find_processed_duplicate(
+        db: Session,
+        tenant_id: int,
+        content_hash: str,
+        processor_version: str,
+        exclude_document_id: Optional[int] = None
+    ) -> Optional[Document]:
+        """
+        Find a completed document of the same tenant with identical content,
+        processed by the given processor version.
+        Never looks across tenants.
+        """
+        query = db.query(Document).filter(
+            and_(
+                Document.tenant_id == tenant_id,  # Tenant isolation - REQUIRED
+                Document.content_hash == content_hash,
+                Document.processor_version == processor_version,
+                Document.status == DocumentStatus.COMPLETED,
+                Document.extracted_metadata.isnot(None)
+            )
+        )
+        if exclude_document_id is not None:
+            query = query.filter(Document.id != exclude_document_id)
+        return query.order_by(Document.processed_at.desc()).first()
+    
     @staticmethod
     def list_documents(
         db: Session,
@@ -132,7 +170,9 @@ class DocumentService:
         tenant_id: int,
         status: DocumentStatus,
         extracted_metadata: Optional[dict] = None,
-        error_message: Optional[str] = None
+        error_message: Optional[str] = None,
+        processor_version: Optional[str] = None,
+        stage_results: Optional[dict] = None
     ) -> Optional[Document]:
         """
         Update document processing status.
@@ -146,13 +186,71 @@ class DocumentService:
             document.extracted_metadata = extracted_metadata
         if error_message is not None:
             document.error_message = error_message
+        if processor_version is not None:
+            document.processor_version = processor_version
+        if stage_results is not None:
+            document.stage_results = stage_results
         
         if status == DocumentStatus.COMPLETED:
-            from datetime import datetime
             document.processed_at = datetime.utcnow()
         
         db.commit()
         db.refresh(document)
         
         return document
+    
+    @staticmethod
+    def claim_documents(db: Session, keys: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], Document]:
+        """
+        Move a batch of documents to PROCESSING with one UPDATE and load them
+        with one query. ``keys`` are ``(document_id, tenant_id)`` pairs; a
+        document only matches together with its own tenant.
+        Returns the documents found, keyed the same way.
+        """
+        ids_by_tenant: Dict[int, set] = {}
+        for document_id, tenant_id in keys:
+            ids_by_tenant.setdefault(tenant_id, set()).add(document_id)
+        if not ids_by_tenant:
+            return {}
+        # CRITICAL: every id is matched within its own tenant only
+        condition = or_(*(
+            and_(Document.tenant_id == tenant_id, Document.id.in_(sorted(ids)))
+            for tenant_id, ids in ids_by_tenant.items()
+        ))
+        db.query(Document).filter(condition).update(
+            {Document.status: DocumentStatus.PROCESSING}, synchronize_session=False
+        )
+        db.commit()
+        return {(document.id, document.tenant_id): document for document in db.query(Document).filter(condition)}
+    
+    @staticmethod
+    def bulk_update_status(db: Session, updates: List[dict]):
+        """
+        Write the status of several documents in one transaction.
+        
+        Each update has ``document_id``, ``tenant_id`` and ``status``, plus any
+        of the columns ``update_document_status`` sets (``STATUS_UPDATE_COLUMNS``);
+        as there, a column that is None or missing keeps its value. Updates that
+        set the same columns go out as one executemany UPDATE.
+        """
+        groups: Dict[Tuple[str, ...], List[dict]] = {}
+        for item in updates:
+            row = {column: item.get(column) for column in STATUS_UPDATE_COLUMNS if item.get(column) is not None}
+            if item["status"] == DocumentStatus.COMPLETED:
+                row.setdefault("processed_at", datetime.utcnow())
+            row.update(b_document_id=item["document_id"], b_tenant_id=item["tenant_id"], status=item["status"])
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        
+        table = Document.__table__
+        # The columns to set come from the keys of each group's rows
+        statement = update(table).where(
+            and_(
+                table.c.id == bindparam("b_document_id"),
+                table.c.tenant_id == bindparam("b_tenant_id")  # Tenant isolation - REQUIRED
+            )
+        )
+        for rows in groups.values():
+            db.execute(statement, rows)
+        if groups:
+            db.commit()
 
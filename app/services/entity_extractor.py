@@ -0,0 +1,326 @@
+"""
+Compiled single-pass entity extraction engine.
+
+Every entity pattern is compiled once at import. Instead of running one
+``re.findall`` per pattern over the whole text, a single trigger scan over the
+case-folded text finds the positions where an entity can start, and each
+pattern is only matched at those positions. Per pattern the matches are the
+same leftmost, non-overlapping ones ``re.findall`` would return.
+
+Text too long to hold at once is scanned in chunks with ``ChunkedScan``,
+which rescans a margin around every chunk boundary.
+"""
+import re
+import heapq
+from typing import Dict, List, Iterable, Optional
+
+# Characters rescanned on each side of a chunk boundary; longer matches may be cut short
+CHUNK_OVERLAP_CHARS = 1024
+
+# Maximum number of unique values kept per category
+ENTITY_LIMITS = {
+    "dates": 15,
+    "amounts": 15,
+    "companies": 15,
+    "emails": 10,
+    "phone_numbers": 10,
+    "urls": 10,
+    "keywords": 20,
+}
+
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+_COMPANY_SUFFIXES = (
+    'Inc', 'Corp', 'LLC', 'Ltd', 'Limited', 'Company', 'Co', 'Corporation',
+    'Technologies', 'Systems', 'Solutions', 'Group', 'Industries',
+)
+_KNOWN_COMPANIES = (
+    'Amazon', 'Google', 'Microsoft', 'Apple', 'Facebook', 'Meta', 'Twitter', 'LinkedIn',
+    'Netflix', 'Uber', 'Airbnb', 'Salesforce', 'Oracle', 'IBM', 'Intel', 'NVIDIA',
+    'Adobe', 'PayPal', 'Stripe', 'Shopify',
+)
+_KEYWORDS = (
+    'cloud', 'database', 'server', 'client', 'API', 'REST', 'GraphQL', 'microservices',
+    'container', 'docker', 'kubernetes', 'scalability', 'performance', 'security',
+    'authentication', 'authorization', 'encryption', 'blockchain', 'AI', 'machine learning',
+    'data science', 'analytics', 'business intelligence',
+)
+
+_MONTH_ALT = '|'.join(_MONTHS)
+
+# (name, category, pattern, flags)
+ENTITY_PATTERNS = [
+    ("iso_date", "dates", r'\b\d{4}-\d{2}-\d{2}\b', re.IGNORECASE),  # YYYY-MM-DD
+    ("slash_date", "dates", r'\b\d{1,2}/\d{1,2}/\d{4}\b', re.IGNORECASE),  # MM/DD/YYYY
+    ("dash_date", "dates", r'\b\d{1,2}-\d{1,2}-\d{4}\b', re.IGNORECASE),  # MM-DD-YYYY
+    ("month_date", "dates", r'\b(?:' + _MONTH_ALT + r')[a-z]*\s+\d{1,2},?\s+\d{4}\b', re.IGNORECASE),  # Month DD, YYYY
+    ("day_month_date", "dates", r'\b\d{1,2}\s+(?:' + _MONTH_ALT + r')[a-z]*\s+\d{4}\b', re.IGNORECASE),  # DD Month YYYY
+    ("dollar", "amounts", r'\$[\d,]+\.?\d{0,2}', re.IGNORECASE),  # $1,234.56
+    ("usd_prefix", "amounts", r'USD\s*[\d,]+\.?\d{0,2}', re.IGNORECASE),  # USD 1234.56
+    ("currency_suffix", "amounts", r'[\d,]+\.?\d{0,2}\s*(?:dollars|USD|EUR|GBP)', re.IGNORECASE),  # 1234.56 dollars
+    ("euro", "amounts", r'€[\d,]+\.?\d{0,2}', re.IGNORECASE),  # Euro
+    ("pound", "amounts", r'£[\d,]+\.?\d{0,2}', re.IGNORECASE),  # Pound
+    ("email", "emails", r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', 0),
+    ("us_phone", "phone_numbers", r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b', 0),  # 123-456-7890
+    ("paren_phone", "phone_numbers", r'\b\(\d{3}\)\s?\d{3}[-.]?\d{4}\b', 0),  # (123) 456-7890
+    ("intl_phone", "phone_numbers", r'\b\+?\d{1,3}[-.\s]?\d{1,4}[-.\s]?\d{1,4}[-.\s]?\d{1,9}\b', 0),  # International
+    ("url", "urls", r'https?://[^\s<>"{}|\\^`\[\]]+', 0),
+    ("company_name", "companies",
+     r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,3}(?:\s+(?:' + '|'.join(_COMPANY_SUFFIXES) + r'))\.?\b', re.IGNORECASE),
+    ("known_company", "companies", r'\b(?:' + '|'.join(_KNOWN_COMPANIES) + r')\b', re.IGNORECASE),  # Known companies
+    ("keyword", "keywords", r'\b(?:' + '|'.join(_KEYWORDS) + r')\b', re.IGNORECASE),
+]
+
+_PATTERNS = {name: re.compile(pattern, flags) for name, _, pattern, flags in ENTITY_PATTERNS}
+_CATEGORY = {name: category for name, category, _, _ in ENTITY_PATTERNS}
+
+# Patterns tried where a run of digits starts
+_NUMBER_PATTERNS = ("iso_date", "slash_date", "dash_date", "day_month_date", "us_phone", "intl_phone")
+_COMPANY_PATTERNS = ("company_name", "known_company")
+_EMAIL_LOCAL_CHARS = frozenset('abcdefghijklmnopqrstuvwxyz0123456789._%+-')
+
+
+def _alternation(words) -> str:
+    """Build a prefix-factored regex alternation so the scanner never retries a shared prefix."""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+    
+    def build(node) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            body = '(?:' + body + ')?'
+        return body
+    
+    return build(trie)
+
+
+def _lower_all(words) -> list:
+    return [word.lower() for word in words]
+
+
+# One scan over the lowercased text finds every position where an entity can start.
+# Group names are the pattern to try there; "number", "email" and "company_name"
+# need extra work to find their candidate positions. No word belongs to two of the
+# vocabularies, so one group per position is enough.
+_TRIGGERS = re.compile(
+    r'(?=[\d,$€£@uh(+])(?:'
+    r'(?P<number>\d[\d,]*|,[\d,]*\d[\d,]*|,+(?=\.?\d{0,2}\s*(?:dollars|usd|eur|gbp)))'
+    r'|(?P<dollar>\$)|(?P<euro>€)|(?P<pound>£)'
+    r'|(?P<usd_prefix>usd)'
+    r'|(?P<url>https?://)'
+    r'|(?P<email>@)'
+    r'|\b(?:(?P<paren_phone>\((?=\d))|(?P<intl_phone>\+(?=\d)))'
+    r')'
+    r'|\b(?=[a-z])(?:'
+    r'(?P<month_date>(?=' + _alternation(_lower_all(_MONTHS)) + r'[a-z]*\s+\d))'
+    r'|(?P<keyword>(?=' + _alternation(_lower_all(_KEYWORDS)) + r'\b))'
+    r'|(?P<known_company>(?=' + _alternation(_lower_all(_KNOWN_COMPANIES)) + r'\b))'
+    r'|(?P<company_name>(?=' + _alternation(_lower_all(_COMPANY_SUFFIXES)) + r'\b))'
+    r')'
+)
+
+# Characters for which case-insensitive matching and str.lower() disagree
+_CASEFOLD_SPECIAL = re.compile('[ıſ]')
+
+
+class EntityExtractor:
+    """Extract regex-based entities from text with a single trigger scan."""
+    
+    def scan(self, text: str, include_companies: bool = True,
+             start: int = 0, stop: Optional[int] = None) -> Dict[str, List[str]]:
+        """
+        Return raw matches per category, in the same form ``re.findall`` gives.
+        Company matches are already filtered and keywords lowercased.
+        With ``start`` and ``stop``, only matches starting in that range are
+        returned; the text around it is still read, as context.
+        """
+        matches = {category: [] for category in ENTITY_LIMITS}
+        if not text:
+            return matches
+        stop = len(text) if stop is None else stop
+        
+        lowered = text.lower()
+        if len(lowered) == len(text) and not _CASEFOLD_SPECIAL.search(text):
+            found = self._scan_triggers(text, lowered, include_companies, start, stop)
+        else:
+            # Offsets would not line up with the lowered copy; scan pattern by pattern
+            found = self._scan_patterns(text, include_companies, start, stop)
+        
+        for name, values in found.items():
+            matches[_CATEGORY[name]].extend(values)
+        
+        matches["companies"] = [c for c in matches["companies"] if len(c.split()) > 1 or len(c) > 4]
+        matches["keywords"] = [k.lower() for k in matches["keywords"]]
+        return matches
+    
+    def _scan_patterns(self, text: str, include_companies: bool,
+                       start: int = 0, stop: Optional[int] = None) -> Dict[str, List[str]]:
+        """Reference path: one findall per pattern."""
+        stop = len(text) if stop is None else stop
+        return {
+            name: [m.group() for m in pattern.finditer(text) if start <= m.start() < stop]
+            for name, pattern in _PATTERNS.items()
+            if include_companies or name not in _COMPANY_PATTERNS
+        }
+    
+    def _scan_triggers(self, text: str, lowered: str, include_companies: bool,
+                       start: int = 0, stop: Optional[int] = None) -> Dict[str, List[str]]:
+        """Trigger-driven path emulating per-pattern findall semantics."""
+        found = {name: [] for name in _PATTERNS}
+        # End of the last match per pattern: findall resumes scanning there
+        resume = dict.fromkeys(_PATTERNS, 0)
+        # Last candidate position tried for patterns found by walking backwards
+        tried = {"email": -1, "company_name": -1}
+        stop = len(text) if stop is None else stop
+        
+        def attempt(name: str, pos: int) -> bool:
+            if pos < resume[name]:
+                return False
+            m = _PATTERNS[name].match(text, pos)
+            if m is None:
+                return False
+            # Matches outside the range still move findall's resume point
+            if start <= pos < stop:
+                found[name].append(m.group())
+            resume[name] = m.end()
+            return True
+        
+        for trigger in _TRIGGERS.finditer(lowered):
+            kind = trigger.lastgroup
+            position = trigger.start()
+            
+            if kind == "number":
+                attempt("currency_suffix", position)
+                offset = position
+                for run in trigger.group().split(','):
+                    if run:
+                        for name in _NUMBER_PATTERNS:
+                            attempt(name, offset)
+                    offset += len(run) + 1
+            elif kind == "email":
+                # The address starts somewhere in the run of local-part characters before '@'
+                first = position
+                while first > 0 and lowered[first - 1] in _EMAIL_LOCAL_CHARS:
+                    first -= 1
+                for pos in range(max(first, tried["email"] + 1), position):
+                    if attempt("email", pos):
+                        break
+                tried["email"] = position
+            elif kind == "company_name":
+                if include_companies:
+                    # A company name ends with this suffix; it starts two to four words back
+                    for pos in reversed(_preceding_words(lowered, position)[1:]):
+                        if pos > tried["company_name"]:
+                            attempt("company_name", pos)
+                            tried["company_name"] = pos
+            elif include_companies or kind != "known_company":
+                attempt(kind, position)
+        
+        return found
+    
+    def extract(self, text: str, include_companies: bool = True) -> Dict[str, List[str]]:
+        """Extract entities and apply the per-category limits."""
+        return limit_entities(self.scan(text, include_companies))
+
+
+def _preceding_words(lowered: str, pos: int, limit: int = 4) -> List[int]:
+    """Start offsets of up to ``limit`` whitespace-separated words before ``pos``, nearest first."""
+    starts = []
+    end = pos
+    while len(starts) < limit:
+        gap = end
+        while gap > 0 and lowered[gap - 1].isspace():
+            gap -= 1
+        if gap == end:
+            break
+        word = gap
+        while word > 0 and 'a' <= lowered[word - 1] <= 'z':
+            word -= 1
+        if gap - word < 2:
+            break
+        starts.append(word)
+        end = word
+    return starts
+
+
+def top_unique(values: Iterable[str], limit: int) -> List[str]:
+    """Equivalent to ``sorted(set(values))[:limit]`` without sorting every value."""
+    return heapq.nsmallest(limit, set(values))
+
+
+class EntityAccumulator:
+    """
+    Keep the limited result per category while matches arrive in pieces.
+    
+    Since only the smallest unique values survive the limit, merging each new
+    batch into the kept values gives the same result as limiting all matches at once.
+    """
+    
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        self.limits = limits or ENTITY_LIMITS
+        self.values: Dict[str, List[str]] = {category: [] for category in self.limits}
+    
+    def add(self, matches: Dict[str, List[str]]):
+        """Merge raw matches, as returned by ``EntityExtractor.scan``."""
+        for category, values in matches.items():
+            if values:
+                self.values[category] = top_unique(self.values[category] + values, self.limits[category])
+    
+    def result(self) -> Dict[str, List[str]]:
+        return {category: list(values) for category, values in self.values.items()}
+
+
+class ChunkedScan:
+    """
+    Scan one text that arrives in chunks, with the matches a scan of the whole
+    text gives, as long as no match is longer than ``overlap`` characters.
+    
+    Matches are only taken up to ``overlap`` characters before the end of what
+    has arrived; that end is scanned again with the next chunk, after
+    ``overlap`` characters of context for word boundaries and for entities
+    found by looking back from a trigger, such as e-mail addresses.
+    """
+    
+    def __init__(self, extractor: EntityExtractor, overlap: int = CHUNK_OVERLAP_CHARS):
+        self.extractor = extractor
+        self.overlap = overlap
+        self._carry = ""
+        # Leading characters of the carry whose matches were already taken
+        self._context = 0
+    
+    def feed(self, chunk: str) -> Dict[str, List[str]]:
+        """Raw matches, as from ``EntityExtractor.scan``, that are complete once ``chunk`` is added."""
+        text = self._carry + chunk
+        stop = len(text) - self.overlap
+        if stop <= self._context:
+            self._carry = text
+            return {}
+        matches = self.extractor.scan(text, start=self._context, stop=stop)
+        keep = max(0, stop - self.overlap)
+        self._carry = text[keep:]
+        self._context = stop - keep
+        return matches
+    
+    def finish(self) -> Dict[str, List[str]]:
+        """The matches left at the end of the text; the scan is then ready for a new text."""
+        text, start = self._carry, self._context
+        self._carry = ""
+        self._context = 0
+        return self.extractor.scan(text, start=start)
+    
+    @property
+    def pending(self) -> bool:
+        """Whether text is held back for ``finish``."""
+        return len(self._carry) > self._context
+
+
+def limit_entities(matches: Dict[str, List[str]], limits: Optional[Dict[str, int]] = None) -> Dict[str, List[str]]:
+    """De-duplicate, sort and cap every category."""
+    limits = limits or ENTITY_LIMITS
+    return {category: top_unique(values, limits[category]) for category, values in matches.items()}
@@ -0,0 +1,145 @@
+"""
+Registry of text extractors, chosen by sniffing a file's leading bytes.
+
+The extension of an uploaded file says little about its content, so the
+extractor is picked from the magic bytes at the start of the file. Known
+binary formats we cannot extract text from, and anything else that looks
+binary, are rejected after reading a few kilobytes instead of being read
+in full and scanned as text.
+
+New formats plug in with ``EXTRACTORS.register(...)``; an extract function
+takes the ``DocumentProcessor`` and the file path and yields the text page
+by page; the rest of a page too long to hold at once follows in
+``PageContinuation`` chunks. An optional info function takes the same
+arguments and returns what the file structure tells without extracting
+text (page count, title, ...).
+"""
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple, Union
+from pathlib import Path
+
+# How much of a file is read to pick its extractor
+SNIFF_BYTES = 8192
+
+# A signature is either a prefix or an (offset, bytes) pair
+Signature = Union[bytes, Tuple[int, bytes]]
+ExtractFunction = Callable[..., Iterator[str]]
+InfoFunction = Callable[..., Dict[str, Any]]
+
+# Unicode byte order marks: text, even though UTF-16/32 text contains NUL bytes
+_TEXT_BOMS = (b"\xef\xbb\xbf", b"\xff\xfe", b"\xfe\xff")
+
+
+class PageContinuation(str):
+    """
+    More text of the page before it, for pages too long to read at once: it
+    is appended without a separator and does not count as a page.
+    """
+
+
+class UnsupportedFormatError(ValueError):
+    """The file is in a format no registered extractor handles."""
+    
+    def __init__(self, format_name: str):
+        super().__init__(f"Unsupported file format: {format_name}")
+        self.format_name = format_name
+
+
+class Extractor:
+    """One registered format: how to recognize it and how to extract its text."""
+    
+    def __init__(self, name: str, extract: Optional[ExtractFunction],
+                 signatures: Iterable[Signature] = (), extensions: Iterable[str] = (),
+                 info: Optional[InfoFunction] = None):
+        self.name = name
+        self.extract = extract
+        self.info = info
+        self.signatures = [sig if isinstance(sig, tuple) else (0, sig) for sig in signatures]
+        self.extensions = {ext.lower() for ext in extensions}
+    
+    @property
+    def supported(self) -> bool:
+        return self.extract is not None
+    
+    def match_length(self, head: bytes, binary: bool) -> int:
+        """Length of the longest signature found in ``head``, 0 if none."""
+        return max(
+            (
+                len(magic) for offset, magic in self.signatures
+                if head[offset:offset + len(magic)] == magic and (binary or not _weak_signature(offset, magic))
+            ),
+            default=0,
+        )
+
+
+class ExtractorRegistry:
+    """Pick an extractor for a file from its magic bytes, falling back to its extension."""
+    
+    def __init__(self, default: Optional[str] = None):
+        self.default = default
+        self._extractors: Dict[str, Extractor] = {}
+    
+    def register(self, name: str, extract: ExtractFunction,
+                 signatures: Iterable[Signature] = (), extensions: Iterable[str] = (),
+                 info: Optional[InfoFunction] = None):
+        """Add an extractor, replacing any earlier one of the same name."""
+        self._extractors[name] = Extractor(name, extract, signatures, extensions, info)
+    
+    def register_unsupported(self, name: str, signatures: Iterable[Signature]):
+        """Recognize a format only to reject it quickly."""
+        self._extractors[name] = Extractor(name, None, signatures)
+    
+    def get(self, name: str) -> Extractor:
+        return self._extractors[name]
+    
+    def identify(self, head: bytes, filename: str = "") -> Extractor:
+        """
+        The extractor for a file starting with ``head``. Raises
+        UnsupportedFormatError for known unsupported formats and binary data.
+        """
+        binary = _looks_binary(head)
+        best, best_length = None, 0
+        for extractor in self._extractors.values():
+            length = extractor.match_length(head, binary)
+            if length > best_length:
+                best, best_length = extractor, length
+        if best is None and binary:
+            raise UnsupportedFormatError("binary data")
+        if best is None:
+            extension = Path(filename).suffix.lower()
+            best = next((e for e in self._extractors.values() if extension in e.extensions), None)
+        if best is None and self.default is not None:
+            best = self._extractors[self.default]
+        if best is None or not best.supported:
+            raise UnsupportedFormatError(best.name if best else "unknown")
+        return best
+    
+    def sniff(self, file_path: str, filename: str = "") -> Extractor:
+        """Read the start of ``file_path`` and identify its extractor."""
+        with open(file_path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+        return self.identify(head, filename or file_path)
+
+
+def _looks_binary(head: bytes) -> bool:
+    return b"\x00" in head and not head.startswith(_TEXT_BOMS)
+
+
+def _weak_signature(offset: int, magic: bytes) -> bool:
+    # Short printable signatures such as "BM" or "MZ" also start ordinary text
+    # ("BMW annual report"), so they only count for binary content
+    return (offset > 0 or len(magic) < 5) and all(32 <= byte < 127 for byte in magic)
+
+
+EXTRACTORS = ExtractorRegistry(default="text")
+
+# Formats that are recognized only to be rejected without reading them
+EXTRACTORS.register_unsupported("zip archive", [b"PK\x03\x04", b"PK\x05\x06"])
+EXTRACTORS.register_unsupported("gzip archive", [b"\x1f\x8b"])
+EXTRACTORS.register_unsupported("bzip2 archive", [b"BZh"])
+EXTRACTORS.register_unsupported("xz archive", [b"\xfd7zXZ\x00"])
+EXTRACTORS.register_unsupported("7z archive", [b"7z\xbc\xaf\x27\x1c"])
+EXTRACTORS.register_unsupported("rar archive", [b"Rar!\x1a\x07"])
+EXTRACTORS.register_unsupported("tar archive", [(257, b"ustar")])
+EXTRACTORS.register_unsupported("ole2 document", [b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"])
+EXTRACTORS.register_unsupported("executable", [b"\x7fELF", b"MZ", b"\xcf\xfa\xed\xfe", b"\xca\xfe\xba\xbe"])
+EXTRACTORS.register_unsupported("media", [b"ID3", b"OggS", b"fLaC", (4, b"ftyp")])
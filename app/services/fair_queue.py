@@ -0,0 +1,207 @@
+"""
+Per-tenant fair scheduling of the document queue.
+
+A plain RQ queue is one FIFO list, so a tenant that uploads ten thousand
+documents puts every other tenant's next upload behind its whole backlog.
+``FairQueue`` keeps one list of job ids per tenant
+(``rq:queue:<name>:tenant:<id>``) plus a set of the tenants with waiting
+jobs, and workers take jobs from those lists by deficit round robin: each
+turn a tenant earns its weight in credits (``TENANT_QUEUE_WEIGHTS``, 1 by
+default) and every job costs one, so a tenant of weight 2 gets two jobs for
+each job of a tenant of weight 1, however long either backlog is.
+
+Every worker process keeps its own deficits; all of them cycle over the same
+tenants, so service evens out across the pool without shared state. Job ids
+without a tenant (e.g. jobs RQ itself requeues) stay in the queue's own list,
+which takes its turn like a tenant of weight 1.
+"""
+import math
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from rq import Queue
+from rq.exceptions import DequeueTimeout, NoSuchJobError
+from rq.job import Job
+from rq.utils import as_text
+
+from app.config import settings
+
+# Job meta key holding the tenant a job is scheduled for
+TENANT_META_KEY = "tenant_id"
+
+# Scheduler name of the queue's own list, for jobs without a tenant
+SHARED_LANE = ""
+
+# Forget a tenant only while its list is still empty; an enqueue may have refilled it since the LPOP
+_RETIRE_TENANT = """
+if redis.call('llen', KEYS[2]) == 0 then
+    return redis.call('srem', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+
+class DeficitRoundRobin:
+    """
+    Deficit round robin over tenants, with one credit per job.
+    
+    Tenants are served in the order they became active. On its turn a tenant
+    earns ``weight`` credits and is served until fewer than one is left;
+    fractions carry over, so a weight of 0.5 means a job every other round.
+    A tenant whose queue ran empty leaves the rotation and loses its credits.
+    """
+    
+    def __init__(self, weights: Optional[Dict[str, float]] = None, default_weight: float = 1.0):
+        self.weights = {str(tenant): weight for tenant, weight in (weights or {}).items()}
+        self.default_weight = default_weight
+        self._ring: deque = deque()
+        self._deficits: Dict[str, float] = {}
+        # Whether the tenant at the head of the ring has been credited for this turn
+        self._crediting_done = False
+    
+    def weight(self, tenant: str) -> float:
+        weight = self.weights.get(tenant, self.default_weight)
+        return weight if weight > 0 else self.default_weight
+    
+    def next_tenant(self, active: Iterable[str]) -> Optional[str]:
+        """Tenant to serve next among ``active``; None when there is none."""
+        self._sync(set(active))
+        if not self._ring:
+            return None
+        while True:
+            tenant = self._ring[0]
+            if not self._crediting_done:
+                self._deficits[tenant] += self.weight(tenant)
+                self._crediting_done = True
+            if self._deficits[tenant] >= 1:
+                self._deficits[tenant] -= 1
+                return tenant
+            self._ring.rotate(-1)
+            self._crediting_done = False
+    
+    def drop(self, tenant: str):
+        """Take a tenant whose queue is empty out of the rotation."""
+        if self._ring and self._ring[0] == tenant:
+            self._crediting_done = False
+        if tenant in self._deficits:
+            self._ring.remove(tenant)
+            del self._deficits[tenant]
+    
+    def _sync(self, active: set):
+        for tenant in [tenant for tenant in self._ring if tenant not in active]:
+            self.drop(tenant)
+        for tenant in sorted(active.difference(self._deficits)):
+            self._ring.append(tenant)
+            self._deficits[tenant] = 0.0
+
+
+class FairQueue(Queue):
+    """
+    RQ queue that keeps a list per tenant and hands out jobs by deficit round robin.
+    
+    Jobs are routed by ``job.meta["tenant_id"]``. Workers must use this class
+    as their ``queue_class``, so that ``dequeue_any`` picks tenants fairly;
+    queues listed first are still served first.
+    """
+    
+    def __init__(self, *args, weights: Optional[Dict[str, float]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tenants_key = f"{self.key}:tenants"
+        # Holds at most one token, pushed on enqueue, to wake a worker blocked while every list was empty
+        self.wake_key = f"{self.key}:wake"
+        if weights is None:
+            weights = settings.tenant_queue_weights
+        self.scheduler = DeficitRoundRobin(weights)
+        self._routes: Dict[str, str] = {}
+        self._retire_tenant = self.connection.register_script(_RETIRE_TENANT)
+    
+    def tenant_key(self, tenant: str) -> str:
+        """Redis list holding the waiting job ids of ``tenant``."""
+        return f"{self.key}:tenant:{tenant}" if tenant != SHARED_LANE else self.key
+    
+    def _enqueue_job(self, job: Job, pipeline=None, at_front: bool = False) -> Job:
+        # push_job_id only gets the id; remember the job's tenant until it is pushed
+        tenant = job.meta.get(TENANT_META_KEY)
+        self._routes[job.id] = str(tenant) if tenant is not None else SHARED_LANE
+        try:
+            return super()._enqueue_job(job, pipeline=pipeline, at_front=at_front)
+        finally:
+            self._routes.pop(job.id, None)
+    
+    def push_job_id(self, job_id: str, pipeline=None, at_front: bool = False):
+        tenant = self._routes.get(job_id, SHARED_LANE)
+        # Tenant list, active set and wake token change together
+        pipe = pipeline if pipeline is not None else self.connection.pipeline()
+        push = pipe.lpush if at_front else pipe.rpush
+        push(self.tenant_key(tenant), job_id)
+        if tenant != SHARED_LANE:
+            pipe.sadd(self.tenants_key, tenant)
+        pipe.lpush(self.wake_key, 1)
+        pipe.ltrim(self.wake_key, 0, 0)
+        if pipeline is None:
+            pipe.execute()
+    
+    def active_tenants(self) -> List[str]:
+        return [as_text(tenant) for tenant in self.connection.smembers(self.tenants_key)]
+    
+    @property
+    def count(self) -> int:
+        """Jobs waiting across every tenant."""
+        pipe = self.connection.pipeline(transaction=False)
+        pipe.llen(self.key)
+        for tenant in self.active_tenants():
+            pipe.llen(self.tenant_key(tenant))
+        return sum(pipe.execute())
+    
+    def remove(self, job_or_id: Union[Job, str], pipeline=None):
+        job_id = job_or_id.id if isinstance(job_or_id, self.job_class) else job_or_id
+        connection = pipeline if pipeline is not None else self.connection
+        for tenant in [SHARED_LANE, *self.active_tenants()]:
+            connection.lrem(self.tenant_key(tenant), 1, job_id)
+    
+    def pop_job_id(self) -> Optional[str]:
+        """Take the next job id in fair order, without blocking."""
+        active = set(self.active_tenants())
+        active.add(SHARED_LANE)
+        while True:
+            tenant = self.scheduler.next_tenant(active)
+            if tenant is None:
+                return None
+            job_id = self.connection.lpop(self.tenant_key(tenant))
+            if job_id is not None:
+                return as_text(job_id)
+            self.scheduler.drop(tenant)
+            active.discard(tenant)
+            if tenant != SHARED_LANE:
+                self._retire_tenant(keys=[self.tenants_key, self.tenant_key(tenant)], args=[tenant])
+    
+    @classmethod
+    def dequeue_any(cls, queues: List["FairQueue"], timeout: Optional[int], connection=None, job_class=None,
+                    serializer=None, death_penalty_class=None) -> Optional[Tuple[Job, "FairQueue"]]:
+        """
+        Same contract as ``Queue.dequeue_any``: the first queue with a job
+        wins, and within it the scheduler picks the tenant. With a timeout,
+        block until a job is enqueued on any of the queues or raise
+        ``DequeueTimeout``.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            for queue in queues:
+                job_id = queue.pop_job_id()
+                if job_id is None:
+                    continue
+                try:
+                    job = (job_class or queue.job_class).fetch(job_id, connection=queue.connection, serializer=serializer)
+                except NoSuchJobError:
+                    # Expired or deleted while waiting; look again
+                    break
+                return job, queue
+            else:
+                if deadline is None:
+                    return None
+                wake_keys = [queue.wake_key for queue in queues]
+                remaining = deadline - time.monotonic()
+                # RQ rejects a 0 timeout as infinite
+                if remaining <= 0 or queues[0].connection.blpop(wake_keys, max(1, math.ceil(remaining))) is None:
+                    raise DequeueTimeout(timeout, wake_keys)
@@ -0,0 +1,58 @@
+"""
+Shared matcher for the document classification keywords.
+
+Document type detection and content categorization ask the same kind of
+question: does any keyword of a group (a document type, a content category)
+occur in the text, with ``kw in text.lower()`` semantics? The matcher answers
+it for every group over one lowercased copy of the text, and each keyword is
+searched for at most once, whichever groups it belongs to.
+
+Keywords are looked up with ``str.__contains__``, a C-level search that on
+CPython beats a Python regex automaton over the same keywords. On top of it,
+what one lookup proves is reused: a group is settled by its first hit, a hit on
+'subtotal' also proves 'total', and a miss on 'terms' also rules out
+'terms and conditions'.
+"""
+from typing import Dict, Hashable, Iterable, Optional, Set
+
+
+class KeywordMatcher:
+    """Decide which keyword groups have at least one keyword in a text."""
+    
+    def __init__(self, groups: Dict[Hashable, Iterable[str]]):
+        self.groups = {name: tuple(keywords) for name, keywords in groups.items()}
+        keywords = {keyword for group in self.groups.values() for keyword in group}
+        self._contained = {
+            keyword: frozenset(other for other in keywords if other != keyword and other in keyword)
+            for keyword in keywords
+        }
+        self._containing = {
+            keyword: frozenset(other for other in keywords if other != keyword and keyword in other)
+            for keyword in keywords
+        }
+    
+    def match(self, text_lower: str, pending: Optional[Iterable[Hashable]] = None) -> Set[Hashable]:
+        """
+        Names of the groups with a keyword in ``text_lower``, which must already be
+        lowercased. With ``pending``, only those groups are checked.
+        """
+        present = set()
+        absent = set()
+        matched = set()
+        names = self.groups if pending is None else [name for name in self.groups if name in pending]
+        for name in names:
+            keywords = self.groups[name]
+            if any(keyword in present for keyword in keywords):
+                matched.add(name)
+                continue
+            for keyword in keywords:
+                if keyword in absent:
+                    continue
+                if keyword in text_lower:
+                    present.add(keyword)
+                    present |= self._contained[keyword]
+                    matched.add(name)
+                    break
+                absent.add(keyword)
+                absent |= self._containing[keyword]
+        return matched
@@ -0,0 +1,105 @@
+"""
+Express and bulk lanes for document jobs.
+
+A one-page receipt should not wait behind a 900-page scan, nor run under
+the timeout such a scan needs. Documents are sorted into a lane when they
+are enqueued, from what is cheap to know before processing: the file size,
+the file type (its first bytes, or the uploaded mime type) and, for PDFs and
+TIFFs small enough to be express candidates, the page count. Each lane has
+its own queue and job timeout, and ``WORKER_EXPRESS_PROCESSES`` pool
+workers serve only the express lane (see ``app.worker``).
+
+This module runs in the API process, so it reads files directly instead of
+importing the PDF or image libraries.
+"""
+import math
+import re
+import struct
+from typing import BinaryIO, Optional
+
+from app.config import settings
+from app.services.stage_budget import total_budget
+
+EXPRESS = "express"
+BULK = "bulk"
+
+# Job time outside the budgeted stages: status writes, the regex stages, storing the text
+JOB_OVERHEAD_SECONDS = 60
+
+# A page object of a PDF; "/Type /Pages" (the page tree) does not match
+_PDF_PAGE = re.compile(rb"/Type\s*/Page(?![A-Za-z])")
+
+
+def pdf_page_count(f: BinaryIO) -> Optional[int]:
+    """
+    Pages of a PDF, counted from its page objects. None when none are
+    visible, e.g. when they sit in compressed object streams.
+    """
+    f.seek(0)
+    return len(_PDF_PAGE.findall(f.read())) or None
+
+
+def tiff_frame_count(f: BinaryIO, limit: int) -> Optional[int]:
+    """
+    Frames of a TIFF, found by following its chain of image directories;
+    counting stops past ``limit``. None when the file is not a classic TIFF.
+    """
+    f.seek(0)
+    header = f.read(8)
+    if len(header) < 8 or header[:2] not in (b"II", b"MM"):
+        return None
+    order = "<" if header[:2] == b"II" else ">"
+    offset = struct.unpack(order + "I", header[4:])[0]
+    frames = 0
+    seen = set()
+    while offset and offset not in seen and frames <= limit:
+        seen.add(offset)
+        f.seek(offset)
+        raw = f.read(2)
+        if len(raw) < 2:
+            return None
+        f.seek(offset + 2 + 12 * struct.unpack(order + "H", raw)[0])
+        raw = f.read(4)
+        if len(raw) < 4:
+            return None
+        offset = struct.unpack(order + "I", raw)[0]
+        frames += 1
+    return frames
+
+
+def page_count(file_path: str, mime_type: Optional[str] = None) -> Optional[int]:
+    """Page count of a PDF or multi-page TIFF where it is cheap to read; None otherwise."""
+    try:
+        with open(file_path, "rb") as f:
+            head = f.read(8)
+            if head.startswith(b"%PDF-") or mime_type == "application/pdf":
+                return pdf_page_count(f)
+            if head[:4] in (b"II*\x00", b"MM\x00*") or mime_type == "image/tiff":
+                return tiff_frame_count(f, settings.express_max_pages)
+    except OSError:
+        pass
+    return None
+
+
+def classify(file_size: int, file_path: Optional[str] = None, mime_type: Optional[str] = None) -> str:
+    """
+    Lane of a document: bulk when it is larger than EXPRESS_MAX_BYTES or has
+    more than EXPRESS_MAX_PAGES pages, express otherwise.
+    """
+    if file_size > settings.express_max_bytes:
+        return BULK
+    pages = page_count(file_path, mime_type) if file_path else None
+    if pages is not None and pages > settings.express_max_pages:
+        return BULK
+    return EXPRESS
+
+
+def job_timeout(lane: str) -> int:
+    """
+    Seconds a job of ``lane`` may run before the worker stops it. Never less
+    than the stage budgets plus JOB_OVERHEAD_SECONDS: a stage over its budget
+    must be skipped with the partial result saved, not have the whole job
+    killed first by the job timeout.
+    """
+    timeout = settings.bulk_job_timeout_seconds if lane == BULK else settings.express_job_timeout_seconds
+    return max(timeout, math.ceil(total_budget() + JOB_OVERHEAD_SECONDS))
@@ -0,0 +1,156 @@
+"""
+Language detection over a few windows sampled across the document.
+
+Detecting on the opening characters alone goes wrong for documents that start
+with a cover page, a table of contents or boilerplate. Instead, short windows
+are sampled from the whole text, each window is detected on its own with a
+seeded langdetect detector, and the windows vote. The same text always gives
+the same windows and the same answer.
+"""
+import functools
+import math
+import random
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from langdetect import LangDetectException
+    from langdetect.detector_factory import DetectorFactory, PROFILES_DIRECTORY
+    LANGDETECT_AVAILABLE = True
+except ImportError:
+    LANGDETECT_AVAILABLE = False
+
+DEFAULT_LANGUAGE = "en"
+
+
+@functools.lru_cache(maxsize=None)
+def _detector_factory():
+    """langdetect profiles, loaded once per process."""
+    factory = DetectorFactory()
+    factory.load_profile(PROFILES_DIRECTORY)
+    return factory
+
+
+class WindowSampler:
+    """
+    Keep a uniform sample of fixed-size windows from text fed in chunks.
+    
+    The text is cut into consecutive ``window_chars`` windows and ``samples``
+    of them are kept by reservoir sampling with skips (Algorithm L), so random
+    numbers are only drawn for windows that get kept and the windows in between
+    are never copied. Which windows are kept depends only on the seed and the
+    number of windows, not on how the text was chunked.
+    """
+    
+    def __init__(self, window_chars: int = 300, samples: int = 5, seed: int = 0):
+        self.window_chars = window_chars
+        self.samples = samples
+        self._rng = random.Random(seed)
+        self._kept: List[Tuple[int, str]] = []
+        self._position = 0
+        self._partial = ""
+        self._next = 0  # index of the next window to keep
+        self._weight = 1.0
+    
+    def feed(self, chunk: str):
+        """Add the next piece of text."""
+        pos = 0
+        while pos < len(chunk):
+            index, offset = divmod(self._position, self.window_chars)
+            if index == self._next:
+                take = min(self.window_chars - offset, len(chunk) - pos)
+                self._partial += chunk[pos:pos + take]
+                if offset + take == self.window_chars:
+                    self._keep(index, self._partial)
+                    self._partial = ""
+            else:
+                take = min(self._next * self.window_chars - self._position, len(chunk) - pos)
+            self._position += take
+            pos += take
+    
+    def _keep(self, index: int, window: str):
+        if len(self._kept) < self.samples:
+            self._kept.append((index, window))
+            if len(self._kept) < self.samples:
+                self._next = index + 1
+                return
+        else:
+            self._kept[self._rng.randrange(self.samples)] = (index, window)
+        self._weight *= math.exp(math.log(self._random()) / self.samples)
+        self._next = index + 1 + int(math.log(self._random()) / math.log(1 - self._weight))
+    
+    def _random(self) -> float:
+        return self._rng.random() or 1e-300
+    
+    def windows(self) -> List[str]:
+        """The sampled windows in document order."""
+        windows = [window for _, window in sorted(self._kept)]
+        # Text shorter than the sample also uses its trailing, shorter window
+        if self._partial and len(windows) < self.samples:
+            windows.append(self._partial)
+        return windows
+
+
+class LanguageDetector:
+    """Seeded, window-voting language detection."""
+    
+    def __init__(self, window_chars: int = 300, samples: int = 5, seed: int = 0,
+                 trials: int = 3, min_letters: int = 20):
+        self.window_chars = window_chars
+        self.samples = samples
+        self.seed = seed
+        # Every window already votes, so each needs fewer of langdetect's internal trials
+        self.trials = trials
+        self.min_letters = min_letters
+    
+    def load(self):
+        """Load the language profiles now rather than on the first detection."""
+        if LANGDETECT_AVAILABLE:
+            _detector_factory()
+    
+    def sampler(self) -> WindowSampler:
+        """A fresh sampler for one document, with this detector's window settings."""
+        return WindowSampler(self.window_chars, self.samples, self.seed)
+    
+    def detect_window(self, text: str) -> Optional[Tuple[str, float]]:
+        """Most probable language of one window and its probability, if it can tell."""
+        if not LANGDETECT_AVAILABLE or sum(1 for char in text if char.isalpha()) < self.min_letters:
+            return None
+        detector = _detector_factory().create()
+        detector.seed = self.seed
+        detector.n_trial = self.trials
+        detector.append(text)
+        try:
+            best = detector.get_probabilities()
+        except LangDetectException:
+            return None
+        if not best:
+            return None
+        return best[0].lang, best[0].prob
+    
+    def vote(self, windows: List[str]) -> str:
+        """
+        Language most windows agree on. Detection stops as soon as one language
+        holds a majority; ties go to the higher summed probability.
+        """
+        majority = len(windows) // 2 + 1
+        votes: Counter = Counter()
+        weights: Dict[str, float] = {}
+        for window in windows:
+            detected = self.detect_window(window)
+            if detected is None:
+                continue
+            language, probability = detected
+            votes[language] += 1
+            weights[language] = weights.get(language, 0.0) + probability
+            if votes[language] >= majority:
+                return language
+        if not votes:
+            return DEFAULT_LANGUAGE
+        return max(votes, key=lambda language: (votes[language], weights[language]))
+    
+    def detect(self, text: str) -> str:
+        """Language of a whole text, voted over windows sampled from it."""
+        sampler = self.sampler()
+        sampler.feed(text)
+        return self.vote(sampler.windows())
@@ -0,0 +1,172 @@
+"""
+Worker-side metrics in the Prometheus text format.
+
+Processing time is aggregated into histograms, per stage and per job, and
+result cache lookups into a counter, in the worker process. ``start_metrics_server`` serves them on ``/metrics`` from a
+background thread, so Prometheus can scrape each worker directly.
+
+Only jobs that run inside the worker process are counted: warm mode
+(SimpleWorker) and batch workers. A forking worker runs every job in a child
+process whose observations are lost when it exits.
+"""
+import bisect
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("document_platform")
+
+# Seconds: from regex scans of a short page up to the stage budgets
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """A labelled histogram with fixed buckets, rendered in the Prometheus text format."""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # Per label values: counts per bucket (not cumulative), sum, count
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+    
+    def observe(self, value: float, **labels):
+        """Record one observation."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+    
+    def count(self, **labels) -> int:
+        """Number of observations for the given label values."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            return sum(series[0]) if series else 0
+    
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+    
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, list(counts), total[0]) for key, (counts, total) in self._series.items())
+        for key, counts, total in series:
+            labels = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket_labels = ",".join(labels + [f'le="{le}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            suffix = f"{{{','.join(labels)}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+class Counter:
+    """A labelled counter, rendered in the Prometheus text format."""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def value(self, **labels) -> float:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+    
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+    
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            labels = ",".join(f'{name}="{_escape(label)}"' for name, label in zip(self.labelnames, key))
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}{suffix} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+STAGE_SECONDS = Histogram(
+    "document_stage_seconds",
+    "Seconds spent per document in each processing stage, by DocumentProcessor function.",
+    labelnames=("stage",),
+)
+JOB_SECONDS = Histogram(
+    "document_job_seconds",
+    "Seconds per document job, excluding model loading.",
+    labelnames=("cached",),
+)
+RESULT_CACHE_LOOKUPS = Counter(
+    "document_result_cache_lookups_total",
+    "Result cache lookups before processing, by result (hit: an identical document's results were reused).",
+    labelnames=("result",),
+)
+REGISTRY = (STAGE_SECONDS, JOB_SECONDS, RESULT_CACHE_LOOKUPS)
+
+
+def observe_document(stage_timings: Dict[str, float], job_seconds: float, cached: bool):
+    """Record the timings of one processed document."""
+    for stage, seconds in stage_timings.items():
+        STAGE_SECONDS.observe(seconds, stage=stage)
+    JOB_SECONDS.observe(job_seconds, cached="true" if cached else "false")
+
+
+def render_metrics() -> str:
+    """All worker metrics in the Prometheus text format."""
+    return "".join(metric.render() for metric in REGISTRY)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass  # scrapes are not worth a log line each
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> Optional[ThreadingHTTPServer]:
+    """Serve ``/metrics`` from a daemon thread; returns None if the port is taken."""
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.warning("Metrics server not started", extra={"port": port, "error": str(e)})
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info("Metrics server started", extra={"port": server.server_address[1]})
+    return server
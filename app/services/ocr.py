@@ -0,0 +1,123 @@
+"""
+OCR of scanned images and PDF pages.
+
+Images are preprocessed before tesseract sees them: scans above the target
+resolution are downscaled to it, then converted to grayscale and binarized
+with Otsu's threshold. Tesseract's time grows with the pixel count, and a
+600 DPI scan reads no better than the same scan at 300 DPI.
+
+Every frame of a multi-page TIFF is OCRed, and frames taller than a tile are
+cut into horizontal tiles at the whitest rows near each cut, so no line of
+text is split. Frames and tiles are independent units of work that
+``DocumentProcessor`` spreads over worker processes.
+"""
+from typing import Iterator, List, Optional
+
+from app.config import settings
+from app.services.stage_budget import remaining_seconds
+
+try:
+    from PIL import Image, ImageSequence
+    import pytesseract
+    OCR_AVAILABLE = True
+except ImportError:
+    OCR_AVAILABLE = False
+
+# How far from a tile boundary, as a fraction of the tile height, a whiter row is looked for
+CUT_SEARCH_FRACTION = 0.1
+
+
+def image_dpi(image) -> Optional[float]:
+    """Resolution an image was scanned at, from its metadata; None when unknown."""
+    dpi = image.info.get("dpi")
+    if not dpi:
+        return None
+    try:
+        value = float(dpi[0] if isinstance(dpi, tuple) else dpi)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 1 else None
+
+
+def otsu_threshold(gray) -> int:
+    """Gray level that best separates ink from paper, from the image histogram."""
+    histogram = gray.histogram()[:256]
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    background = background_sum = 0
+    best_level, best_variance = 127, -1.0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        background_sum += level * count
+        mean_background = background_sum / background
+        mean_foreground = (weighted_total - background_sum) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+
+def preprocess(image, target_dpi: Optional[int] = None, dpi: Optional[float] = None):
+    """
+    Downscale to ``target_dpi`` (when the scan's resolution, ``dpi`` or its
+    metadata, is known and higher), convert to grayscale and binarize.
+    Returns a 1-bit image.
+    """
+    target_dpi = target_dpi or settings.ocr_target_dpi
+    dpi = dpi or image_dpi(image)
+    if dpi and dpi > target_dpi:
+        scale = target_dpi / dpi
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        # Reduce by whole factors first; the result is binarized, so the fine filter matters little
+        image = image.resize(size, Image.LANCZOS, reducing_gap=1.0)
+    gray = image.convert("L")
+    threshold = otsu_threshold(gray)
+    return gray.point(lambda value: 255 if value > threshold else 0, mode="1")
+
+
+def iter_frames(file_path: str) -> Iterator:
+    """Every frame of an image file, e.g. the pages of a multi-page TIFF."""
+    with Image.open(file_path) as image:
+        for frame in ImageSequence.Iterator(image):
+            # Frames share the file handle; copy before moving on to the next one
+            yield frame.copy()
+
+
+def split_tiles(image, tile_rows: Optional[int] = None) -> List:
+    """
+    Cut an image into horizontal tiles of about ``tile_rows`` rows. Each cut is
+    moved to the whitest row close to it, the gap between two lines of text.
+    """
+    tile_rows = tile_rows or settings.ocr_tile_rows
+    if tile_rows <= 0 or image.height <= tile_rows * 1.5:
+        return [image]
+    # Mean brightness of every row, in one pass
+    row_means = list(image.convert("L").resize((1, image.height), Image.BOX).getdata())
+    search = max(1, int(tile_rows * CUT_SEARCH_FRACTION))
+    cuts = [0]
+    while image.height - cuts[-1] > tile_rows * 1.5:
+        target = cuts[-1] + tile_rows
+        window = range(max(cuts[-1] + 1, target - search), min(image.height - 1, target + search))
+        cuts.append(max(window, key=lambda row: (row_means[row], -abs(row - target))))
+    cuts.append(image.height)
+    return [image.crop((0, top, image.width, bottom)) for top, bottom in zip(cuts, cuts[1:])]
+
+
+def ocr_image(image) -> str:
+    """OCR text of a PIL image, or an empty string when OCR fails."""
+    try:
+        # Let tesseract stop itself within the stage budget rather than leave it running
+        return pytesseract.image_to_string(image, timeout=remaining_seconds() or 0)
+    except Exception as e:
+        print(f"OCR failed: {e}")
+        return ""
+
+
+def ocr_tile(tile) -> List[str]:
+    """Process pool task: the OCR text of one preprocessed tile."""
+    return [ocr_image(tile)]
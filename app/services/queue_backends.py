@@ -0,0 +1,477 @@
+"""
+Queue backends behind ``QueueService``.
+
+``QUEUE_BACKEND`` picks how document jobs travel from the API to the workers:
+
+- ``rq`` (default): RQ on the fair queues of ``app.services.fair_queue``,
+  worked by RQ workers. A job whose worker dies mid-job is lost, and its
+  document stays in PROCESSING.
+- ``redis_streams``: one Redis stream per queue and tenant, read through a
+  consumer group. A claimed job stays pending until the worker acknowledges
+  it, and the worker keeps extending its claim while the job runs; entries
+  nobody extended for ``QUEUE_VISIBILITY_TIMEOUT_SECONDS`` (the worker died)
+  are claimed again by another worker. A job delivered
+  ``QUEUE_MAX_DELIVERIES`` times without finishing fails its document.
+  Delivery is at least once: a worker cut off from Redis for longer than
+  the timeout may finish a job another worker has taken over meanwhile.
+
+``InMemoryBackend`` has the same claim/ack semantics within one process,
+for tests.
+
+Queues are named by lane (``express``, ``bulk``) or ``backfill``; both
+message backends serve the tenants of a queue by deficit round robin, as
+``FairQueue`` does.
+"""
+import itertools
+import json
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from redis.exceptions import ResponseError
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
+
+from app.config import settings
+from app.services.fair_queue import DeficitRoundRobin, TENANT_META_KEY
+
+# Consumer group every worker reads the streams through
+CONSUMER_GROUP = "document_workers"
+
+# How long job statuses are kept after the job finished
+JOB_STATUS_TTL_SECONDS = 24 * 3600
+
+
+class QueueMessage(NamedTuple):
+    """A job claimed by a worker, to be acknowledged once it finished."""
+    queue: str
+    message_id: str
+    job_id: str
+    func_name: str
+    args: tuple
+    tenant_id: Optional[int]
+    timeout: int
+    deliveries: int
+    # Where the backend keeps the entry (the stream key for Redis)
+    location: str = ""
+
+
+class QueueBackend:
+    """Producer side: what the API needs from a queue."""
+    
+    def enqueue(self, queue: str, func_name: str, args: tuple, job_id: str,
+                tenant_id: Optional[int], timeout: int) -> str:
+        """Queue a call of ``func_name`` (a dotted path) with ``args``. Returns the job id."""
+        raise NotImplementedError
+    
+    def depth(self, queue: str) -> int:
+        """Jobs waiting (or, for message backends, not yet acknowledged) on ``queue``."""
+        raise NotImplementedError
+    
+    def job_status(self, job_id: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class MessageQueueBackend(QueueBackend):
+    """
+    Backend whose jobs are claimed and acknowledged by ``app.worker.StreamWorker``.
+    
+    A claimed message is pending until ``ack``; ``extend`` keeps it claimed
+    while its job runs. Pending messages nobody extended for
+    ``visibility_timeout`` seconds are delivered again by ``claim``.
+    """
+    
+    def claim(self, queues: List[str], consumer: str, count: int = 1,
+              timeout: Optional[float] = None) -> List[QueueMessage]:
+        """
+        Up to ``count`` messages, all from the first of ``queues`` that has
+        any; stale messages of other consumers come first. With a timeout,
+        wait up to that many seconds for one; returns [] when none came.
+        """
+        raise NotImplementedError
+    
+    def extend(self, messages: List[QueueMessage], consumer: str):
+        """Restart the visibility timeout of messages ``consumer`` is still working on."""
+        raise NotImplementedError
+    
+    def ack(self, message: QueueMessage, error: Optional[str] = None):
+        """Remove a finished message for good, recording whether its job failed."""
+        raise NotImplementedError
+    
+    def release(self, consumer: str):
+        """
+        Forget a consumer that is shutting down. A consumer that still has
+        messages pending, e.g. after an error, is kept, so its messages are
+        delivered again once stale.
+        """
+
+
+class RQBackend(QueueBackend):
+    """Jobs on RQ queues, one ``FairQueue`` per queue name."""
+    
+    def __init__(self, queues: Dict[str, Any]):
+        self.queues = queues
+        self.connection = next(iter(queues.values())).connection
+    
+    def enqueue(self, queue: str, func_name: str, args: tuple, job_id: str,
+                tenant_id: Optional[int], timeout: int) -> str:
+        job = self.queues[queue].enqueue(
+            func_name, *args, job_timeout=timeout, job_id=job_id, meta={TENANT_META_KEY: tenant_id}
+        )
+        return job.id
+    
+    def depth(self, queue: str) -> int:
+        return self.queues[queue].count
+    
+    def job_status(self, job_id: str) -> Dict[str, Any]:
+        # Queue.fetch_job only finds jobs of its own queue; jobs are stored by id alone
+        try:
+            job = Job.fetch(job_id, connection=self.connection)
+        except NoSuchJobError:
+            return {"status": "not_found"}
+        return {
+            "status": job.get_status(),
+            "result": job.result,
+            "error": str(job.exc_info) if job.exc_info else None
+        }
+
+
+class _Entry:
+    """A message of the in-memory backend, with its claim."""
+    
+    def __init__(self, message: QueueMessage):
+        self.message = message
+        self.consumer: Optional[str] = None
+        self.claimed_at = 0.0
+
+
+class InMemoryBackend(MessageQueueBackend):
+    """
+    Message backend in process memory, with the claim, ack and redelivery
+    behaviour of ``RedisStreamsBackend``. ``clock`` replaces
+    ``time.monotonic``, so tests can let claims go stale without waiting.
+    """
+    
+    def __init__(self, visibility_timeout: Optional[float] = None, weights: Optional[Dict[str, float]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        if visibility_timeout is None:
+            visibility_timeout = settings.queue_visibility_timeout_seconds
+        self.visibility_timeout = visibility_timeout
+        self.weights = weights
+        self.clock = clock
+        self._waiting: Dict[str, Dict[str, deque]] = {}
+        self._pending: Dict[str, _Entry] = {}
+        self._schedulers: Dict[str, DeficitRoundRobin] = {}
+        self._statuses: Dict[str, Dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+        self._changed = threading.Condition()
+    
+    def enqueue(self, queue: str, func_name: str, args: tuple, job_id: str,
+                tenant_id: Optional[int], timeout: int) -> str:
+        message = QueueMessage(queue, str(next(self._ids)), job_id, func_name, tuple(args), tenant_id, timeout, 0)
+        with self._changed:
+            self._waiting.setdefault(queue, {}).setdefault(_tenant(tenant_id), deque()).append(message)
+            self._statuses[job_id] = {"status": "queued", "result": None, "error": None}
+            self._changed.notify_all()
+        return job_id
+    
+    def depth(self, queue: str) -> int:
+        with self._changed:
+            waiting = sum(len(messages) for messages in self._waiting.get(queue, {}).values())
+            return waiting + sum(1 for entry in self._pending.values() if entry.message.queue == queue)
+    
+    def job_status(self, job_id: str) -> Dict[str, Any]:
+        return dict(self._statuses.get(job_id, {"status": "not_found"}))
+    
+    def claim(self, queues: List[str], consumer: str, count: int = 1,
+              timeout: Optional[float] = None) -> List[QueueMessage]:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._changed:
+            while True:
+                messages = self._claim_stale(queues, consumer, count) or self._claim_new(queues, consumer, count)
+                if messages or deadline is None or time.monotonic() >= deadline:
+                    return messages
+                # Claims may go stale while waiting, so look again at least once per visibility timeout
+                self._changed.wait(min(deadline - time.monotonic(), self.visibility_timeout))
+    
+    def _claim_stale(self, queues: List[str], consumer: str, count: int) -> List[QueueMessage]:
+        now = self.clock()
+        for queue in queues:
+            stale = [
+                entry for entry in self._pending.values()
+                if entry.message.queue == queue and now - entry.claimed_at >= self.visibility_timeout
+            ][:count]
+            if stale:
+                return [self._hand_out(entry, consumer, now) for entry in stale]
+        return []
+    
+    def _claim_new(self, queues: List[str], consumer: str, count: int) -> List[QueueMessage]:
+        now = self.clock()
+        for queue in queues:
+            tenants = self._waiting.get(queue, {})
+            scheduler = self._schedulers.setdefault(queue, DeficitRoundRobin(self.weights))
+            messages = []
+            while len(messages) < count:
+                tenant = scheduler.next_tenant([tenant for tenant, waiting in tenants.items() if waiting])
+                if tenant is None:
+                    break
+                entry = _Entry(tenants[tenant].popleft())
+                self._pending[entry.message.message_id] = entry
+                messages.append(self._hand_out(entry, consumer, now))
+            if messages:
+                return messages
+        return []
+    
+    def _hand_out(self, entry: _Entry, consumer: str, now: float) -> QueueMessage:
+        entry.message = entry.message._replace(deliveries=entry.message.deliveries + 1)
+        entry.consumer = consumer
+        entry.claimed_at = now
+        self._statuses[entry.message.job_id]["status"] = "started"
+        return entry.message
+    
+    def extend(self, messages: List[QueueMessage], consumer: str):
+        with self._changed:
+            now = self.clock()
+            for message in messages:
+                entry = self._pending.get(message.message_id)
+                if entry is not None and entry.consumer == consumer:
+                    entry.claimed_at = now
+    
+    def ack(self, message: QueueMessage, error: Optional[str] = None):
+        with self._changed:
+            self._pending.pop(message.message_id, None)
+            self._statuses[message.job_id] = {
+                "status": "failed" if error else "finished", "result": None, "error": error
+            }
+
+
+# Forget a tenant only while its stream is empty; entries are deleted once acknowledged, so
+# pending ones keep the tenant listed for reclaiming
+_RETIRE_TENANT = """
+if redis.call('xlen', KEYS[2]) == 0 then
+    return redis.call('srem', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+# Claiming its own entries again resets their idle time. Only entries the consumer still owns are
+# claimed, checked in the same script: an entry another worker took over meanwhile stays with it
+_EXTEND_CLAIMS = """
+local extended = 0
+for i = 3, #ARGV do
+    local owned = redis.call('xpending', KEYS[1], ARGV[1], ARGV[i], ARGV[i], 1, ARGV[2])
+    if #owned > 0 then
+        redis.call('xclaim', KEYS[1], ARGV[1], ARGV[2], 0, ARGV[i], 'JUSTID')
+        extended = extended + 1
+    end
+end
+return extended
+"""
+
+
+class RedisStreamsBackend(MessageQueueBackend):
+    """
+    Jobs as entries of Redis streams (Redis 6.2 or later), read through one
+    consumer group.
+    
+    Each queue has a stream per tenant (``stream:<queue name>:tenant:<id>``),
+    a set of the tenants with entries and a wake list like ``FairQueue``'s.
+    ``XREADGROUP`` claims new entries tenant by tenant; ``XACK`` and ``XDEL``
+    remove them once done. Every ``visibility_timeout / 2`` seconds a
+    ``claim`` first looks for entries idle longer than ``visibility_timeout``
+    (``XPENDING ... IDLE``) and takes them over with ``XCLAIM``, which counts
+    the delivery. ``extend`` resets the idle time of the entries a worker
+    still owns, so it never takes back an entry another worker reclaimed.
+    """
+    
+    def __init__(self, connection, queue_names: Dict[str, str], visibility_timeout: Optional[float] = None,
+                 weights: Optional[Dict[str, float]] = None):
+        self.connection = connection
+        self.queue_names = queue_names
+        if visibility_timeout is None:
+            visibility_timeout = settings.queue_visibility_timeout_seconds
+        self.visibility_timeout = visibility_timeout
+        self.weights = weights if weights is not None else settings.tenant_queue_weights
+        self._schedulers: Dict[str, DeficitRoundRobin] = {}
+        self._groups: set = set()
+        self._next_reclaim = 0.0
+        self._retire_tenant = connection.register_script(_RETIRE_TENANT)
+        self._extend_claims = connection.register_script(_EXTEND_CLAIMS)
+    
+    def _key(self, queue: str) -> str:
+        return f"stream:{self.queue_names[queue]}"
+    
+    def stream_key(self, queue: str, tenant: str) -> str:
+        return f"{self._key(queue)}:tenant:{tenant}"
+    
+    def tenants_key(self, queue: str) -> str:
+        return f"{self._key(queue)}:tenants"
+    
+    def wake_key(self, queue: str) -> str:
+        return f"{self._key(queue)}:wake"
+    
+    @staticmethod
+    def job_key(job_id: str) -> str:
+        return f"stream:job:{job_id}"
+    
+    def enqueue(self, queue: str, func_name: str, args: tuple, job_id: str,
+                tenant_id: Optional[int], timeout: int) -> str:
+        tenant = _tenant(tenant_id)
+        fields = {"job_id": job_id, "func": func_name, "args": json.dumps(list(args)),
+                  "tenant_id": tenant, "timeout": timeout}
+        pipe = self.connection.pipeline()
+        pipe.xadd(self.stream_key(queue, tenant), fields)
+        pipe.sadd(self.tenants_key(queue), tenant)
+        pipe.hset(self.job_key(job_id), mapping={"status": "queued", "error": ""})
+        pipe.expire(self.job_key(job_id), JOB_STATUS_TTL_SECONDS)
+        pipe.lpush(self.wake_key(queue), 1)
+        pipe.ltrim(self.wake_key(queue), 0, 0)
+        pipe.execute()
+        return job_id
+    
+    def _tenants(self, queue: str) -> List[str]:
+        return [_text(tenant) for tenant in self.connection.smembers(self.tenants_key(queue))]
+    
+    def depth(self, queue: str) -> int:
+        pipe = self.connection.pipeline(transaction=False)
+        for tenant in self._tenants(queue):
+            pipe.xlen(self.stream_key(queue, tenant))
+        return sum(pipe.execute())
+    
+    def job_status(self, job_id: str) -> Dict[str, Any]:
+        status = {_text(key): _text(value) for key, value in self.connection.hgetall(self.job_key(job_id)).items()}
+        if not status:
+            return {"status": "not_found"}
+        return {"status": status["status"], "result": None, "error": status.get("error") or None}
+    
+    def _ensure_group(self, stream: str):
+        if stream in self._groups:
+            return
+        try:
+            # From the start of the stream: entries added before the group existed are jobs too
+            self.connection.xgroup_create(stream, CONSUMER_GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._groups.add(stream)
+    
+    def claim(self, queues: List[str], consumer: str, count: int = 1,
+              timeout: Optional[float] = None) -> List[QueueMessage]:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            if time.monotonic() >= self._next_reclaim:
+                self._next_reclaim = time.monotonic() + self.visibility_timeout / 2
+                messages = self._claim_stale(queues, consumer, count)
+                if messages:
+                    return messages
+            for queue in queues:
+                messages = self._claim_new(queue, consumer, count)
+                if messages:
+                    return messages
+            if deadline is None or time.monotonic() >= deadline:
+                return []
+            # Wake up for the next reclaim too; BLPOP takes whole seconds, and 0 would block forever
+            remaining = min(deadline, self._next_reclaim) - time.monotonic()
+            self.connection.blpop([self.wake_key(queue) for queue in queues], max(1, math.ceil(remaining)))
+    
+    def _claim_new(self, queue: str, consumer: str, count: int) -> List[QueueMessage]:
+        scheduler = self._schedulers.setdefault(queue, DeficitRoundRobin(self.weights))
+        active = set(self._tenants(queue))
+        messages = []
+        while len(messages) < count:
+            tenant = scheduler.next_tenant(active)
+            if tenant is None:
+                break
+            stream = self.stream_key(queue, tenant)
+            self._ensure_group(stream)
+            result = self.connection.xreadgroup(CONSUMER_GROUP, consumer, {stream: ">"}, count=1)
+            if result:
+                (_, entries), = result
+                message_id, fields = entries[0]
+                messages.append(_message(queue, stream, message_id, fields, deliveries=1))
+                continue
+            scheduler.drop(tenant)
+            active.discard(tenant)
+            self._retire_tenant(keys=[self.tenants_key(queue), stream], args=[tenant])
+        if messages:
+            pipe = self.connection.pipeline(transaction=False)
+            for message in messages:
+                pipe.hset(self.job_key(message.job_id), "status", "started")
+                pipe.expire(self.job_key(message.job_id), JOB_STATUS_TTL_SECONDS)
+            pipe.execute()
+        return messages
+    
+    def _claim_stale(self, queues: List[str], consumer: str, count: int) -> List[QueueMessage]:
+        idle_ms = int(self.visibility_timeout * 1000)
+        for queue in queues:
+            messages = []
+            for tenant in self._tenants(queue):
+                stream = self.stream_key(queue, tenant)
+                self._ensure_group(stream)
+                pending = self.connection.xpending_range(
+                    stream, CONSUMER_GROUP, "-", "+", count - len(messages), idle=idle_ms
+                )
+                if not pending:
+                    continue
+                deliveries = {_text(entry["message_id"]): entry["times_delivered"] for entry in pending}
+                # XCLAIM skips entries another worker claimed or extended in the meantime
+                claimed = self.connection.xclaim(stream, CONSUMER_GROUP, consumer, idle_ms, list(deliveries))
+                for message_id, fields in claimed:
+                    if fields:
+                        messages.append(_message(
+                            queue, stream, message_id, fields, deliveries=deliveries[_text(message_id)] + 1
+                        ))
+                if len(messages) >= count:
+                    break
+            if messages:
+                return messages
+        return []
+    
+    def extend(self, messages: List[QueueMessage], consumer: str):
+        by_stream: Dict[str, List[str]] = {}
+        for message in messages:
+            by_stream.setdefault(message.location, []).append(message.message_id)
+        for stream, message_ids in by_stream.items():
+            self._extend_claims(keys=[stream], args=[CONSUMER_GROUP, consumer, *message_ids])
+    
+    def ack(self, message: QueueMessage, error: Optional[str] = None):
+        pipe = self.connection.pipeline()
+        pipe.xack(message.location, CONSUMER_GROUP, message.message_id)
+        pipe.xdel(message.location, message.message_id)
+        pipe.hset(self.job_key(message.job_id), mapping={"status": "failed" if error else "finished",
+                                                         "error": error or ""})
+        pipe.expire(self.job_key(message.job_id), JOB_STATUS_TTL_SECONDS)
+        pipe.execute()
+    
+    def release(self, consumer: str):
+        for stream in self._groups:
+            # Deleting a consumer drops its pending entries for good. Only the consumer itself
+            # adds entries to its list, so none can appear between the check and the delete
+            if not self.connection.xpending_range(stream, CONSUMER_GROUP, "-", "+", 1, consumername=consumer):
+                self.connection.xgroup_delconsumer(stream, CONSUMER_GROUP, consumer)
+
+
+def _tenant(tenant_id: Optional[int]) -> str:
+    """Scheduler and key name of a tenant; jobs without one share the name ""."""
+    return "" if tenant_id is None else str(tenant_id)
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _message(queue: str, stream: str, message_id, fields: dict, deliveries: int) -> QueueMessage:
+    fields = {_text(key): _text(value) for key, value in fields.items()}
+    return QueueMessage(
+        queue=queue,
+        message_id=_text(message_id),
+        job_id=fields["job_id"],
+        func_name=fields["func"],
+        args=tuple(json.loads(fields["args"])),
+        tenant_id=int(fields["tenant_id"]) if fields["tenant_id"] else None,
+        timeout=int(fields["timeout"]),
+        deliveries=deliveries,
+        location=stream,
+    )
@@ -2,49 +2,91 @@
 Redis queue service for background job management.
 """
 import redis
-from rq import Queue
 from typing import Dict, Any
 
 from app.config import settings
+from app.services.fair_queue import FairQueue
+from app.services.lanes import BULK, EXPRESS, job_timeout
+from app.services.queue_backends import QueueBackend, RedisStreamsBackend, RQBackend
 
 # Redis connection
 redis_conn = redis.from_url(settings.redis_url)
 
-# RQ Queue
-document_queue = Queue(settings.redis_queue_name, connection=redis_conn)
+# Jobs are enqueued by dotted path, so the API process never imports app.worker
+# and with it the document processing libraries (pdfplumber, pypdf, spaCy, PIL, ...)
+PROCESS_DOCUMENT_JOB = "app.worker.process_document"
+REPROCESS_DOCUMENT_JOB = "app.worker.reprocess_document"
+
+# Reprocessing jobs, on a queue of their own
+BACKFILL = "backfill"
+REPROCESS_JOB_TIMEOUT_SECONDS = 600
+
+# Queues: document jobs go to the express or the bulk lane (see app.services.lanes), and
+# workers only take backfill jobs while both are empty. All are served tenant by tenant
+# (see app.services.fair_queue). The express lane keeps the original queue name.
+QUEUE_NAMES = {
+    EXPRESS: settings.redis_queue_name,
+    BULK: settings.redis_bulk_queue_name,
+    BACKFILL: settings.redis_backfill_queue_name,
+}
+express_queue = FairQueue(QUEUE_NAMES[EXPRESS], connection=redis_conn)
+bulk_queue = FairQueue(QUEUE_NAMES[BULK], connection=redis_conn)
+backfill_queue = FairQueue(QUEUE_NAMES[BACKFILL], connection=redis_conn)
+RQ_QUEUES = {EXPRESS: express_queue, BULK: bulk_queue, BACKFILL: backfill_queue}
+
+
+def create_queue_backend(name: str) -> QueueBackend:
+    """The backend QUEUE_BACKEND names (see app.services.queue_backends)."""
+    if name == "rq":
+        return RQBackend(RQ_QUEUES)
+    if name == "redis_streams":
+        return RedisStreamsBackend(redis_conn, QUEUE_NAMES)
+    raise ValueError(f"Unknown queue backend: {name}")
+
+
+queue_backend = create_queue_backend(settings.queue_backend)
 
 
 class QueueService:
     """Service for managing background job queues."""
     
     @staticmethod
-    def enqueue_document_processing(document_id: int, tenant_id: int) -> str:
+    def enqueue_document_processing(document_id: int, tenant_id: int, lane: str = EXPRESS) -> str:
         """
-        Enqueue a document processing job.
+        Enqueue a document processing job on its lane, under the lane's
+        timeout, in its tenant's share of the queue.
         Returns job ID.
         """
-        from app.worker import process_document
-        
-        job = document_queue.enqueue(
-            process_document,
-            document_id,
-            tenant_id,
-            job_timeout='10m',  # 10 minute timeout
-            job_id=f"doc_{document_id}_{tenant_id}"
+        return queue_backend.enqueue(
+            lane,
+            PROCESS_DOCUMENT_JOB,
+            (document_id, tenant_id),
+            job_id=f"doc_{document_id}_{tenant_id}",
+            tenant_id=tenant_id,
+            timeout=job_timeout(lane)
         )
-        
-        return job.id
+    
+    @staticmethod
+    def enqueue_document_reprocessing(document_id: int, tenant_id: int) -> str:
+        """
+        Enqueue a job that reruns the stale stages of a processed document.
+        Returns job ID.
+        """
+        return queue_backend.enqueue(
+            BACKFILL,
+            REPROCESS_DOCUMENT_JOB,
+            (document_id, tenant_id),
+            job_id=f"reprocess_{document_id}_{tenant_id}",
+            tenant_id=tenant_id,
+            timeout=REPROCESS_JOB_TIMEOUT_SECONDS
+        )
+    
+    @staticmethod
+    def backfill_queue_depth() -> int:
+        """Number of reprocessing jobs waiting."""
+        return queue_backend.depth(BACKFILL)
     
     @staticmethod
     def get_job_status(job_id: str) -> Dict[str, Any]:
         """Get status of a job."""
-        job = document_queue.fetch_job(job_id)
-        if not job:
-            return {"status": "not_found"}
-        
-        return {
-            "status": job.get_status(),
-            "result": job.result,
-            "error": str(job.exc_info) if job.exc_info else None
-        }
-
+        return queue_backend.job_status(job_id)
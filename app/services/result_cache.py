@@ -0,0 +1,65 @@
+"""
+Result cache for identical uploads.
+
+Uploads are hashed when they are stored. Before a document is processed,
+the worker looks for a completed document of the same tenant with the same
+hash and processor version, and reuses its extracted metadata, stage results
+and stored text. Lookups are counted in ``document_result_cache_lookups_total``
+on the worker's ``/metrics``.
+"""
+import logging
+from typing import Dict, Optional
+from sqlalchemy.orm import Session
+
+from app.models.document import Document
+from app.services.document_service import DocumentService
+from app.services.metrics import RESULT_CACHE_LOOKUPS
+
+logger = logging.getLogger("document_platform")
+
+
+class ResultCache:
+    """Reuse extracted metadata of already processed identical files."""
+    
+    @staticmethod
+    def find_source(db: Session, document: Document, processor_version: str) -> Optional[Document]:
+        """
+        Return the identical, already processed document of the same tenant whose
+        results can be reused, or None if the document has to be processed.
+        """
+        source = None
+        if document.content_hash:
+            source = DocumentService.find_processed_duplicate(
+                db=db,
+                tenant_id=document.tenant_id,
+                content_hash=document.content_hash,
+                processor_version=processor_version,
+                exclude_document_id=document.id
+            )
+        
+        if source is None:
+            RESULT_CACHE_LOOKUPS.inc(result="miss")
+            return None
+        
+        RESULT_CACHE_LOOKUPS.inc(result="hit")
+        logger.info(
+            "Result cache hit",
+            extra={"document_id": document.id, "tenant_id": document.tenant_id, "source_document_id": source.id}
+        )
+        return source
+    
+    @staticmethod
+    def stats() -> Dict[str, float]:
+        """Hit and miss counts for this process."""
+        hits = int(RESULT_CACHE_LOOKUPS.value(result="hit"))
+        misses = int(RESULT_CACHE_LOOKUPS.value(result="miss"))
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 3) if total else 0.0
+        }
+    
+    @staticmethod
+    def reset_stats():
+        RESULT_CACHE_LOOKUPS.reset()
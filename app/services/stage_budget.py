@@ -0,0 +1,111 @@
+"""
+Time budgets for the stages of document processing.
+
+Each stage (text extraction, language detection, NER) gets its own budget. A
+stage that runs over it is interrupted and skipped, and the job saves what the
+other stages produced, instead of the whole job being killed by the queue's
+job timeout with nothing saved.
+
+Budgets are enforced with SIGALRM in the main thread, which is where RQ runs
+jobs; the queue's own job timeout alarm is saved and restored around each
+stage. In other threads stages are only checked between pages.
+"""
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from app.config import settings
+
+STAGES = ("extraction", "language", "ner")
+
+# Deadline of the stage running in this process, for code that can pass a timeout on (OCR)
+_current_deadline: Optional[float] = None
+
+
+class StageTimeout(BaseException):
+    """
+    A stage ran over its time budget.
+    
+    Derives from BaseException so the ``except Exception`` fallbacks inside
+    the stages (pdfplumber to pypdf, OCR errors) do not swallow it.
+    """
+    
+    def __init__(self, seconds: float):
+        super().__init__(f"Stage ran over its {seconds:g}s budget")
+        self.seconds = seconds
+
+
+def stage_budget(stage: str) -> float:
+    """Configured budget of a stage in seconds; 0 means no budget."""
+    return float(getattr(settings, f"stage_budget_{stage}_seconds"))
+
+
+def total_budget() -> float:
+    """Seconds all stages together may take; a stage without a budget adds nothing."""
+    return sum(stage_budget(stage) for stage in STAGES)
+
+
+def remaining_seconds() -> Optional[float]:
+    """Time left in the current stage's budget, or None without one."""
+    if _current_deadline is None:
+        return None
+    return max(0.0, _current_deadline - time.monotonic())
+
+
+def _can_use_alarm() -> bool:
+    return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+
+@contextmanager
+def time_limit(seconds: float, deadline: Optional[float] = None) -> Iterator[None]:
+    """
+    Raise StageTimeout in the block once ``seconds`` have passed, or at the
+    ``time.monotonic()`` ``deadline`` when given. Without a positive budget the
+    block runs unlimited.
+    """
+    global _current_deadline
+    if deadline is None:
+        if not seconds or seconds <= 0:
+            yield
+            return
+        deadline = time.monotonic() + seconds
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise StageTimeout(seconds)
+    
+    outer_deadline = _current_deadline
+    _current_deadline = deadline
+    if not _can_use_alarm():
+        try:
+            yield
+        finally:
+            _current_deadline = outer_deadline
+        return
+    
+    def _on_alarm(signum, frame):
+        raise StageTimeout(seconds)
+    
+    outer_handler = signal.getsignal(signal.SIGALRM)
+    outer_remaining, _ = signal.getitimer(signal.ITIMER_REAL)
+    if outer_remaining and outer_remaining <= remaining:
+        # The job timeout comes first; leave it in charge
+        try:
+            yield
+        finally:
+            _current_deadline = outer_deadline
+        return
+    
+    started = time.monotonic()
+    signal.signal(signal.SIGALRM, _on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, remaining)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, outer_handler)
+        _current_deadline = outer_deadline
+        if outer_remaining:
+            elapsed = time.monotonic() - started
+            signal.setitimer(signal.ITIMER_REAL, max(outer_remaining - elapsed, 0.001))
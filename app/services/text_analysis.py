@@ -0,0 +1,273 @@
+"""
+Incremental text analysis for documents that arrive page by page.
+
+The analyzers here produce the same numbers as running the original
+whole-text computations over ``"\\n\\n".join(pages)``, but only ever hold one
+page plus a small, fixed amount of state, so memory does not grow with the
+number of pages.
+"""
+import re
+import time
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional
+
+from app.services.entity_extractor import ChunkedScan, EntityExtractor, EntityAccumulator
+from app.services.extractors import PageContinuation
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.language_detector import WindowSampler
+
+# Pages are joined with a blank line, as the full-text extraction always did
+PAGE_SEPARATOR = "\n\n"
+
+# Stages DocumentAnalysis feeds page by page, named like their DocumentProcessor functions
+ANALYSIS_STAGES = ("text_metrics", "extract_entities", "match_keywords", "detect_language", "extract_organizations")
+
+# A blank piece of ``text.split('.')``: a dot followed only by whitespace up to the next dot
+_BLANK_PIECE = re.compile(r'\.\s*(?=\.)')
+
+
+class TextStats:
+    """
+    Word and sentence counts, preview and summary over text fed in chunks.
+    
+    One fused pass replaces ``len(text.split())`` and the list built from
+    ``text.split('.')``: text is scanned in fixed-size windows, and once the
+    summary has its sentences, sentences are only counted, not materialized.
+    """
+    
+    PREVIEW_CHARS = 200
+    SUMMARY_SENTENCES = 3
+    SUMMARY_CHARS = 300
+    WINDOW_CHARS = 64 * 1024
+    
+    def __init__(self):
+        self.length = 0
+        self.word_count = 0
+        self._head = ""
+        self._ends_in_word = False
+        # Sentences are the non-blank pieces of ``text.split('.')``
+        self._sentence_count = 0
+        self._sentence = ""
+        self._sentence_has_text = False
+        self._summary: List[str] = []
+    
+    def feed(self, chunk: str):
+        """Add the next piece of text."""
+        # Long chunks go through in windows, so per-window temporaries stay small
+        for start in range(0, len(chunk), self.WINDOW_CHARS):
+            self._feed_window(chunk[start:start + self.WINDOW_CHARS] if len(chunk) > self.WINDOW_CHARS else chunk)
+    
+    def _feed_window(self, window: str):
+        if len(self._head) <= self.PREVIEW_CHARS:
+            self._head += window[:self.PREVIEW_CHARS + 1 - len(self._head)]
+        self.length += len(window)
+        
+        words = len(window.split())
+        if self._ends_in_word and not window[0].isspace():
+            words -= 1  # a word continues across the window boundary
+        self.word_count += words
+        self._ends_in_word = not window[-1].isspace()
+        
+        if len(self._summary) < self.SUMMARY_SENTENCES:
+            # Still collecting summary sentences: walk the pieces one by one
+            pieces = window.split('.')
+            self._extend_sentence(pieces[0])
+            for piece in pieces[1:]:
+                self._close_sentence()
+                self._extend_sentence(piece)
+            return
+        
+        # Summary complete: only count sentences, without splitting the window
+        first_dot = window.find('.')
+        if first_dot < 0:
+            self._sentence_has_text = self._sentence_has_text or not window.isspace()
+            return
+        last_dot = window.rfind('.')
+        first, last = window[:first_dot], window[last_dot + 1:]
+        if self._sentence_has_text or (first and not first.isspace()):
+            self._sentence_count += 1
+        # Pieces between the first and the last dot, minus the blank ones
+        inner = window.count('.', first_dot, last_dot + 1) - 1
+        blank = sum(1 for _ in _BLANK_PIECE.finditer(window, first_dot, last_dot + 1))
+        self._sentence_count += inner - blank
+        self._sentence_has_text = bool(last) and not last.isspace()
+    
+    def _extend_sentence(self, piece: str):
+        if not self._sentence_has_text:
+            piece = piece.lstrip()
+            self._sentence_has_text = bool(piece)
+        # Only the first sentences are kept, and only as much as the summary can show
+        if len(self._summary) < self.SUMMARY_SENTENCES and len(self._sentence.rstrip()) < self.SUMMARY_CHARS:
+            self._sentence += piece
+    
+    def _close_sentence(self):
+        if self._sentence_has_text:
+            self._sentence_count += 1
+            if len(self._summary) < self.SUMMARY_SENTENCES:
+                self._summary.append(self._sentence.rstrip())
+        self._sentence = ""
+        self._sentence_has_text = False
+    
+    @property
+    def sentence_count(self) -> int:
+        return self._sentence_count + (1 if self._sentence_has_text else 0)
+    
+    @property
+    def preview(self) -> str:
+        preview = self._head[:self.PREVIEW_CHARS].strip()
+        if self.length > self.PREVIEW_CHARS:
+            preview += "..."
+        return preview
+    
+    @property
+    def summary(self) -> str:
+        sentences = list(self._summary)
+        if self._sentence_has_text and len(sentences) < self.SUMMARY_SENTENCES:
+            sentences.append(self._sentence.rstrip())
+        if len(sentences) >= self.SUMMARY_SENTENCES:
+            return ('. '.join(sentences) + '.')[:self.SUMMARY_CHARS]
+        return self.preview[:self.SUMMARY_CHARS]
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Counts, preview and summary in the shape of the processing metadata."""
+        word_count = self.word_count
+        sentence_count = self.sentence_count
+        return {
+            "word_count": word_count,
+            "sentence_count": sentence_count,
+            "avg_words_per_sentence": round(word_count / sentence_count, 2) if sentence_count > 0 else 0,
+            "extracted_text_preview": self.preview,
+            "summary": self.summary,
+            "text_length": self.length,
+        }
+
+
+class KeywordScanner:
+    """Track which keyword groups of a matcher occur anywhere in the text."""
+    
+    def __init__(self, matcher: KeywordMatcher):
+        self.matcher = matcher
+        self.pending = set(matcher.groups)
+        self.matched = set()
+        # A keyword split by a chunk boundary is found with this much of the previous chunk
+        self.overlap = max((len(keyword) for group in matcher.groups.values() for keyword in group), default=1) - 1
+        self._tail = ""
+    
+    def feed(self, chunk: str, continued: bool = False):
+        """
+        Check the next piece of text. Keywords never span two pieces, unless
+        the piece is ``continued`` from the one before.
+        """
+        if not self.pending or not chunk:
+            return
+        text = self._tail + chunk if continued else chunk
+        self._tail = text[-self.overlap:] if self.overlap else ""
+        hits = self.matcher.match(text.lower(), self.pending)
+        if hits:
+            self.matched |= hits
+            self.pending -= hits
+
+
+class DocumentAnalysis:
+    """
+    Streaming analysis of one document.
+    
+    Pages go through ``add_page`` one at a time, long ones possibly in pieces
+    (see ``PageContinuation``). Word and sentence counts,
+    entities and keyword group hits are updated incrementally; only the first
+    ``head_chars`` characters are kept, for NER, plus a few windows sampled
+    across the text for language detection.
+    
+    ``stage_timings`` adds up the seconds spent per stage, keyed by the name
+    of the ``DocumentProcessor`` method that does the same work on a whole
+    text (``text_metrics`` for the word and sentence statistics). With ``stages``,
+    only those of the per-page stages run (see ``ANALYSIS_STAGES``).
+    ``document_info`` holds what the file structure says without extraction.
+    """
+    
+    def __init__(self, entity_extractor: EntityExtractor, keyword_matcher: KeywordMatcher, head_chars: int = 15000,
+                 language_sampler: Optional[WindowSampler] = None, stages: Optional[Iterable[str]] = None):
+        self.entity_extractor = entity_extractor
+        self.stages = frozenset(ANALYSIS_STAGES if stages is None else stages)
+        self.stats = TextStats()
+        self._entities = EntityAccumulator()
+        self._entity_scan = ChunkedScan(entity_extractor)
+        self.keywords = KeywordScanner(keyword_matcher)
+        self.language = language_sampler or WindowSampler()
+        self.page_count = 0
+        self.text_length = 0
+        self.document_info: Dict[str, Any] = {}
+        self.skipped_stages: List[str] = []
+        self.stage_timings: Dict[str, float] = {}
+        self.started_at = datetime.utcnow()
+        self.head_chars = head_chars
+        self._head: List[str] = []
+        self._head_length = 0
+    
+    def add_page(self, text: str):
+        """
+        Analyze the next page; pages without text still count towards ``page_count``.
+        A ``PageContinuation`` continues the page before it.
+        """
+        continued = isinstance(text, PageContinuation)
+        if not continued:
+            self.page_count += 1
+            self._finish_entities()
+        if not text:
+            return
+        start = time.perf_counter()
+        if self.text_length and not continued:
+            self._feed_text(PAGE_SEPARATOR)
+        self._feed_text(text)
+        if "text_metrics" in self.stages:
+            self.add_timing("text_metrics", time.perf_counter() - start)
+        if "extract_entities" in self.stages:
+            start = time.perf_counter()
+            self._entities.add(self._entity_scan.feed(text))
+            self.add_timing("extract_entities", time.perf_counter() - start)
+        if "match_keywords" in self.stages:
+            start = time.perf_counter()
+            self.keywords.feed(text, continued)
+            self.add_timing("match_keywords", time.perf_counter() - start)
+    
+    def _finish_entities(self):
+        """Scan the end of the last page, held back in case a continuation followed."""
+        if self._entity_scan.pending:
+            start = time.perf_counter()
+            self._entities.add(self._entity_scan.finish())
+            self.add_timing("extract_entities", time.perf_counter() - start)
+    
+    @property
+    def entities(self) -> EntityAccumulator:
+        """The entities of every page added so far."""
+        self._finish_entities()
+        return self._entities
+    
+    def _feed_text(self, text: str):
+        self.text_length += len(text)
+        if "text_metrics" in self.stages:
+            self.stats.feed(text)
+        if "detect_language" in self.stages:
+            self.language.feed(text)
+        if "extract_organizations" in self.stages and self._head_length < self.head_chars:
+            piece = text[:self.head_chars - self._head_length]
+            self._head.append(piece)
+            self._head_length += len(piece)
+    
+    def add_timing(self, stage: str, seconds: float):
+        """Add time spent in a stage."""
+        self.stage_timings[stage] = self.stage_timings.get(stage, 0.0) + seconds
+    
+    def skip_stage(self, stage: str):
+        """Record a stage that ran over its time budget."""
+        if stage not in self.skipped_stages:
+            self.skipped_stages.append(stage)
+    
+    @property
+    def head(self) -> str:
+        """The first ``head_chars`` characters of the document text."""
+        return "".join(self._head)
+    
+    def text_metrics(self) -> Dict[str, Any]:
+        """Counts, preview and summary in the shape of the processing metadata."""
+        return self.stats.metrics()
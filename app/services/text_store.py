@@ -0,0 +1,208 @@
+"""
+Side store for the full extracted text of documents, page by page.
+
+Extraction (PDF parsing, OCR) is the expensive part of processing, so its
+output is kept: each page is zlib-compressed on its own and written to one
+file per document on the storage volume, followed by an index of page
+offsets. Any page range can then be read back without decompressing the
+rest, and reprocessing or exports never have to extract the text again.
+Long pages are written and read back in chunks, so neither side ever holds
+a whole page of a huge text file.
+
+File layout: ``MAGIC``, the compressed pages, the page offsets as unsigned
+64-bit integers (one per page, plus the end of the last page), then the
+offset of that index and the page count, and ``MAGIC`` again.
+"""
+import codecs
+import os
+import shutil
+import struct
+import zlib
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from app.config import settings
+from app.services.extractors import PageContinuation
+
+MAGIC = b"DPTX1\n"
+COMPRESSION_LEVEL = 6
+_FOOTER = struct.Struct("<QQ")
+
+
+class TextStoreError(Exception):
+    """A stored text file is missing or damaged."""
+
+
+class PageTextWriter:
+    """
+    Write pages one at a time; the file appears under its final name only
+    once ``commit`` is called, so readers never see a half-written document.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self.page_count = 0
+        self._offsets: List[int] = []
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(MAGIC)
+        self._compressor = None
+    
+    def add_page(self, text: str):
+        """
+        Append the next page; empty pages are kept, so page numbers stay aligned.
+        A ``PageContinuation`` is appended to the page before it.
+        """
+        if not isinstance(text, PageContinuation) or self._compressor is None:
+            self._end_page()
+            self._offsets.append(self._file.tell())
+            self._compressor = zlib.compressobj(COMPRESSION_LEVEL)
+            self.page_count += 1
+        self._file.write(self._compressor.compress(text.encode("utf-8")))
+    
+    def _end_page(self):
+        if self._compressor is not None:
+            self._file.write(self._compressor.flush())
+            self._compressor = None
+    
+    def commit(self):
+        """Write the index and move the file into place."""
+        self._end_page()
+        self._offsets.append(self._file.tell())
+        index_offset = self._file.tell()
+        self._file.write(struct.pack(f"<{len(self._offsets)}Q", *self._offsets))
+        self._file.write(_FOOTER.pack(index_offset, self.page_count))
+        self._file.write(MAGIC)
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+    
+    def abort(self):
+        """Drop everything written so far."""
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except FileNotFoundError:
+            pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
+
+
+class TextStore:
+    """Per-page extracted text, keyed by tenant and document id."""
+    
+    @staticmethod
+    def path_for(tenant_id: int, document_id: int) -> Path:
+        return Path(settings.storage_path) / f"tenant_{tenant_id}" / "text" / f"{document_id}.pages"
+    
+    @staticmethod
+    def writer(tenant_id: int, document_id: int) -> PageTextWriter:
+        """A writer that replaces the stored text of the document on commit."""
+        return PageTextWriter(TextStore.path_for(tenant_id, document_id))
+    
+    @staticmethod
+    def exists(tenant_id: int, document_id: int) -> bool:
+        return TextStore.path_for(tenant_id, document_id).is_file()
+    
+    @staticmethod
+    def page_count(tenant_id: int, document_id: int) -> int:
+        """Number of stored pages; raises TextStoreError if there is no stored text."""
+        with _open(TextStore.path_for(tenant_id, document_id)) as f:
+            return _read_footer(f)[1]
+    
+    @staticmethod
+    def iter_pages(tenant_id: int, document_id: int, start: int = 0, stop: Optional[int] = None,
+                   chunk_size: Optional[int] = None) -> Iterator[str]:
+        """
+        Yield the stored text of pages ``start`` up to ``stop`` (0-based, exclusive).
+        With ``chunk_size``, pages longer than that many bytes are yielded in
+        chunks, each after the first as a ``PageContinuation``.
+        """
+        with _open(TextStore.path_for(tenant_id, document_id)) as f:
+            index_offset, page_count = _read_footer(f)
+            stop = page_count if stop is None else min(stop, page_count)
+            start = max(0, start)
+            if start >= stop:
+                return
+            f.seek(index_offset + 8 * start)
+            offsets = struct.unpack(f"<{stop - start + 1}Q", f.read(8 * (stop - start + 1)))
+            f.seek(offsets[0])
+            for begin, end in zip(offsets, offsets[1:]):
+                try:
+                    if chunk_size is None:
+                        yield zlib.decompress(f.read(end - begin)).decode("utf-8")
+                    else:
+                        yield from _iter_page_chunks(f, end - begin, chunk_size)
+                except zlib.error as e:
+                    raise TextStoreError(f"Damaged page in {f.name}: {e}")
+    
+    @staticmethod
+    def copy(tenant_id: int, source_document_id: int, document_id: int) -> bool:
+        """
+        Give a document the stored text of an identical one; False if that has none.
+        Stored files are never modified in place, so a hard link is enough.
+        """
+        source = TextStore.path_for(tenant_id, source_document_id)
+        target = TextStore.path_for(tenant_id, document_id)
+        tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        try:
+            try:
+                os.link(source, tmp_path)
+            except FileNotFoundError:
+                return False
+            except OSError:
+                shutil.copyfile(source, tmp_path)
+            os.replace(tmp_path, target)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        return True
+
+
+def _open(path: Path):
+    try:
+        return open(path, "rb")
+    except FileNotFoundError:
+        raise TextStoreError(f"No stored text at {path}")
+
+
+def _iter_page_chunks(f, size: int, chunk_size: int) -> Iterator[str]:
+    """Decompress the page of ``size`` bytes at the position of ``f`` in chunks of about ``chunk_size`` bytes."""
+    decompressor = zlib.decompressobj()
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    first = True
+    while size:
+        data = f.read(min(size, chunk_size))
+        if not data:
+            raise zlib.error("page is truncated")
+        size -= len(data)
+        while data:
+            text = decoder.decode(decompressor.decompress(data, chunk_size))
+            data = decompressor.unconsumed_tail
+            if text:
+                yield text if first else PageContinuation(text)
+                first = False
+    text = decoder.decode(decompressor.flush(), final=True)
+    if not decompressor.eof:
+        raise zlib.error("incomplete compressed page")
+    if text or first:
+        yield text if first else PageContinuation(text)
+
+
+def _read_footer(f):
+    try:
+        f.seek(-(_FOOTER.size + len(MAGIC)), os.SEEK_END)
+    except OSError:
+        raise TextStoreError(f"Not a stored text file: {f.name}")
+    footer = f.read(_FOOTER.size + len(MAGIC))
+    if footer[_FOOTER.size:] != MAGIC:
+        raise TextStoreError(f"Not a stored text file: {f.name}")
+    return _FOOTER.unpack(footer[:_FOOTER.size])
@@ -1,85 +1,647 @@
 """
 Background worker for processing documents asynchronously.
 """
+import copy
 import os
-from rq import Worker, Queue, Connection
-from sqlalchemy.orm import Session
+import signal
+import socket
+import threading
+import time
+import logging
+import traceback
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+from rq import Worker, SimpleWorker, Queue, Connection
+from rq.job import Job
+from rq.timeouts import BaseTimeoutException, JobTimeoutException, UnixSignalDeathPenalty
+from rq.utils import import_attribute, utcnow
+from rq.worker import WorkerStatus
 
 from app.config import settings
-from app.database import get_db_context
+from app.database import engine, get_db_context
 from app.models.document import DocumentStatus
 from app.services.document_service import DocumentService
-from app.services.document_processor import DocumentProcessor
-from app.services.queue_service import redis_conn, document_queue
+from app.services.document_processor import DocumentProcessor, PROCESSOR_VERSION
+from app.services.fair_queue import FairQueue
+from app.services.metrics import observe_document, start_metrics_server
+from app.services.result_cache import ResultCache
+from app.services.lanes import BULK, EXPRESS
+from app.services.queue_backends import MessageQueueBackend, QueueMessage
+from app.services.queue_service import redis_conn, queue_backend, BACKFILL, PROCESS_DOCUMENT_JOB, RQ_QUEUES
+from app.services.text_store import TextStore
+from app.worker_pool import RecyclingMixin, WorkerPool, cpu_share, pool_size
+
+logger = logging.getLogger("document_platform")
+
+# Jobs that BatchWorker groups into micro-batches
+DOCUMENT_JOB = PROCESS_DOCUMENT_JOB
+
+# Seconds a StreamWorker waits for jobs before it checks again whether it should stop
+CLAIM_WAIT_SECONDS = 5
+
+# One processor (and NLP pipeline) per worker process, reused across jobs
+_processor: Optional[DocumentProcessor] = None
+
+
+def get_processor() -> DocumentProcessor:
+    """
+    Return the process-wide DocumentProcessor, building it on first use.
+    """
+    global _processor
+    if _processor is None:
+        _processor = DocumentProcessor()
+        logger.info(
+            "Document processor loaded",
+            extra={"model_load_seconds": round(_processor.model_load_seconds, 3)}
+        )
+    return _processor
 
 
 def process_document(document_id: int, tenant_id: int):
     """
     Process a document: extract real metadata from the actual file.
     """
-    processor = DocumentProcessor()
+    outcome = process_document_batch([(document_id, tenant_id)])[0]
+    if isinstance(outcome, Exception):
+        raise outcome
+    return outcome
+
+
+def process_document_batch(items: List[Tuple[int, int]]) -> list:
+    """
+    Process several documents together.
+    
+    The batch moves to PROCESSING with one UPDATE, and the final status of
+    every document (completed or failed) is written in one transaction at the
+    end, instead of a read, write and commit per status change.
+    Text extraction and the regex stages run per document; NER then runs once
+    for the whole batch through ``nlp.pipe``. Returns one entry per
+    ``(document_id, tenant_id)`` item, in order: the job result, or the
+    exception that document failed with. An exception that interrupts the
+    batch, such as the job timeout, becomes the outcome of every document
+    not finished yet, and those documents are marked failed.
+    """
+    job_start = time.perf_counter()
+    warm = _processor is not None
+    processor = get_processor()
+    model_load_seconds = 0.0 if warm else processor.model_load_seconds
+    outcomes = [None] * len(items)
+    analyzed = []
+    # Final status of each document, written together
+    updates = []
+    
+    with get_db_context() as db:
+        documents = DocumentService.claim_documents(db, items)
+        try:
+            for index, (document_id, tenant_id) in enumerate(items):
+                document = documents.get((document_id, tenant_id))
+                if not document:
+                    outcomes[index] = ValueError(f"Document {document_id} not found for tenant {tenant_id}")
+                    continue
+                
+                try:
+                    # Check if file exists
+                    if not os.path.exists(document.file_path):
+                        raise FileNotFoundError(f"File not found: {document.file_path}")
+                    
+                    # An identical file of this tenant was already processed: reuse its results
+                    source = ResultCache.find_source(db, document, PROCESSOR_VERSION)
+                    if source is not None:
+                        TextStore.copy(tenant_id, source.id, document_id)
+                        outcomes[index] = _complete_document(
+                            updates, document_id, tenant_id, copy.deepcopy(source.extracted_metadata),
+                            timings=_job_timings(job_start, model_load_seconds),
+                            log_extra={"warm": warm, "batch_size": len(items), "cached": True},
+                            stage_results=copy.deepcopy(source.stage_results)
+                        )
+                        continue
+                    
+                    # Cheap first phase: show what the file structure tells (PDF page count,
+                    # title, producer) as a partial result before the text is extracted
+                    document_info = processor.extract_document_info(document.file_path, document.original_filename)
+                    if document_info:
+                        DocumentService.update_document_status(
+                            db=db,
+                            document_id=document_id,
+                            tenant_id=tenant_id,
+                            status=DocumentStatus.PROCESSING,
+                            extracted_metadata=processor.preview_metadata(document_info)
+                        )
+                    
+                    # Extract text and run the per-document stages, keeping the text for reprocessing
+                    with TextStore.writer(tenant_id, document_id) as text_writer:
+                        analysis = processor.analyze_document(
+                            file_path=document.file_path,
+                            filename=document.original_filename,
+                            text_writer=text_writer,
+                            document_info=document_info
+                        )
+                    analyzed.append((index, document.original_filename, analysis))
+                except BaseTimeoutException:
+                    # The job alarm has fired: stop the batch, the handler below fails what is left
+                    raise
+                except Exception as e:
+                    updates.append(_failed_update(document_id, tenant_id, e))
+                    outcomes[index] = e
+            
+            # One NER pass for every document in the batch
+            organizations = processor.run_ner([analysis for _, _, analysis in analyzed])
+            
+            for (index, filename, analysis), orgs in zip(analyzed, organizations):
+                document_id, tenant_id = items[index]
+                try:
+                    stage_results = processor.stage_results(analysis, orgs)
+                    extracted_metadata = processor.metadata_from_stages(stage_results, filename, analysis)
+                    outcomes[index] = _complete_document(
+                        updates, document_id, tenant_id, extracted_metadata,
+                        timings=_job_timings(job_start, model_load_seconds),
+                        log_extra={"warm": warm, "batch_size": len(items), "cached": False},
+                        stage_results=stage_results
+                    )
+                except BaseTimeoutException:
+                    raise
+                except Exception as e:
+                    updates.append(_failed_update(document_id, tenant_id, e))
+                    outcomes[index] = e
+        except BaseException as e:
+            # Interrupted, e.g. by the job timeout: finished documents keep their outcome,
+            # the rest fail with the interruption instead of staying in PROCESSING
+            written = {(update["document_id"], update["tenant_id"]) for update in updates}
+            for index, item in enumerate(items):
+                if outcomes[index] is None:
+                    outcomes[index] = e
+                    if item in documents and item not in written:
+                        updates.append(_failed_update(*item, e))
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            # Also keeps what was finished when the batch is interrupted
+            DocumentService.bulk_update_status(db, updates)
+    
+    return outcomes
+
+
+def reprocess_document(document_id: int, tenant_id: int):
+    """
+    Bring a processed document up to the current stage versions.
+    
+    Only stages whose stored result is missing or from an older version run
+    again, over the text kept in the text store; the other results are reused.
+    The file is extracted again only when extraction itself is stale or its
+    text is not stored. A failure leaves the earlier metadata in place.
+    """
+    job_start = time.perf_counter()
+    warm = _processor is not None
+    processor = get_processor()
+    model_load_seconds = 0.0 if warm else processor.model_load_seconds
     
     with get_db_context() as db:
-        # Get document
         document = DocumentService.get_document_by_id(db, document_id, tenant_id)
         if not document:
             raise ValueError(f"Document {document_id} not found for tenant {tenant_id}")
         
-        # Update status to processing
-        DocumentService.update_document_status(
-            db=db,
-            document_id=document_id,
-            tenant_id=tenant_id,
-            status=DocumentStatus.PROCESSING
-        )
+        stale = processor.stale_stages(document.stage_results)
+        if not stale:
+            return {"document_id": document_id, "status": "unchanged", "stages": []}
         
+        stored_pages = None
+        if TextStore.exists(tenant_id, document_id):
+            stored_pages = TextStore.iter_pages(tenant_id, document_id, chunk_size=settings.text_chunk_chars)
+        text_writer = TextStore.writer(tenant_id, document_id)
         try:
-            # Check if file exists
-            if not os.path.exists(document.file_path):
-                raise FileNotFoundError(f"File not found: {document.file_path}")
-            
-            # Process the actual document
-            extracted_metadata = processor.process_document(
-                file_path=document.file_path,
-                filename=document.original_filename
+            extracted_metadata, stage_results, stages = processor.reprocess(
+                document.file_path, document.original_filename, document.stage_results,
+                stored_pages=stored_pages, text_writer=text_writer
             )
-            
-            # Update document with extracted metadata
-            DocumentService.update_document_status(
-                db=db,
-                document_id=document_id,
-                tenant_id=tenant_id,
-                status=DocumentStatus.COMPLETED,
-                extracted_metadata=extracted_metadata
+        except BaseException:
+            text_writer.abort()
+            raise
+        if "extraction" in stages:
+            text_writer.commit()
+        else:
+            text_writer.abort()
+        
+        updates = []
+        result = _complete_document(
+            updates, document_id, tenant_id, extracted_metadata,
+            timings=_job_timings(job_start, model_load_seconds),
+            log_extra={"warm": warm, "batch_size": 1, "cached": False, "reprocessed_stages": stages},
+            stage_results=stage_results
+        )
+        DocumentService.bulk_update_status(db, updates)
+        result["stages"] = stages
+        return result
+
+
+def _complete_document(
+    updates: List[dict],
+    document_id: int,
+    tenant_id: int,
+    extracted_metadata: dict,
+    timings: dict,
+    log_extra: dict,
+    stage_results: Optional[dict] = None
+) -> dict:
+    """
+    Add the completed status with the metadata to ``updates``, for
+    ``DocumentService.bulk_update_status``, and build the job result.
+    """
+    skipped_stages = extracted_metadata.get("skipped_stages") or []
+    # Partial results are stored under their own version, so the
+    # result cache never hands them out for identical uploads
+    updates.append({
+        "document_id": document_id,
+        "tenant_id": tenant_id,
+        "status": DocumentStatus.COMPLETED,
+        "extracted_metadata": extracted_metadata,
+        "processor_version": f"{PROCESSOR_VERSION}+partial" if skipped_stages else PROCESSOR_VERSION,
+        "stage_results": stage_results,
+    })
+    
+    if skipped_stages:
+        logger.warning(
+            "Document processed partially, stages over their time budget were skipped",
+            extra={"document_id": document_id, "tenant_id": tenant_id, "skipped_stages": skipped_stages}
+        )
+    logger.info(
+        "Document processed",
+        extra={"document_id": document_id, "tenant_id": tenant_id, **log_extra, **timings}
+    )
+    cached = log_extra.get("cached", False)
+    # Stage timings of a cached result belong to the document it was copied from
+    observe_document(
+        {} if cached else extracted_metadata.get("stage_timings", {}),
+        timings["job_seconds"],
+        cached
+    )
+    
+    return {
+        "document_id": document_id,
+        "status": "completed",
+        "metadata": extracted_metadata,
+        "timings": timings,
+        "cached": cached
+    }
+
+
+def _failed_update(document_id: int, tenant_id: int, error: Exception) -> dict:
+    """
+    Status update recording the error of a failed document. It also replaces
+    any metadata stored earlier, such as the document info preview, which
+    would otherwise sit next to FAILED as if it were a result.
+    """
+    return {
+        "document_id": document_id,
+        "tenant_id": tenant_id,
+        "status": DocumentStatus.FAILED,
+        "error_message": str(error),
+        "extracted_metadata": {},
+    }
+
+
+def _batch_timeout(timeouts: List[int]) -> int:
+    """
+    Time limit of a batch of jobs: the sum of their own limits, so that no
+    document of a slow batch gets less time than it would have alone. A job
+    without a limit (-1) leaves the batch without one.
+    """
+    return -1 if -1 in timeouts else sum(timeouts)
+
+
+def _job_timings(job_start: float, model_load_seconds: float) -> dict:
+    """Split wall-clock job time into model loading and the job itself."""
+    total = time.perf_counter() - job_start
+    return {
+        "model_load_seconds": round(model_load_seconds, 3),
+        "job_seconds": round(total - model_load_seconds, 3)
+    }
+
+
+class BatchWorker(SimpleWorker):
+    """
+    In-process worker that takes pending document jobs in micro-batches.
+    
+    Once a document job is dequeued, up to ``batch_size - 1`` more are taken
+    from the same queue, waiting at most ``max_wait`` seconds for them. The
+    batch runs through ``process_document_batch``; each job still gets its own
+    started/finished/failed bookkeeping in RQ.
+    """
+    
+    def __init__(self, *args, batch_size: Optional[int] = None, max_wait_ms: Optional[int] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_size = batch_size or settings.worker_batch_size
+        if max_wait_ms is None:
+            max_wait_ms = settings.worker_batch_max_wait_ms
+        self.max_wait = max_wait_ms / 1000
+    
+    def execute_job(self, job: Job, queue: Queue):
+        if self.batch_size <= 1 or job.func_name != DOCUMENT_JOB:
+            return super().execute_job(job, queue)
+        
+        self.set_state(WorkerStatus.BUSY)
+        batch, others = self._collect_batch(job, queue)
+        self.perform_batch(batch, queue)
+        for other in others:
+            self.perform_job(other, queue)
+        self.set_state(WorkerStatus.IDLE)
+    
+    def _collect_batch(self, job: Job, queue: Queue) -> Tuple[List[Job], List[Job]]:
+        """Dequeue more jobs until the batch is full or the wait is over."""
+        batch, others = [job], []
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            result = self.queue_class.dequeue_any(
+                [queue], None, connection=self.connection, job_class=self.job_class, serializer=self.serializer
             )
-            
-            return {
-                "document_id": document_id,
-                "status": "completed",
-                "metadata": extracted_metadata
-            }
-            
+            if result is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                time.sleep(min(0.05, remaining))
+                continue
+            next_job = result[0]
+            if next_job.func_name == DOCUMENT_JOB:
+                batch.append(next_job)
+            else:
+                others.append(next_job)
+        return batch, others
+    
+    def perform_batch(self, jobs: List[Job], queue: Queue):
+        """Run document jobs as one batch with the same bookkeeping ``perform_job`` does for one."""
+        started_job_registry = queue.started_job_registry
+        for job in jobs:
+            self.prepare_job_execution(job)
+            job.started_at = utcnow()
+        
+        timeout = _batch_timeout([job.timeout or self.queue_class.DEFAULT_TIMEOUT for job in jobs])
+        try:
+            with self.death_penalty_class(timeout, JobTimeoutException, job_id=jobs[0].id):
+                outcomes = process_document_batch([tuple(job.args) for job in jobs])
         except Exception as e:
-            # Update document with error
-            error_msg = str(e)
-            DocumentService.update_document_status(
-                db=db,
-                document_id=document_id,
-                tenant_id=tenant_id,
-                status=DocumentStatus.FAILED,
-                error_message=error_msg
-            )
-            raise
+            # Only failures outside the documents, e.g. the database being down, get here
+            outcomes = [e] * len(jobs)
+        
+        for job, outcome in zip(jobs, outcomes):
+            job.ended_at = utcnow()
+            if isinstance(outcome, Exception):
+                exc_string = "".join(traceback.format_exception(type(outcome), outcome, outcome.__traceback__))
+                self.handle_job_failure(
+                    job=job, exc_string=exc_string, queue=queue, started_job_registry=started_job_registry
+                )
+            else:
+                job._result = outcome
+                self.handle_job_success(job=job, queue=queue, started_job_registry=started_job_registry)
+        
+        logger.info("Document batch processed", extra={"batch_size": len(jobs)})
+
+
+class StreamWorker:
+    """
+    Worker for the message queue backends (QUEUE_BACKEND=redis_streams).
+    
+    Claims up to WORKER_BATCH_SIZE jobs at a time, runs the document jobs
+    among them together through ``process_document_batch`` and any other job
+    on its own, and acknowledges every job once it is done, failed or not.
+    While jobs run, a heartbeat thread extends their claim, so only the jobs
+    of a worker that died are delivered again. A document job delivered more
+    than QUEUE_MAX_DELIVERIES times fails its document instead of running
+    again. SIGTERM or SIGINT stop the worker after its current jobs.
+    """
+    
+    def __init__(self, backend: MessageQueueBackend, queues: List[str], name: Optional[str] = None,
+                 batch_size: Optional[int] = None, max_deliveries: Optional[int] = None):
+        self.backend = backend
+        self.queues = queues
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.batch_size = max(1, batch_size or settings.worker_batch_size)
+        self.max_deliveries = max_deliveries or settings.queue_max_deliveries
+        self._stop_requested = False
+    
+    def work(self, burst: bool = False):
+        """Claim and run jobs until asked to stop; with ``burst``, until the queues are empty."""
+        previous_handlers = {
+            signum: signal.signal(signum, lambda signum, frame: self.request_stop())
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        logger.info("Stream worker started", extra={"consumer": self.name, "queues": self.queues})
+        try:
+            while not self._stop_requested:
+                messages = self.backend.claim(
+                    self.queues, self.name, self.batch_size, timeout=None if burst else CLAIM_WAIT_SECONDS
+                )
+                if messages:
+                    self.execute_job(messages)
+                elif burst:
+                    break
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+            # Kept by the backend while jobs are still pending, e.g. after an error, so they are redelivered
+            self.backend.release(self.name)
+    
+    def request_stop(self):
+        self._stop_requested = True
+    
+    def execute_job(self, messages: List[QueueMessage]):
+        """Run claimed jobs and acknowledge each."""
+        given_up = [message for message in messages if message.deliveries > self.max_deliveries]
+        if given_up:
+            self._give_up(given_up)
+        runnable = [message for message in messages if message.deliveries <= self.max_deliveries]
+        if not runnable:
+            return
+        with self._heartbeat(runnable):
+            outcomes = self._run(runnable)
+        for message, outcome in zip(runnable, outcomes):
+            if isinstance(outcome, Exception):
+                self.handle_job_failure(message, outcome)
+            else:
+                self.handle_job_success(message, outcome)
+    
+    def handle_job_success(self, message: QueueMessage, result=None):
+        self.backend.ack(message)
+    
+    def handle_job_failure(self, message: QueueMessage, error: Exception):
+        logger.error("Job failed", extra={"job_id": message.job_id, "error": str(error)})
+        self.backend.ack(message, error=str(error))
+    
+    def _run(self, messages: List[QueueMessage]) -> list:
+        """One outcome per message, in order: the job result or the exception it raised."""
+        outcomes = {}
+        documents = [message for message in messages if message.func_name == DOCUMENT_JOB]
+        if documents:
+            try:
+                timeout = _batch_timeout([message.timeout for message in documents])
+                with UnixSignalDeathPenalty(timeout, JobTimeoutException):
+                    results = process_document_batch([tuple(message.args) for message in documents])
+            except Exception as e:
+                # As in BatchWorker.perform_batch, interruptions are already outcomes per document
+                results = [e] * len(documents)
+            outcomes.update(zip((message.message_id for message in documents), results))
+        for message in messages:
+            if message.func_name == DOCUMENT_JOB:
+                continue
+            try:
+                with UnixSignalDeathPenalty(message.timeout, JobTimeoutException):
+                    outcomes[message.message_id] = import_attribute(message.func_name)(*message.args)
+            except Exception as e:
+                outcomes[message.message_id] = e
+        return [outcomes[message.message_id] for message in messages]
+    
+    def _give_up(self, messages: List[QueueMessage]):
+        """Fail jobs whose workers kept dying on them; a document job also fails its document."""
+        updates = []
+        for message in messages:
+            error = RuntimeError(f"Processing was interrupted {message.deliveries - 1} times")
+            logger.warning("Job delivered too often, giving up",
+                           extra={"job_id": message.job_id, "deliveries": message.deliveries})
+            if message.func_name == DOCUMENT_JOB:
+                updates.append(_failed_update(*message.args, error))
+            self.handle_job_failure(message, error)
+        if updates:
+            with get_db_context() as db:
+                DocumentService.bulk_update_status(db, updates)
+    
+    @contextmanager
+    def _heartbeat(self, messages: List[QueueMessage]):
+        """Extend the claim on ``messages`` every third of the visibility timeout until the block ends."""
+        done = threading.Event()
+        
+        def beat():
+            while not done.wait(self.backend.visibility_timeout / 3):
+                try:
+                    self.backend.extend(messages, self.name)
+                except Exception as e:
+                    logger.warning("Could not extend job claims", extra={"error": str(e)})
+        
+        thread = threading.Thread(target=beat, name="claim-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+
+def lane_queues(slot: int, processes: int) -> List[str]:
+    """
+    Queues worker ``slot`` of ``processes`` serves, in order of preference.
+    
+    The first WORKER_EXPRESS_PROCESSES slots serve only the express lane,
+    always leaving one worker for bulk. The others take bulk jobs first and
+    help out with express jobs, then backfill, when the bulk lane is empty;
+    with no express-only worker, express jobs come first.
+    """
+    express_slots = min(settings.worker_express_processes, processes - 1)
+    if slot < express_slots:
+        return [EXPRESS]
+    if express_slots > 0:
+        return [BULK, EXPRESS, BACKFILL]
+    return [EXPRESS, BULK, BACKFILL]
+
+
+class PoolWorker(RecyclingMixin, SimpleWorker):
+    """Worker pool child running one job at a time in its own process."""
+
+
+class PoolBatchWorker(RecyclingMixin, BatchWorker):
+    """Worker pool child taking document jobs in micro-batches."""
+
+
+class PoolStreamWorker(RecyclingMixin, StreamWorker):
+    """Worker pool child claiming jobs from a message queue backend."""
+
+
+def share_cpus(processor: DocumentProcessor, processes: int):
+    """
+    Size the PDF and OCR process pools of a pool worker's processor to its
+    share of the CPUs; with one pool per CPU-sized worker each, a pool of N
+    workers would otherwise start about N² processes. PDF_PARALLEL_WORKERS and
+    OCR_WORKERS still win when set.
+    """
+    share = cpu_share(processes)
+    processor.parallel_workers = settings.pdf_parallel_workers or share
+    processor.ocr_workers = settings.ocr_workers or share
+
+
+def run_pool_worker(slot: int, max_jobs: int, max_memory_mb: int):
+    """Body of a worker pool child: work the queues until recycled or stopped."""
+    # Own process group: a Ctrl-C in the terminal reaches only the supervisor, which
+    # forwards one SIGTERM; a second signal would make RQ abandon the current job
+    os.setpgrp()
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    # Database connections opened before the fork belong to the supervisor
+    engine.dispose(close=False)
+    if settings.worker_metrics_port:
+        # Each child serves its own histograms; Prometheus scrapes one port per slot
+        start_metrics_server(settings.worker_metrics_port + slot)
+    share_cpus(get_processor(), settings.worker_processes)
+    queues = lane_queues(slot, pool_size(settings.worker_processes))
+    if isinstance(queue_backend, MessageQueueBackend):
+        PoolStreamWorker(queue_backend, queues, max_jobs=max_jobs, max_memory_mb=max_memory_mb).work()
+        return
+    worker_class = PoolBatchWorker if settings.worker_batch_size > 1 else PoolWorker
+    with Connection(redis_conn):
+        worker = worker_class(
+            [RQ_QUEUES[name] for name in queues], queue_class=FairQueue, max_jobs=max_jobs, max_memory_mb=max_memory_mb
+        )
+        worker.work()
 
 
 def start_worker():
-    """Start the RQ worker to process jobs."""
+    """
+    Start the workers that process jobs.
+    
+    The processor is built before any worker starts, so its NLP pipeline is
+    loaded once. By default a supervisor then forks WORKER_PROCESSES
+    long-lived workers, one per CPU, and replaces each after
+    WORKER_MAX_JOBS jobs or once it passes WORKER_MAX_MEMORY_MB (see
+    ``app.worker_pool``). Pool workers always run jobs in their own process.
+    
+    With WORKER_PROCESSES=1 a single worker runs in this process instead:
+    with WORKER_BATCH_SIZE above 1, document jobs are processed in
+    micro-batches (BatchWorker). Otherwise, in warm mode jobs run inside this
+    long-lived process (SimpleWorker), and without it RQ forks a child per job,
+    which still inherits the loaded model.
+    
+    With WORKER_METRICS_PORT set, stage and job time histograms are served on
+    ``/metrics`` for Prometheus, by pool worker ``n`` on the port plus ``n``.
+    
+    Document jobs are taken tenant by tenant (``FairQueue``), so one tenant's
+    backlog does not hold up the others. Pool workers are split between the
+    express and bulk lanes (``lane_queues``); a single worker takes express
+    jobs first. Reprocessing jobs from the backfill queue are only taken
+    while both lanes are empty.
+    
+    With QUEUE_BACKEND=redis_streams, every worker is a ``StreamWorker``
+    instead of an RQ worker, in the pool or alone.
+    """
+    get_processor()
+    if settings.worker_processes != 1:
+        WorkerPool(
+            processes=settings.worker_processes,
+            max_jobs=settings.worker_max_jobs,
+            max_memory_mb=settings.worker_max_memory_mb,
+            target=run_pool_worker,
+        ).run()
+        return
+    if settings.worker_metrics_port:
+        if settings.worker_batch_size <= 1 and not settings.worker_warm_mode:
+            logger.warning("Forked jobs are not counted in worker metrics; enable WORKER_WARM_MODE")
+        start_metrics_server(settings.worker_metrics_port)
+    if isinstance(queue_backend, MessageQueueBackend):
+        StreamWorker(queue_backend, lane_queues(0, 1)).work()
+        return
+    if settings.worker_batch_size > 1:
+        worker_class = BatchWorker
+    else:
+        worker_class = SimpleWorker if settings.worker_warm_mode else Worker
     with Connection(redis_conn):
-        worker = Worker([document_queue])
+        worker = worker_class([RQ_QUEUES[name] for name in lane_queues(0, 1)], queue_class=FairQueue)
         worker.work()
 
 
 if __name__ == "__main__":
     print("Starting document processing worker...")
     start_worker()
-
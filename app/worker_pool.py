@@ -0,0 +1,184 @@
+"""
+Pre-forked pool of long-lived worker processes.
+
+The supervisor loads the document processor (NLP pipeline, language
+profiles, compiled patterns) once and then forks ``WORKER_PROCESSES``
+children, one per CPU by default. Each child runs jobs inside its own
+process, so what it loaded or cached stays warm from one job to the next.
+A child retires after ``WORKER_MAX_JOBS`` jobs, or once its resident memory
+passes ``WORKER_MAX_MEMORY_MB``, and the supervisor forks a fresh one in
+its place. SIGTERM or SIGINT to the supervisor stops every child after its
+current job.
+"""
+import gc
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import time
+from typing import Callable, Dict, Optional
+
+from app.config import settings
+
+logger = logging.getLogger("document_platform")
+
+# Seconds to wait before replacing a child that crashed, so a broken setup does not fork in a loop
+RESTART_DELAY_SECONDS = 1.0
+# Seconds between checks of the children while none has exited
+POLL_SECONDS = 1.0
+
+
+def resident_memory_mb() -> float:
+    """Resident memory of this process in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # Without /proc: the peak, in KB on Linux but bytes on macOS
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def pool_size(processes: int = 0) -> int:
+    """Worker processes in a pool configured with ``processes``; 0 means one per CPU."""
+    return processes or os.cpu_count() or 1
+
+
+def cpu_share(processes: int = 0) -> int:
+    """CPUs per worker of a pool configured with ``processes``, at least one."""
+    return max(1, (os.cpu_count() or 1) // pool_size(processes))
+
+
+class RecyclingMixin:
+    """
+    Stop the worker after ``max_jobs`` jobs, or after a job that leaves its
+    memory above ``max_memory_mb``; 0 disables either limit. The worker
+    finishes its current job (or micro-batch) and then leaves ``work()``.
+    """
+    
+    def __init__(self, *args, max_jobs: int = 0, max_memory_mb: int = 0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_jobs = max_jobs
+        self.max_memory_mb = max_memory_mb
+        self.jobs_done = 0
+    
+    def handle_job_success(self, *args, **kwargs):
+        self.jobs_done += 1
+        return super().handle_job_success(*args, **kwargs)
+    
+    def handle_job_failure(self, *args, **kwargs):
+        self.jobs_done += 1
+        return super().handle_job_failure(*args, **kwargs)
+    
+    def execute_job(self, *args, **kwargs):
+        result = super().execute_job(*args, **kwargs)
+        reason = self.recycle_reason()
+        if reason:
+            logger.info("Worker process recycling", extra={"reason": reason, "jobs": self.jobs_done, "pid": os.getpid()})
+            self._stop_requested = True
+        return result
+    
+    def recycle_reason(self) -> Optional[str]:
+        if self.max_jobs and self.jobs_done >= self.max_jobs:
+            return "max_jobs"
+        if self.max_memory_mb and resident_memory_mb() > self.max_memory_mb:
+            return "max_memory"
+        return None
+
+
+class WorkerPool:
+    """
+    Keep ``processes`` worker processes running, forked from this process.
+    
+    ``run`` blocks until ``stop`` is called or the supervisor gets SIGTERM or
+    SIGINT. Children are forked, never spawned, so they start with whatever
+    the supervisor loaded before ``run``.
+    """
+    
+    def __init__(self, processes: int = 0, max_jobs: int = 0, max_memory_mb: int = 0,
+                 target: Optional[Callable[[int, int, int], None]] = None,
+                 shutdown_timeout: Optional[float] = None):
+        self.processes = pool_size(processes)
+        self.max_jobs = max_jobs
+        self.max_memory_mb = max_memory_mb
+        if target is None:
+            from app.worker import run_pool_worker
+            target = run_pool_worker
+        self.target = target
+        if shutdown_timeout is None:
+            shutdown_timeout = settings.worker_shutdown_timeout_seconds
+        self.shutdown_timeout = shutdown_timeout
+        self.restarts = 0
+        self._context = multiprocessing.get_context("fork")
+        self._children: Dict[int, multiprocessing.Process] = {}
+        self._stopping = False
+    
+    def run(self):
+        """Fork the children and replace any that exits, until stopped."""
+        previous_handlers = {
+            signum: signal.signal(signum, lambda signum, frame: self.stop())
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        # Keep the loaded objects out of the collector, so the children share their memory pages
+        gc.freeze()
+        try:
+            logger.info("Worker pool starting", extra={"processes": self.processes, "max_jobs": self.max_jobs,
+                                                       "max_memory_mb": self.max_memory_mb})
+            for slot in range(self.processes):
+                self._start(slot)
+            while not self._stopping:
+                multiprocessing.connection.wait([child.sentinel for child in self._children.values()], POLL_SECONDS)
+                for slot, child in list(self._children.items()):
+                    if not self._stopping and child.exitcode is not None:
+                        self._replace(slot, child)
+        finally:
+            self._shutdown()
+            gc.unfreeze()
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+    
+    def stop(self):
+        """Ask ``run`` to stop the children and return."""
+        self._stopping = True
+    
+    def _start(self, slot: int):
+        child = self._context.Process(
+            target=self.target, args=(slot, self.max_jobs, self.max_memory_mb), name=f"worker-{slot}"
+        )
+        child.start()
+        self._children[slot] = child
+    
+    def _replace(self, slot: int, child: multiprocessing.Process):
+        child.join()
+        self.restarts += 1
+        if child.exitcode == 0:
+            logger.info("Worker process retired", extra={"slot": slot, "pid": child.pid})
+        else:
+            logger.warning("Worker process died", extra={"slot": slot, "pid": child.pid, "exitcode": child.exitcode})
+            time.sleep(RESTART_DELAY_SECONDS)
+            if self._stopping:
+                return
+        self._start(slot)
+    
+    def _shutdown(self):
+        """SIGTERM every child (warm shutdown: the current job finishes), then kill what is left at the timeout."""
+        children = list(self._children.values())
+        for child in children:
+            if child.exitcode is None:
+                try:
+                    os.kill(child.pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+        deadline = time.monotonic() + self.shutdown_timeout
+        for child in children:
+            child.join(max(0.0, deadline - time.monotonic()))
+        for child in children:
+            if child.exitcode is None:
+                logger.warning("Worker process killed at shutdown", extra={"pid": child.pid})
+                child.kill()
+                child.join()
+        self._children.clear()
+        logger.info("Worker pool stopped", extra={"restarts": self.restarts})
@@ -0,0 +1,58 @@
+"""
+Entity extraction throughput: single-pass engine vs. one findall per pattern.
+
+Usage: python -m benchmarks.bench_entities [--sizes 100000 1000000] [--repeat 3]
+"""
+import argparse
+import time
+
+from app.services.entity_extractor import EntityExtractor, limit_entities
+from benchmarks.corpus import synthetic_text
+from benchmarks.reference import legacy_extract_entities
+
+
+def _best_of(repeat, fn, *args):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(sizes, repeat=3):
+    """Return one result row per text size."""
+    extractor = EntityExtractor()
+    rows = []
+    for size in sizes:
+        text = synthetic_text(size)
+        megabytes = len(text.encode("utf-8")) / 1_000_000
+        legacy_seconds, legacy = _best_of(repeat, legacy_extract_entities, text)
+        engine_seconds, engine = _best_of(repeat, lambda t: limit_entities(extractor.scan(t)), text)
+        rows.append({
+            "size_bytes": size,
+            "legacy_mb_per_s": round(megabytes / legacy_seconds, 2),
+            "engine_mb_per_s": round(megabytes / engine_seconds, 2),
+            "speedup": round(legacy_seconds / engine_seconds, 2),
+            "identical_output": legacy == engine,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'size':>10} {'legacy MB/s':>12} {'engine MB/s':>12} {'speedup':>8} {'identical':>10}")
+    for row in run(args.sizes, args.repeat):
+        print(
+            f"{row['size_bytes']:>10} {row['legacy_mb_per_s']:>12} {row['engine_mb_per_s']:>12} "
+            f"{row['speedup']:>7}x {str(row['identical_output']):>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Queue latency of small tenants while a large tenant floods the queue: one FIFO list vs. per-tenant fair scheduling.
+
+A discrete-event simulation, so it needs no Redis and runs in seconds. At
+time 0 one tenant uploads a large backlog; meanwhile small tenants upload a
+document now and then, using the spare capacity of the workers. Every
+simulated worker keeps its own ``DeficitRoundRobin``, as worker processes
+do. Latency is upload to end of processing, in simulated seconds.
+
+Usage: python -m benchmarks.bench_fair_queue [--workers 4] [--flood 2000] [--small-tenants 10] [--job-seconds 1.0]
+"""
+import argparse
+import heapq
+import random
+from collections import deque
+
+from app.services.fair_queue import DeficitRoundRobin
+
+FLOOD_TENANT = "flood"
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _uploads(flood, small_tenants, small_interval, seed):
+    """(upload time, tenant, processing seconds factor) of every job, in upload order."""
+    rng = random.Random(seed)
+    uploads = [(0.0, FLOOD_TENANT, rng.uniform(0.5, 1.5)) for _ in range(flood)]
+    for number in range(small_tenants):
+        at = rng.uniform(0, small_interval)
+        while at < flood / 2:
+            uploads.append((at, f"small{number}", rng.uniform(0.5, 1.5)))
+            at += rng.expovariate(1 / small_interval)
+    return sorted(uploads, key=lambda upload: upload[0])
+
+
+def simulate(uploads, workers, job_seconds, fair, weights=None):
+    """Latency of every job, by tenant."""
+    queues = {}
+    fifo = deque()
+    schedulers = [DeficitRoundRobin(weights) for _ in range(workers)]
+    latencies = {}
+    free = [(0.0, worker) for worker in range(workers)]
+    next_upload = 0
+    done = 0
+    while done < len(uploads):
+        now, worker = heapq.heappop(free)
+        while next_upload < len(uploads) and uploads[next_upload][0] <= now:
+            job = uploads[next_upload]
+            if fair:
+                queues.setdefault(job[1], deque()).append(job)
+            else:
+                fifo.append(job)
+            next_upload += 1
+        if fair:
+            tenant = schedulers[worker].next_tenant([tenant for tenant, waiting in queues.items() if waiting])
+            job = queues[tenant].popleft() if tenant is not None else None
+        else:
+            job = fifo.popleft() if fifo else None
+        if job is None:
+            # Idle until the next upload
+            heapq.heappush(free, (uploads[next_upload][0], worker))
+            continue
+        uploaded_at, tenant, factor = job
+        finished_at = now + job_seconds * factor
+        latencies.setdefault(tenant, []).append(finished_at - uploaded_at)
+        heapq.heappush(free, (finished_at, worker))
+        done += 1
+    return latencies
+
+
+def run(workers=4, flood=2000, small_tenants=10, job_seconds=1.0, seed=0):
+    """Return one result row per scheduling policy."""
+    # Small tenants together use about a fifth of the workers
+    small_interval = small_tenants * job_seconds / (workers * 0.2)
+    uploads = _uploads(flood, small_tenants, small_interval, seed)
+    rows = []
+    for name, fair in (("fifo (before)", False), ("fair (drr)", True)):
+        latencies = simulate(uploads, workers, job_seconds, fair)
+        small = [latency for tenant, values in latencies.items() if tenant != FLOOD_TENANT for latency in values]
+        rows.append({
+            "policy": name,
+            "small_jobs": len(small),
+            "small_p50_seconds": round(_percentile(small, 0.50), 1),
+            "small_p99_seconds": round(_percentile(small, 0.99), 1),
+            "flood_p99_seconds": round(_percentile(latencies[FLOOD_TENANT], 0.99), 1),
+            "flood_done_seconds": round(max(latencies[FLOOD_TENANT]), 1),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--flood", type=int, default=2000, help="jobs the large tenant uploads at once")
+    parser.add_argument("--small-tenants", type=int, default=10)
+    parser.add_argument("--job-seconds", type=float, default=1.0, help="mean processing time of a job")
+    args = parser.parse_args()
+    
+    print(
+        f"{'policy':<14} {'small jobs':>11} {'small p50 s':>12} {'small p99 s':>12} "
+        f"{'flood p99 s':>12} {'flood done s':>13}"
+    )
+    for row in run(args.workers, args.flood, args.small_tenants, args.job_seconds):
+        print(
+            f"{row['policy']:<14} {row['small_jobs']:>11} {row['small_p50_seconds']:>12} "
+            f"{row['small_p99_seconds']:>12} {row['flood_p99_seconds']:>12} {row['flood_done_seconds']:>13}"
+        )
+
+
+if __name__ == "__main__":
+    main()
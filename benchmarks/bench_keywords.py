@@ -0,0 +1,77 @@
+"""
+Document type + content category detection: shared keyword matcher vs. the
+two original functions, each lowercasing and scanning the text on its own.
+
+Usage: python -m benchmarks.bench_keywords [--sizes 100000 1000000 5000000] [--repeat 3]
+"""
+import argparse
+import time
+
+from app.services.document_processor import DocumentProcessor
+from benchmarks.corpus import synthetic_text
+from benchmarks.reference import legacy_detect_document_type, legacy_categorize_content
+
+FILENAME = "upload.pdf"
+
+
+def _best_of(repeat, fn, text):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _legacy(text):
+    return legacy_detect_document_type(text, FILENAME), legacy_categorize_content(text)
+
+
+def run(sizes, repeat=3):
+    """Return one row per text size and kind (keyword-rich prose, text without keywords)."""
+    processor = DocumentProcessor()
+    
+    def shared(text):
+        matched = processor.match_keywords(text)
+        return (
+            processor.detect_document_type(text, FILENAME, matched),
+            processor._categorize_content(text, {}, matched)
+        )
+    
+    rows = []
+    for size in sizes:
+        texts = {
+            "prose": synthetic_text(size),
+            "no_keywords": ("lorem ipsum dolor sit amet " * (size // 27 + 1))[:size],
+        }
+        for kind, text in texts.items():
+            legacy_seconds, legacy = _best_of(repeat, _legacy, text)
+            shared_seconds, result = _best_of(repeat, shared, text)
+            rows.append({
+                "size_bytes": size,
+                "kind": kind,
+                "legacy_ms": round(legacy_seconds * 1000, 2),
+                "shared_ms": round(shared_seconds * 1000, 2),
+                "speedup": round(legacy_seconds / shared_seconds, 2),
+                "identical_output": legacy == result,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    
+    print(f"{'size':>10} {'kind':>12} {'legacy ms':>10} {'shared ms':>10} {'speedup':>8} {'identical':>10}")
+    for row in run(args.sizes, args.repeat):
+        print(
+            f"{row['size_bytes']:>10} {row['kind']:>12} {row['legacy_ms']:>10} {row['shared_ms']:>10} "
+            f"{row['speedup']:>7}x {str(row['identical_output']):>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
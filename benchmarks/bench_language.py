@@ -0,0 +1,81 @@
+"""
+Language detection latency per call: langdetect on the first 1000 characters vs. sampled windows.
+
+The first call of each detector also pays for loading the language profiles;
+it is reported separately from the steady-state latency.
+
+Usage: python -m benchmarks.bench_language [--sizes 2000 50000 1000000] [--calls 50]
+"""
+import argparse
+import statistics
+import time
+
+from app.services.language_detector import LanguageDetector
+from benchmarks.corpus import synthetic_text
+
+
+def _legacy_detect(text: str) -> str:
+    from langdetect import detect, LangDetectException
+    try:
+        return detect(text[:1000])
+    except LangDetectException:
+        return "en"
+
+
+def _latencies_ms(detect, texts):
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        detect(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def _row(name, size, first_ms, latencies, languages):
+    latencies = sorted(latencies)
+    return {
+        "detector": name,
+        "chars": size,
+        "first_call_ms": round(first_ms, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+        "distinct_results": len(languages),
+    }
+
+
+def run(sizes, calls=50):
+    """Return one result row per detector and text size."""
+    sampled = LanguageDetector()
+    first = {}
+    for name, detect in (("first 1000 chars", _legacy_detect), ("sampled windows", sampled.detect)):
+        start = time.perf_counter()
+        detect(synthetic_text(2000, seed=0))
+        first[name] = (time.perf_counter() - start) * 1000
+    
+    rows = []
+    for size in sizes:
+        texts = [synthetic_text(size, seed=seed) for seed in range(calls)]
+        for name, detect in (("first 1000 chars", _legacy_detect), ("sampled windows", sampled.detect)):
+            latencies = _latencies_ms(detect, texts)
+            # Detecting the same text again must give the same answer
+            languages = {detect(texts[0]) for _ in range(10)}
+            rows.append(_row(name, size, first[name], latencies, languages))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 50_000, 1_000_000])
+    parser.add_argument("--calls", type=int, default=50)
+    args = parser.parse_args()
+    
+    print(f"{'detector':>17} {'chars':>9} {'first ms':>9} {'p50 ms':>7} {'p95 ms':>7} {'repeat results':>15}")
+    for row in run(args.sizes, args.calls):
+        print(
+            f"{row['detector']:>17} {row['chars']:>9} {row['first_call_ms']:>9} "
+            f"{row['p50_ms']:>7} {row['p95_ms']:>7} {row['distinct_results']:>15}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+OCR wall-clock time against image size: one tesseract call on the raw image vs. the OCR engine.
+
+Each row is a synthetic, about A4-sized page scanned at a given resolution. The legacy
+column is the old extract_text_from_image (full resolution, one call); the
+engine column downscales to OCR_TARGET_DPI, binarizes and OCRs the tiles in
+a process pool. Preprocessing is also timed on its own, so the benchmark
+still says something on machines without a tesseract binary.
+
+Usage: python -m benchmarks.bench_ocr [--dpi 150 300 600] [--pages 1] [--workers 4]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.services import ocr
+from app.services.document_processor import DocumentProcessor
+from benchmarks.corpus import synthetic_image
+
+A4_WIDTH_INCHES = 8.27
+
+
+def _tesseract_missing():
+    try:
+        ocr.pytesseract.get_tesseract_version()
+    except Exception as e:
+        return f"OCR unavailable: {type(e).__name__}"
+    return None
+
+
+def _timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def _legacy_ocr(path):
+    with ocr.Image.open(path) as image:
+        return ocr.pytesseract.image_to_string(image)
+
+
+def _preprocess_all(path, processor):
+    return [
+        ocr.split_tiles(ocr.preprocess(frame, processor.ocr_target_dpi), processor.ocr_tile_rows)
+        for frame in ocr.iter_frames(path)
+    ]
+
+
+def run(dpis, pages=1, workers=None, chars_per_page=16000):
+    """Return one result row per scan resolution."""
+    processor = DocumentProcessor()
+    processor.ocr_workers = workers or os.cpu_count() or 1
+    skip = _tesseract_missing()
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for dpi in dpis:
+            width = int(A4_WIDTH_INCHES * dpi)
+            extension = "tiff" if pages > 1 else "png"
+            path = synthetic_image(
+                os.path.join(tmp, f"scan_{dpi}.{extension}"), chars_per_page, pages=pages,
+                width=width, font_size=max(8, dpi // 12),
+            )
+            with ocr.Image.open(path) as image:
+                # Record the scan resolution, as a scanner would
+                frames = [frame.copy() for frame in ocr.ImageSequence.Iterator(image)]
+            frames[0].save(path, dpi=(dpi, dpi), save_all=pages > 1, append_images=frames[1:])
+            preprocess_seconds, tiles = _timed(lambda: _preprocess_all(path, processor))
+            row = {
+                "dpi": dpi,
+                "pixels": f"{frames[0].width}x{frames[0].height}",
+                "pages": pages,
+                "tiles": sum(len(frame_tiles) for frame_tiles in tiles),
+                "preprocess_seconds": round(preprocess_seconds, 3),
+                "legacy_seconds": None,
+                "engine_seconds": None,
+                "skipped": skip,
+            }
+            if not skip:
+                row["legacy_seconds"] = round(_timed(lambda: _legacy_ocr(path))[0], 2)
+                row["engine_seconds"] = round(_timed(lambda: list(processor.iter_image_pages(path)))[0], 2)
+            rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dpi", type=int, nargs="+", default=[150, 300, 600])
+    parser.add_argument("--pages", type=int, default=1, help="frames per image; above 1 writes a TIFF")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    
+    print(f"{'dpi':>5} {'pixels':>11} {'pages':>6} {'tiles':>6} {'preprocess s':>13} {'legacy s':>9} {'engine s':>9}")
+    for row in run(args.dpi, args.pages, args.workers):
+        legacy = row["legacy_seconds"] if row["legacy_seconds"] is not None else "-"
+        engine = row["engine_seconds"] if row["engine_seconds"] is not None else "-"
+        print(
+            f"{row['dpi']:>5} {row['pixels']:>11} {row['pages']:>6} {row['tiles']:>6} "
+            f"{row['preprocess_seconds']:>13} {legacy:>9} {engine:>9}  {row['skipped'] or ''}"
+        )
+    print("Legacy OCR reads only the first frame of a multi-page TIFF.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+PDF text extraction wall-clock time: one process vs. page ranges in a process pool.
+
+Usage: python -m benchmarks.bench_pdf_parallel [--pages 10 40 160] [--workers 4] [--range-pages 8]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.services.document_processor import DocumentProcessor
+from benchmarks.corpus import synthetic_pdf
+
+
+def _timed_pages(processor, path):
+    start = time.perf_counter()
+    pages = list(processor.iter_pdf_pages(path))
+    return time.perf_counter() - start, pages
+
+
+def run(page_counts, workers=None, range_pages=8, chars_per_page=3000):
+    """Return one result row per page count."""
+    workers = workers or os.cpu_count() or 1
+    sequential = DocumentProcessor()
+    sequential.parallel_page_threshold = 0  # never fan out
+    parallel = DocumentProcessor()
+    parallel.parallel_page_threshold = 1
+    parallel.parallel_workers = workers
+    parallel.parallel_range_pages = range_pages
+    
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in page_counts:
+            path = synthetic_pdf(os.path.join(tmp, f"bench_{pages}.pdf"), pages, chars_per_page)
+            sequential_seconds, expected = _timed_pages(sequential, path)
+            parallel_seconds, actual = _timed_pages(parallel, path)
+            rows.append({
+                "pages": pages,
+                "workers": workers,
+                "sequential_seconds": round(sequential_seconds, 2),
+                "parallel_seconds": round(parallel_seconds, 2),
+                "speedup": round(sequential_seconds / parallel_seconds, 2),
+                "identical_output": expected == actual,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 40, 160])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--range-pages", type=int, default=8)
+    args = parser.parse_args()
+    
+    print(f"{'pages':>6} {'workers':>8} {'sequential s':>13} {'parallel s':>11} {'speedup':>8} {'identical':>10}")
+    for row in run(args.pages, args.workers, args.range_pages):
+        print(
+            f"{row['pages']:>6} {row['workers']:>8} {row['sequential_seconds']:>13} "
+            f"{row['parallel_seconds']:>11} {row['speedup']:>7}x {str(row['identical_output']):>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
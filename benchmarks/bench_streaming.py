@@ -0,0 +1,72 @@
+"""
+Peak worker memory while processing PDFs of growing page counts.
+
+Each run happens in a fresh process so its peak RSS belongs to that document
+alone. With page streaming the growth over the idle process should stay
+roughly flat as the page count goes up.
+
+Usage: python -m benchmarks.bench_streaming [--pages 5 20 80] [--chars-per-page 3000]
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from benchmarks.corpus import synthetic_pdf
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _measure(path: str, queue):
+    from app.services.document_processor import DocumentProcessor
+    processor = DocumentProcessor()
+    idle = _peak_rss_mb()
+    start = time.perf_counter()
+    metadata = processor.process_document(path, os.path.basename(path))
+    queue.put({
+        "seconds": round(time.perf_counter() - start, 2),
+        "idle_rss_mb": round(idle, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "text_length": metadata["text_length"],
+    })
+
+
+def run(page_counts, chars_per_page=3000):
+    """Return one result row per page count."""
+    context = multiprocessing.get_context("spawn")
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in page_counts:
+            path = synthetic_pdf(os.path.join(tmp, f"bench_{pages}.pdf"), pages, chars_per_page)
+            queue = context.Queue()
+            process = context.Process(target=_measure, args=(path, queue))
+            process.start()
+            row = queue.get()
+            process.join()
+            row["pages"] = pages
+            row["rss_growth_mb"] = round(row["peak_rss_mb"] - row["idle_rss_mb"], 1)
+            rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 20, 80])
+    parser.add_argument("--chars-per-page", type=int, default=3000)
+    args = parser.parse_args()
+    
+    print(f"{'pages':>6} {'seconds':>8} {'text chars':>11} {'idle MB':>8} {'peak MB':>8} {'growth MB':>10}")
+    for row in run(args.pages, args.chars_per_page):
+        print(
+            f"{row['pages']:>6} {row['seconds']:>8} {row['text_length']:>11} "
+            f"{row['idle_rss_mb']:>8} {row['peak_rss_mb']:>8} {row['rss_growth_mb']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
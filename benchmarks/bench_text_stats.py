@@ -0,0 +1,64 @@
+"""
+Text statistics on a large text: fused windowed pass vs. the original word and
+sentence lists.
+
+Peak memory is the extra Python allocation while computing the statistics,
+measured with tracemalloc in a separate run from the timing.
+
+Usage: python -m benchmarks.bench_text_stats [--size-mb 50] [--repeat 3]
+"""
+import argparse
+import time
+import tracemalloc
+
+from app.services.text_analysis import TextStats
+from benchmarks.corpus import synthetic_text
+from benchmarks.reference import legacy_text_stats
+
+
+def fused_text_stats(text: str) -> dict:
+    stats = TextStats()
+    stats.feed(text)
+    return stats.metrics()
+
+
+def _measure(fn, text, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn(text)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def run(size_mb=50, repeat=3):
+    """Return one result row per implementation."""
+    text = synthetic_text(size_mb * 1_000_000)
+    legacy_seconds, legacy_peak, legacy = _measure(legacy_text_stats, text, repeat)
+    fused_seconds, fused_peak, fused = _measure(fused_text_stats, text, repeat)
+    return [
+        {"implementation": "legacy", "seconds": round(legacy_seconds, 3), "peak_mb": round(legacy_peak / 1e6, 1),
+         "identical_output": True},
+        {"implementation": "fused", "seconds": round(fused_seconds, 3), "peak_mb": round(fused_peak / 1e6, 1),
+         "identical_output": fused == legacy},
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    
+    print(f"{'implementation':>15} {'seconds':>8} {'peak MB':>8} {'identical':>10}")
+    for row in run(args.size_mb, args.repeat):
+        print(f"{row['implementation']:>15} {row['seconds']:>8} {row['peak_mb']:>8} {str(row['identical_output']):>10}")
+
+
+if __name__ == "__main__":
+    main()
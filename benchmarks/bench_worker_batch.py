@@ -0,0 +1,142 @@
+"""
+Worker throughput: per-job status updates vs. micro-batches with bulk status writes.
+
+Documents are small text files, so the database work weighs as much as it
+does for the short documents that make up most uploads. The database is a
+SQLite file, which syncs to disk on every commit like a real server does.
+The "per-job (before)" row replays the status updates of the earlier worker:
+the document is read again, updated, committed and refreshed for every
+status change.
+
+Usage: python -m benchmarks.bench_worker_batch [--documents 200] [--batch-sizes 1 8 32] [--chars 2000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import worker
+from app.database import Base
+from app.models.document import Document, DocumentStatus
+from app.models.tenant import Tenant
+from app.services.document_processor import DocumentProcessor, PROCESSOR_VERSION
+from app.services.document_service import DocumentService
+from app.services.result_cache import ResultCache
+from app.services.text_store import TextStore
+from benchmarks.corpus import synthetic_text
+
+
+def _per_job_before(processor, items):
+    """The per-document database work of the worker before bulk status writes."""
+    with worker.get_db_context() as db:
+        for document_id, tenant_id in items:
+            document = DocumentService.get_document_by_id(db, document_id, tenant_id)
+            DocumentService.update_document_status(db, document_id, tenant_id, DocumentStatus.PROCESSING)
+            ResultCache.find_source(db, document, PROCESSOR_VERSION)
+            with TextStore.writer(tenant_id, document_id) as text_writer:
+                analysis = processor.analyze_document(document.file_path, document.original_filename, text_writer)
+            organizations, = processor.run_ner([analysis])
+            stage_results = processor.stage_results(analysis, organizations)
+            DocumentService.update_document_status(
+                db, document_id, tenant_id, DocumentStatus.COMPLETED,
+                extracted_metadata=processor.metadata_from_stages(stage_results, document.original_filename, analysis),
+                processor_version=PROCESSOR_VERSION,
+                stage_results=stage_results
+            )
+
+
+def _batched(batch_size):
+    def run_batches(processor, items):
+        for start in range(0, len(items), batch_size):
+            worker.process_document_batch(items[start:start + batch_size])
+    return run_batches
+
+
+def run(documents=200, batch_sizes=(1, 8, 32), chars=2000):
+    """Return one result row per worker mode."""
+    processor = DocumentProcessor()
+    processor.nlp = None
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        counts = {"statements": 0, "commits": 0}
+        event.listen(engine, "before_cursor_execute", lambda *args: counts.__setitem__("statements", counts["statements"] + 1))
+        event.listen(engine, "commit", lambda *args: counts.__setitem__("commits", counts["commits"] + 1))
+        
+        @contextmanager
+        def db_context():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+        
+        worker.get_db_context = db_context
+        worker._processor = processor
+        worker.settings.storage_path = os.path.join(tmp, "storage")
+        with db_context() as db:
+            tenant = Tenant(name="Bench", slug="bench", is_active=True)
+            db.add(tenant)
+            db.commit()
+            tenant_id = tenant.id
+        paths = []
+        for number in range(documents):
+            path = os.path.join(tmp, f"doc{number}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(synthetic_text(chars, seed=number))
+            paths.append(path)
+        
+        modes = [("per-job (before)", _per_job_before)]
+        modes += [(f"batch of {size}" if size > 1 else "per-job (now)", _batched(size)) for size in batch_sizes]
+        for name, function in modes:
+            with db_context() as db:
+                new_documents = [
+                    Document(filename=os.path.basename(path), original_filename=os.path.basename(path),
+                             file_path=path, file_size=os.path.getsize(path), tenant_id=tenant_id,
+                             uploaded_by_user_id=1)
+                    for path in paths
+                ]
+                db.add_all(new_documents)
+                db.commit()
+                items = [(document.id, tenant_id) for document in new_documents]
+            counts.update(statements=0, commits=0)
+            start = time.perf_counter()
+            function(processor, items)
+            seconds = time.perf_counter() - start
+            rows.append({
+                "mode": name,
+                "documents": documents,
+                "seconds": round(seconds, 2),
+                "documents_per_second": round(documents / seconds, 1),
+                "statements_per_document": round(counts["statements"] / documents, 2),
+                "commits_per_document": round(counts["commits"] / documents, 2),
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--chars", type=int, default=2000, help="size of each text document")
+    args = parser.parse_args()
+    
+    rows = run(args.documents, args.batch_sizes, args.chars)
+    baseline = rows[0]["documents_per_second"]
+    print(f"{'mode':<18} {'docs':>6} {'seconds':>8} {'docs/s':>8} {'speedup':>8} {'stmts/doc':>10} {'commits/doc':>12}")
+    for row in rows:
+        print(
+            f"{row['mode']:<18} {row['documents']:>6} {row['seconds']:>8} {row['documents_per_second']:>8} "
+            f"{row['documents_per_second'] / baseline:>7.2f}x {row['statements_per_document']:>10} "
+            f"{row['commits_per_document']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
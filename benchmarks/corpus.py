@@ -0,0 +1,166 @@
+"""
+Synthetic document corpus for benchmarks.
+
+Everything is generated from a seed so runs are reproducible and need no
+network access or sample files.
+
+Usage: python -m benchmarks.corpus OUT_DIR [--text-chars 10000 1000000] [--pdf-pages 5 50] [--image-pages 1]
+"""
+import argparse
+import os
+import random
+from typing import Iterable, List
+
+_WORDS = (
+    "the agreement between parties shall remain in effect for the term described below and "
+    "each party agrees to the obligations set out in this contract including payment of all "
+    "amounts due under the invoice within thirty days of receipt the client acknowledges that "
+    "the service provider will maintain security and performance of the database and server "
+    "infrastructure hosted in the cloud the report summarises research analysis of market "
+    "strategy for the business organization and its software architecture"
+).split()
+
+_ENTITIES = (
+    "$1,234.56", "USD 980.00", "2,500 dollars", "€75", "£1,200.50",
+    "2024-01-15", "03/14/2024", "March 3, 2024", "15 Jan 2025", "12-31-2023",
+    "john.doe@example.com", "billing@acme-corp.io", "555-123-4567", "(555) 987-6543", "+44 20 7946 0958",
+    "https://example.com/invoices/42", "http://docs.acme.io/api",
+    "Acme Holdings Group", "Blue River Technologies Inc", "Northwind Trading Company", "Google", "Microsoft",
+    "Kubernetes", "machine learning", "API", "authentication", "analytics",
+)
+
+
+def synthetic_text(size: int, seed: int = 0, entity_ratio: float = 0.05) -> str:
+    """Return roughly ``size`` characters of business-like prose with entities mixed in."""
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    sentence = 0
+    while length < size:
+        if rng.random() < entity_ratio:
+            word = rng.choice(_ENTITIES)
+        else:
+            word = rng.choice(_WORDS)
+        sentence += 1
+        if sentence >= rng.randint(8, 20):
+            word += "."
+            sentence = 0
+        parts.append(word)
+        length += len(word) + 1
+    return " ".join(parts)[:size]
+
+
+def _pdf_escape(line: str) -> bytes:
+    encoded = line.encode("cp1252", errors="replace")
+    return encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def synthetic_pdf(path: str, pages: int, chars_per_page: int = 3000, seed: int = 0) -> str:
+    """
+    Write a text PDF with ``pages`` pages of synthetic prose to ``path``.
+    Uses only the standard Helvetica font, so no PDF library is needed.
+    """
+    line_chars = 90
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page objects are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    page_refs = []
+    for number in range(pages):
+        text = synthetic_text(chars_per_page, seed=seed + number)
+        lines = [text[i:i + line_chars] for i in range(0, len(text), line_chars)]
+        stream = b"BT /F1 9 Tf 11 TL 40 800 Td " + b" ".join(
+            b"(" + _pdf_escape(line) + b") Tj T*" for line in lines
+        ) + b" ET"
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [" + b" ".join(page_refs) + b"] /Count %d >>" % pages
+    
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
+
+
+def _font(size: int):
+    from PIL import ImageFont
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow before 10.1 only has the small bitmap font
+        return ImageFont.load_default()
+
+
+def synthetic_image(path: str, chars_per_page: int = 1500, pages: int = 1, seed: int = 0,
+                    width: int = 1654, font_size: int = 22) -> str:
+    """
+    Write an image of synthetic prose, black on white, to ``path``; the format
+    follows the extension. With ``pages`` above 1 a multi-page TIFF is written.
+    """
+    from PIL import Image, ImageDraw
+    font = _font(font_size)
+    line_chars = max(20, int(width / (font_size * 0.55)))
+    line_height = int(font_size * 1.5)
+    images = []
+    for number in range(pages):
+        text = synthetic_text(chars_per_page, seed=seed + number)
+        lines = [text[i:i + line_chars] for i in range(0, len(text), line_chars)]
+        image = Image.new("L", (width, line_height * (len(lines) + 4)), color=255)
+        draw = ImageDraw.Draw(image)
+        for row, line in enumerate(lines, start=2):
+            draw.text((line_height, row * line_height), line, fill=0, font=font)
+        images.append(image)
+    if len(images) > 1:
+        images[0].save(path, save_all=True, append_images=images[1:])
+    else:
+        images[0].save(path)
+    return path
+
+
+def build_corpus(directory: str, text_chars: Iterable[int] = (10_000, 1_000_000),
+                 pdf_pages: Iterable[int] = (5, 50), image_pages: Iterable[int] = (1,), seed: int = 0) -> List[str]:
+    """Write text, PDF and image documents of the given sizes to ``directory``; returns their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for size in text_chars:
+        path = os.path.join(directory, f"text_{size}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(synthetic_text(size, seed=seed))
+        paths.append(path)
+    for pages in pdf_pages:
+        paths.append(synthetic_pdf(os.path.join(directory, f"pdf_{pages}p.pdf"), pages, seed=seed))
+    for pages in image_pages:
+        extension = "png" if pages == 1 else "tiff"
+        paths.append(synthetic_image(os.path.join(directory, f"image_{pages}p.{extension}"), pages=pages, seed=seed))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic document corpus.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--text-chars", type=int, nargs="*", default=[10_000, 1_000_000])
+    parser.add_argument("--pdf-pages", type=int, nargs="*", default=[5, 50])
+    parser.add_argument("--image-pages", type=int, nargs="*", default=[1])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    for path in build_corpus(args.out_dir, args.text_chars, args.pdf_pages, args.image_pages, args.seed):
+        print(f"{os.path.getsize(path):>12} {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Frozen copies of pre-optimisation code paths.
+
+Benchmarks compare the current implementation against these, and tests use
+them to check the optimised paths still produce the same output.
+"""
+import re
+from typing import Dict
+
+
+def legacy_extract_entities(text: str, nlp=None) -> Dict[str, list]:
+    """DocumentProcessor.extract_entities before the single-pass engine: one findall per pattern."""
+    entities = {
+        "dates": [],
+        "amounts": [],
+        "companies": [],
+        "emails": [],
+        "phone_numbers": [],
+        "urls": [],
+        "keywords": []
+    }
+    
+    if not text:
+        return entities
+    
+    # Extract dates (various formats) - more comprehensive
+    date_patterns = [
+        r'\b\d{4}-\d{2}-\d{2}\b',  # YYYY-MM-DD
+        r'\b\d{1,2}/\d{1,2}/\d{4}\b',  # MM/DD/YYYY
+        r'\b\d{1,2}-\d{1,2}-\d{4}\b',  # MM-DD-YYYY
+        r'\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{1,2},?\s+\d{4}\b',  # Month DD, YYYY
+        r'\b\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{4}\b',  # DD Month YYYY
+    ]
+    
+    for pattern in date_patterns:
+        dates = re.findall(pattern, text, re.IGNORECASE)
+        entities["dates"].extend(dates)
+    
+    # Remove duplicates and invalid dates
+    entities["dates"] = sorted(list(set(entities["dates"])))[:15]
+    
+    # Extract amounts (currency) - more comprehensive
+    amount_patterns = [
+        r'\$[\d,]+\.?\d{0,2}',  # $1,234.56
+        r'USD\s*[\d,]+\.?\d{0,2}',  # USD 1234.56
+        r'[\d,]+\.?\d{0,2}\s*(?:dollars|USD|EUR|GBP)',  # 1234.56 dollars
+        r'€[\d,]+\.?\d{0,2}',  # Euro
+        r'£[\d,]+\.?\d{0,2}',  # Pound
+    ]
+    
+    for pattern in amount_patterns:
+        amounts = re.findall(pattern, text, re.IGNORECASE)
+        entities["amounts"].extend(amounts)
+    
+    # Remove duplicates
+    entities["amounts"] = sorted(list(set(entities["amounts"])))[:15]
+    
+    # Extract email addresses
+    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+    emails = re.findall(email_pattern, text)
+    entities["emails"] = sorted(list(set(emails)))[:10]
+    
+    # Extract phone numbers
+    phone_patterns = [
+        r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b',  # US format: 123-456-7890
+        r'\b\(\d{3}\)\s?\d{3}[-.]?\d{4}\b',  # (123) 456-7890
+        r'\b\+?\d{1,3}[-.\s]?\d{1,4}[-.\s]?\d{1,4}[-.\s]?\d{1,9}\b',  # International
+    ]
+    for pattern in phone_patterns:
+        phones = re.findall(pattern, text)
+        entities["phone_numbers"].extend(phones)
+    entities["phone_numbers"] = sorted(list(set(entities["phone_numbers"])))[:10]
+    
+    # Extract URLs
+    url_pattern = r'https?://[^\s<>"{}|\\^`\[\]]+'
+    urls = re.findall(url_pattern, text)
+    entities["urls"] = sorted(list(set(urls)))[:10]
+    
+    # Extract companies/organizations - improved filtering
+    if nlp:
+        try:
+            doc = nlp(text[:15000])  # Process more text
+            orgs = []
+            for ent in doc.ents:
+                if ent.label_ == "ORG":
+                    org_text = ent.text.strip()
+                    # Filter out common false positives
+                    if len(org_text) > 2 and not org_text.upper() in ['FE', 'DNS', 'CAP', 'FS', 'SQL', 'API', 'URL', 'HTTP', 'HTTPS', 'PDF', 'XML', 'JSON', 'HTML', 'CSS', 'JS', 'AWS', 'RDS', 'RDBMS']:
+                        orgs.append(org_text)
+            entities["companies"] = sorted(list(set(orgs)))[:15]
+        except Exception:
+            pass
+    
+    # Fallback: Extract meaningful company names (better filtering)
+    if len(entities["companies"]) < 5:
+        # Look for patterns like "Company Name Inc", "Corp", "LLC", etc.
+        company_patterns = [
+            r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,3}(?:\s+(?:Inc|Corp|LLC|Ltd|Limited|Company|Co|Corporation|Technologies|Systems|Solutions|Group|Industries))\.?\b',
+            r'\b(?:Amazon|Google|Microsoft|Apple|Facebook|Meta|Twitter|LinkedIn|Netflix|Uber|Airbnb|Salesforce|Oracle|IBM|Intel|NVIDIA|Adobe|PayPal|Stripe|Shopify)\b',  # Known companies
+        ]
+        for pattern in company_patterns:
+            companies = re.findall(pattern, text, re.IGNORECASE)
+            # Filter out short acronyms
+            companies = [c for c in companies if len(c.split()) > 1 or len(c) > 4]
+            entities["companies"].extend(companies)
+        entities["companies"] = sorted(list(set(entities["companies"])))[:15]
+    
+    # Extract important keywords (topics, technologies, etc.)
+    # Common technical/business keywords
+    keyword_patterns = [
+        r'\b(?:cloud|database|server|client|API|REST|GraphQL|microservices|container|docker|kubernetes|scalability|performance|security|authentication|authorization|encryption|blockchain|AI|machine learning|data science|analytics|business intelligence)\b',
+    ]
+    keywords = []
+    for pattern in keyword_patterns:
+        found = re.findall(pattern, text, re.IGNORECASE)
+        keywords.extend(found)
+    entities["keywords"] = sorted(list(set([k.lower() for k in keywords])))[:20]
+    
+    return entities
+
+
+
+def legacy_detect_document_type(text: str, filename: str) -> str:
+    """DocumentProcessor.detect_document_type before the shared keyword matcher."""
+    text_lower = text.lower()
+    filename_lower = filename.lower()
+    
+    if 'invoice' in filename_lower:
+        return 'invoice'
+    if 'receipt' in filename_lower:
+        return 'receipt'
+    if 'contract' in filename_lower or 'agreement' in filename_lower:
+        return 'contract'
+    if 'report' in filename_lower:
+        return 'report'
+    if 'letter' in filename_lower:
+        return 'letter'
+    
+    invoice_keywords = ['invoice', 'bill to', 'amount due', 'total', 'subtotal']
+    if any(keyword in text_lower for keyword in invoice_keywords):
+        return 'invoice'
+    
+    receipt_keywords = ['receipt', 'payment received', 'thank you for your purchase']
+    if any(keyword in text_lower for keyword in receipt_keywords):
+        return 'receipt'
+    
+    contract_keywords = ['agreement', 'contract', 'terms and conditions', 'party']
+    if any(keyword in text_lower for keyword in contract_keywords):
+        return 'contract'
+    
+    return 'document'
+
+
+def legacy_categorize_content(text: str) -> list:
+    """DocumentProcessor._categorize_content before the shared keyword matcher."""
+    categories = []
+    text_lower = text.lower()
+    
+    if any(kw in text_lower for kw in ['invoice', 'payment', 'bill', 'amount due', 'total', 'subtotal']):
+        categories.append("financial")
+    if any(kw in text_lower for kw in ['api', 'database', 'server', 'code', 'programming', 'software', 'architecture']):
+        categories.append("technical")
+    if any(kw in text_lower for kw in ['contract', 'agreement', 'terms', 'legal', 'party', 'obligation']):
+        categories.append("legal")
+    if any(kw in text_lower for kw in ['business', 'company', 'organization', 'strategy', 'market']):
+        categories.append("business")
+    if any(kw in text_lower for kw in ['research', 'study', 'analysis', 'paper', 'thesis', 'university']):
+        categories.append("academic")
+    
+    return categories
+
+
+def legacy_text_stats(text: str) -> Dict[str, object]:
+    """The text statistics of DocumentProcessor.process_document before the fused pass."""
+    words = text.split()
+    word_count = len(words)
+    
+    text_preview = text[:200].strip() if text else ""
+    if len(text) > 200:
+        text_preview += "..."
+    
+    sentences = [s.strip() for s in text.split('.') if s.strip()]
+    sentence_count = len(sentences)
+    avg_words_per_sentence = round(word_count / sentence_count, 2) if sentence_count > 0 else 0
+    
+    summary = '. '.join(sentences[:3]) + '.' if len(sentences) >= 3 else text_preview
+    
+    return {
+        "word_count": word_count,
+        "sentence_count": sentence_count,
+        "avg_words_per_sentence": avg_words_per_sentence,
+        "extracted_text_preview": text_preview,
+        "summary": summary[:300],
+        "text_length": len(text),
+    }
@@ -0,0 +1,207 @@
+"""
+Benchmark suite for DocumentProcessor with JSON baselines and a regression check.
+
+Each benchmark times one DocumentProcessor function on a synthetic corpus and
+keeps the fastest of ``--repeat`` samples; the first, untimed call doubles as
+warm-up (lazy imports, language profiles). Results can be saved as a JSON
+baseline and later runs compared against it; the run fails (exit status 1)
+when a benchmark is slower than its baseline by more than ``--tolerance``.
+
+Baselines record a calibration workload too, and comparisons are scaled by
+how fast this machine runs it, so a baseline stays usable on other hardware.
+Everything runs offline; NER is off unless ``--with-ner`` is given, and the
+OCR benchmark is skipped without a tesseract binary.
+
+Usage:
+    python -m benchmarks.suite [--scale 1.0] [--repeat 5] [--only extract_entities ...]
+                               [--save baseline.json] [--compare baseline.json] [--tolerance 0.25]
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.services.document_processor import DocumentProcessor
+from benchmarks.corpus import synthetic_image, synthetic_pdf, synthetic_text
+
+BASELINE_FORMAT = 1
+
+
+# Fast functions are called in a loop until one sample takes at least this long
+MIN_SAMPLE_SECONDS = 0.05
+
+
+def _best_of(function: Callable[[], object], repeat: int) -> Tuple[float, float]:
+    """Fastest and median wall-clock seconds per call, over ``repeat`` samples."""
+    start = time.perf_counter()
+    function()
+    once = time.perf_counter() - start
+    number = max(1, math.ceil(MIN_SAMPLE_SECONDS / once)) if once > 0 else 1000
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    timings.sort()
+    return timings[0], timings[len(timings) // 2]
+
+
+def calibrate(repeat: int = 5) -> float:
+    """Seconds this machine needs for a fixed pure-Python workload (string and regex work)."""
+    import re
+    text = synthetic_text(200_000, seed=99)
+    pattern = re.compile(r"\b\w+@\w+\.\w+\b")
+    
+    def workload():
+        words = text.split()
+        sorted(words)
+        pattern.findall(text)
+        sum(len(word) for word in words)
+    
+    return _best_of(workload, repeat)[0]
+
+
+def _ocr_available() -> Optional[str]:
+    """None when OCR can run, otherwise why not."""
+    try:
+        import pytesseract
+        pytesseract.get_tesseract_version()
+    except Exception as e:
+        return f"OCR unavailable: {type(e).__name__}"
+    return None
+
+
+def build_cases(processor: DocumentProcessor, workdir: str, scale: float = 1.0) -> Dict[str, Tuple[Callable, Optional[str]]]:
+    """Benchmark name -> (function to time, reason it is skipped or None)."""
+    def size(value: int) -> int:
+        return max(1, int(value * scale))
+    
+    text = synthetic_text(size(500_000), seed=1)
+    text_path = os.path.join(workdir, "text.txt")
+    with open(text_path, "w", encoding="utf-8") as f:
+        f.write(synthetic_text(size(2_000_000), seed=2))
+    pdf_path = synthetic_pdf(os.path.join(workdir, "doc.pdf"), pages=size(20), seed=3)
+    image_path = synthetic_image(os.path.join(workdir, "scan.png"), chars_per_page=1500, seed=4)
+    ocr_skip = _ocr_available()
+    
+    return {
+        "extract_entities": (lambda: processor.extract_entities(text), None),
+        "detect_document_type": (lambda: processor.detect_document_type(text, "document.txt"), None),
+        "detect_language": (lambda: processor.detect_language(text), None),
+        "extract_text_from_pdf": (lambda: processor.extract_text_from_pdf(pdf_path), None),
+        "process_document[txt]": (lambda: processor.process_document(text_path, "text.txt"), None),
+        "process_document[pdf]": (lambda: processor.process_document(pdf_path, "doc.pdf"), None),
+        "process_document[png]": (lambda: processor.process_document(image_path, "scan.png"), ocr_skip),
+    }
+
+
+def run(scale: float = 1.0, repeat: int = 5, only: Optional[List[str]] = None, with_ner: bool = False) -> dict:
+    """Run the suite; returns a result document in the baseline format."""
+    processor = DocumentProcessor()
+    if not with_ner:
+        processor.nlp = None
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, (function, skip) in build_cases(processor, workdir, scale).items():
+            if only and name not in only:
+                continue
+            if skip:
+                results[name] = {"skipped": skip}
+                continue
+            best, median = _best_of(function, repeat)
+            results[name] = {"seconds": round(best, 6), "median_seconds": round(median, 6)}
+    return {
+        "format": BASELINE_FORMAT,
+        "created": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "scale": scale,
+        "repeat": repeat,
+        "with_ner": with_ner,
+        "calibration_seconds": round(calibrate(), 6),
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.25, normalize: bool = True) -> List[dict]:
+    """
+    One row per benchmark with its slowdown against the baseline. ``ratio`` is
+    current over baseline time, scaled by the calibration workload unless
+    ``normalize`` is off; a row regresses when the ratio exceeds ``1 + tolerance``.
+    """
+    machine_factor = 1.0
+    if normalize and current.get("calibration_seconds") and baseline.get("calibration_seconds"):
+        machine_factor = current["calibration_seconds"] / baseline["calibration_seconds"]
+    
+    rows = []
+    names = list(current["results"]) + [name for name in baseline["results"] if name not in current["results"]]
+    for name in names:
+        now = current["results"].get(name, {})
+        before = baseline["results"].get(name, {})
+        row = {"name": name, "seconds": now.get("seconds"), "baseline_seconds": before.get("seconds"),
+               "ratio": None, "status": "ok"}
+        if "seconds" not in now:
+            row["status"] = now.get("skipped", "missing")
+        elif "seconds" not in before:
+            row["status"] = "new"
+        else:
+            row["ratio"] = round(now["seconds"] / before["seconds"] / machine_factor, 3)
+            if row["ratio"] > 1 + tolerance:
+                row["status"] = "REGRESSION"
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplies every corpus size")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", default=None, help="benchmark names to run")
+    parser.add_argument("--with-ner", action="store_true", help="keep the spaCy pipeline, if installed")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="baseline to check the results against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--no-normalize", action="store_true", help="compare raw times across machines")
+    args = parser.parse_args()
+    
+    current = run(args.scale, args.repeat, args.only, args.with_ner)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+            f.write("\n")
+    
+    if not args.compare:
+        print(f"{'benchmark':<24} {'best s':>10} {'median s':>10}")
+        for name, result in current["results"].items():
+            if "seconds" in result:
+                print(f"{name:<24} {result['seconds']:>10.4f} {result['median_seconds']:>10.4f}")
+            else:
+                print(f"{name:<24} {result['skipped']}")
+        return
+    
+    with open(args.compare, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if (baseline.get("scale"), baseline.get("with_ner")) != (current["scale"], current["with_ner"]):
+        print("warning: baseline was recorded with a different --scale or --with-ner", file=sys.stderr)
+    rows = compare(current, baseline, args.tolerance, normalize=not args.no_normalize)
+    print(f"{'benchmark':<24} {'best s':>10} {'baseline s':>11} {'ratio':>7}  status")
+    for row in rows:
+        seconds = f"{row['seconds']:.4f}" if row["seconds"] is not None else "-"
+        baseline_seconds = f"{row['baseline_seconds']:.4f}" if row["baseline_seconds"] is not None else "-"
+        ratio = f"{row['ratio']:.2f}" if row["ratio"] is not None else "-"
+        print(f"{row['name']:<24} {seconds:>10} {baseline_seconds:>11} {ratio:>7}  {row['status']}")
+    regressions = [row["name"] for row in rows if row["status"] == "REGRESSION"]
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed past {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
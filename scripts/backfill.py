@@ -0,0 +1,48 @@
+"""
+Reprocess a tenant's documents whose stage results are out of date.
+
+Usage:
+    python scripts/backfill.py TENANT_ID [--rate 2.0] [--max-queue-depth 100] [--limit N] [--dry-run]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.database import get_db_context
+from app.services.backfill import BackfillService
+
+
+def backfill():
+    """Enqueue throttled reprocessing jobs for one tenant."""
+    parser = argparse.ArgumentParser(description="Reprocess a tenant's documents with stale stage results.")
+    parser.add_argument("tenant_id", type=int)
+    parser.add_argument("--rate", type=float, default=settings.backfill_rate_per_second,
+                        help="jobs enqueued per second (0 = no limit)")
+    parser.add_argument("--max-queue-depth", type=int, default=settings.backfill_max_queue_depth,
+                        help="pause while this many backfill jobs are waiting (0 = no limit)")
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many documents")
+    parser.add_argument("--dry-run", action="store_true", help="only count the stale documents")
+    args = parser.parse_args()
+    
+    with get_db_context() as db:
+        summary = BackfillService.backfill_tenant(
+            db, args.tenant_id,
+            rate_per_second=args.rate,
+            max_queue_depth=args.max_queue_depth,
+            limit=args.limit,
+            dry_run=args.dry_run
+        )
+    
+    action = "Would reprocess" if args.dry_run else "Enqueued"
+    count = summary["stale"] if args.dry_run else summary["enqueued"]
+    print(f"✓ {action} {count} document(s) of tenant {args.tenant_id}")
+    for stage, stage_count in sorted(summary["stages"].items()):
+        print(f"    - {stage}: {stage_count}")
+
+
+if __name__ == "__main__":
+    backfill()
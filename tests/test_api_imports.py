@@ -0,0 +1,58 @@
+"""
+Tests that the API process stays free of the document processing libraries.
+
+They run in a fresh interpreter, since the test process itself has long
+imported the worker.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from rq.utils import import_attribute
+
+from app import worker
+from app.services import queue_service
+
+# Imported by the worker only; each costs import time and memory in every API replica
+HEAVY_MODULES = ["pdfplumber", "pypdf", "spacy", "PIL", "langdetect", "pytesseract", "app.worker"]
+
+# Importing the processor alone grows RSS by 60 MB or more, before any spaCy model
+MAX_ENQUEUE_RSS_GROWTH_KB = 20_000
+
+_API_PROCESS = """
+import json, resource, sys
+import app.main
+from app.services import queue_service
+from app.services.queue_service import QueueService
+
+for queue in (queue_service.express_queue, queue_service.bulk_queue, queue_service.backfill_queue):
+    queue.enqueue_job = lambda job, **kwargs: job  # no Redis needed
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+QueueService.enqueue_document_processing(1, 1)
+QueueService.enqueue_document_reprocessing(1, 1)
+print(json.dumps({
+    "modules": [name for name in sys.argv[1:] if name in sys.modules],
+    "rss_growth_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before,
+}))
+"""
+
+
+def test_enqueueing_jobs_does_not_import_processing_libraries():
+    """Test the API enqueues jobs without importing the worker or its libraries."""
+    result = subprocess.run(
+        [sys.executable, "-c", _API_PROCESS, *HEAVY_MODULES],
+        capture_output=True, text=True, timeout=120,
+        cwd=Path(__file__).parent.parent, env=os.environ.copy()
+    )
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.splitlines()[-1])
+    assert report["modules"] == []
+    assert report["rss_growth_kb"] < MAX_ENQUEUE_RSS_GROWTH_KB
+
+
+def test_job_paths_resolve_to_worker_functions():
+    """Test the dotted job paths still name the worker's job functions."""
+    assert import_attribute(queue_service.PROCESS_DOCUMENT_JOB) is worker.process_document
+    assert import_attribute(queue_service.REPROCESS_DOCUMENT_JOB) is worker.reprocess_document
@@ -0,0 +1,88 @@
+"""
+Tests for the tenant-wide reprocessing backfill.
+"""
+import pytest
+from app.models.document import Document, DocumentStatus
+from app.models.tenant import Tenant
+from app.services.backfill import BackfillService, DEPTH_POLL_SECONDS
+from app.services.document_processor import STAGE_VERSIONS
+
+
+def _current_results(**overrides):
+    results = {stage: {"version": version, "result": None} for stage, version in STAGE_VERSIONS.items()}
+    results["extraction"]["result"] = {"page_count": 1, "complete": True}
+    results.update(overrides)
+    return results
+
+
+def _add(db_session, tenant, user, stage_results, status=DocumentStatus.COMPLETED):
+    document = Document(
+        filename="a.txt", original_filename="a.txt", file_path="/tmp/a.txt", file_size=1,
+        tenant_id=tenant.id, uploaded_by_user_id=user.id, status=status, stage_results=stage_results
+    )
+    db_session.add(document)
+    db_session.commit()
+    return document
+
+
+def test_backfill_enqueues_only_stale_documents_of_the_tenant(db_session, test_tenant, test_user):
+    """Test only completed, stale documents of the tenant are enqueued."""
+    other_tenant = Tenant(name="Other", slug="other", is_active=True)
+    db_session.add(other_tenant)
+    db_session.commit()
+    current = _add(db_session, test_tenant, test_user, _current_results())
+    old_entities = _add(db_session, test_tenant, test_user, _current_results(extract_entities={"version": "0"}))
+    never_versioned = _add(db_session, test_tenant, test_user, None)
+    _add(db_session, test_tenant, test_user, None, status=DocumentStatus.PENDING)
+    _add(db_session, other_tenant, test_user, None)
+    enqueued = []
+    
+    summary = BackfillService.backfill_tenant(
+        db_session, test_tenant.id, rate_per_second=0, max_queue_depth=0,
+        enqueue=lambda document_id, tenant_id: enqueued.append((document_id, tenant_id)),
+        queue_depth=lambda: 0
+    )
+    
+    assert enqueued == [(old_entities.id, test_tenant.id), (never_versioned.id, test_tenant.id)]
+    assert current.id not in [document_id for document_id, _ in enqueued]
+    assert summary["stale"] == summary["enqueued"] == 2
+    assert summary["stages"]["extract_entities"] == 2
+    assert summary["stages"]["extraction"] == 1
+
+
+def test_backfill_throttles_rate_and_queue_depth(db_session, test_tenant, test_user):
+    """Test the backfill paces its jobs and waits while the backfill queue is deep."""
+    for _ in range(4):
+        _add(db_session, test_tenant, test_user, None)
+    now = [0.0]
+    sleeps, enqueued_at = [], []
+    depths = iter([0, 5, 5, 0, 0, 0])
+    
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+    
+    BackfillService.backfill_tenant(
+        db_session, test_tenant.id, rate_per_second=10, max_queue_depth=5,
+        enqueue=lambda document_id, tenant_id: enqueued_at.append(now[0]),
+        queue_depth=lambda: next(depths), sleep=sleep, clock=lambda: now[0]
+    )
+    
+    assert sleeps.count(DEPTH_POLL_SECONDS) == 2
+    # 0.1s apart, plus two depth polls before the second job
+    assert enqueued_at == pytest.approx([0.0, 0.1 + 2 * DEPTH_POLL_SECONDS, 10.2, 10.3])
+
+
+def test_backfill_dry_run_and_limit(db_session, test_tenant, test_user):
+    """Test a dry run only counts, and the limit caps how many documents are taken."""
+    for _ in range(3):
+        _add(db_session, test_tenant, test_user, None)
+    
+    def fail(*args):
+        raise AssertionError("a dry run must not enqueue")
+    
+    summary = BackfillService.backfill_tenant(
+        db_session, test_tenant.id, limit=2, dry_run=True, enqueue=fail, queue_depth=fail
+    )
+    
+    assert summary["stale"] == 2 and summary["enqueued"] == 0
@@ -0,0 +1,69 @@
+"""
+Tests for the benchmark suite's corpus, baselines and regression check.
+"""
+import json
+import sys
+import pytest
+from PIL import Image
+from benchmarks import suite
+from benchmarks.corpus import build_corpus, synthetic_image
+
+
+def _result(calibration, **seconds):
+    return {
+        "calibration_seconds": calibration,
+        "results": {name: {"seconds": value} for name, value in seconds.items()},
+    }
+
+
+def test_compare_flags_slowdowns_past_tolerance():
+    """Test only benchmarks slower than the tolerance allows count as regressions."""
+    baseline = _result(1.0, extract_entities=1.0, detect_language=1.0, dropped=1.0)
+    current = _result(1.0, extract_entities=1.2, detect_language=1.3, added=1.0)
+    current["results"]["ocr"] = {"skipped": "OCR unavailable"}
+    rows = {row["name"]: row for row in suite.compare(current, baseline, tolerance=0.25)}
+    assert rows["extract_entities"]["status"] == "ok"
+    assert rows["detect_language"]["status"] == "REGRESSION"
+    assert rows["added"]["status"] == "new"
+    assert rows["dropped"]["status"] == "missing"
+    assert rows["ocr"]["status"] == "OCR unavailable"
+
+
+def test_compare_scales_by_machine_speed():
+    """Test a uniformly slower machine does not look like a regression."""
+    baseline = _result(1.0, extract_entities=1.0)
+    current = _result(2.0, extract_entities=2.1)
+    assert suite.compare(current, baseline)[0]["status"] == "ok"
+    assert suite.compare(current, baseline, normalize=False)[0]["status"] == "REGRESSION"
+
+
+def test_run_saves_baseline_and_fails_on_regression(tmp_path, monkeypatch, capsys):
+    """Test the command line saves a JSON baseline and exits non-zero on a regression."""
+    baseline_path = tmp_path / "baseline.json"
+    argv = ["suite", "--scale", "0.01", "--repeat", "1", "--only", "detect_document_type"]
+    monkeypatch.setattr(sys, "argv", argv + ["--save", str(baseline_path)])
+    suite.main()
+    baseline = json.loads(baseline_path.read_text())
+    assert set(baseline["results"]) == {"detect_document_type"}
+    assert baseline["results"]["detect_document_type"]["seconds"] > 0
+    
+    # Pretend the baseline was ten times faster
+    baseline["results"]["detect_document_type"]["seconds"] /= 10
+    baseline_path.write_text(json.dumps(baseline))
+    monkeypatch.setattr(sys, "argv", argv + ["--compare", str(baseline_path)])
+    with pytest.raises(SystemExit) as exit_info:
+        suite.main()
+    assert exit_info.value.code == 1
+    assert "REGRESSION" in capsys.readouterr().out
+
+
+def test_corpus_covers_text_pdf_and_images(tmp_path):
+    """Test the corpus generator writes every kind of document at the requested sizes."""
+    paths = build_corpus(str(tmp_path), text_chars=[500], pdf_pages=[2], image_pages=[1, 3])
+    assert [path.rsplit("/", 1)[1] for path in paths] == [
+        "text_500.txt", "pdf_2p.pdf", "image_1p.png", "image_3p.tiff"
+    ]
+    with Image.open(paths[3]) as image:
+        assert image.n_frames == 3
+    assert synthetic_image(str(tmp_path / "a.png"), seed=5) != synthetic_image(str(tmp_path / "b.png"), seed=5)
+    assert (tmp_path / "a.png").read_bytes() == (tmp_path / "b.png").read_bytes()
@@ -5,6 +5,11 @@ import pytest
 from fastapi import status
 from io import BytesIO
 
+from app.models.document import Document, DocumentStatus
+from app.models.tenant import Tenant
+from app.services import text_store
+from app.services.text_store import TextStore
+
 
 def test_upload_document(client, auth_token, db_session, test_user):
     """Test document upload."""
@@ -67,3 +72,53 @@ def test_get_document_not_found(client, auth_token):
     )
     assert response.status_code == status.HTTP_404_NOT_FOUND
 
+
+def _stored_document(db_session, tenant_id, user_id, pages):
+    document = Document(
+        filename="report.pdf", original_filename="report.pdf", file_path="/tmp/report.pdf", file_size=1,
+        tenant_id=tenant_id, uploaded_by_user_id=user_id, status=DocumentStatus.COMPLETED
+    )
+    db_session.add(document)
+    db_session.commit()
+    if pages is not None:
+        with TextStore.writer(tenant_id, document.id) as writer:
+            for page in pages:
+                writer.add_page(page)
+    return document
+
+
+def test_get_document_text_page_range(client, auth_token, db_session, test_user, tmp_path, monkeypatch):
+    """Test the stored text is served whole or as a page range."""
+    monkeypatch.setattr(text_store.settings, "storage_path", str(tmp_path))
+    document = _stored_document(db_session, test_user.tenant_id, test_user.id, ["one", "two", "three", "four"])
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    
+    response = client.get(f"/api/v1/documents/{document.id}/text", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert [page["text"] for page in response.json()["pages"]] == ["one", "two", "three", "four"]
+    
+    response = client.get(
+        f"/api/v1/documents/{document.id}/text", headers=headers, params={"start_page": 2, "end_page": 3}
+    )
+    data = response.json()
+    assert data["page_count"] == 4
+    assert (data["start_page"], data["end_page"]) == (2, 3)
+    assert data["pages"] == [{"page_number": 2, "text": "two"}, {"page_number": 3, "text": "three"}]
+    
+    response = client.get(f"/api/v1/documents/{document.id}/text", headers=headers, params={"start_page": 9})
+    assert response.json()["pages"] == []
+
+
+def test_get_document_text_not_available(client, auth_token, db_session, test_user, tmp_path, monkeypatch):
+    """Test text of another tenant's document, or text never stored, is not found."""
+    monkeypatch.setattr(text_store.settings, "storage_path", str(tmp_path))
+    other_tenant = Tenant(name="Other", slug="other", is_active=True)
+    db_session.add(other_tenant)
+    db_session.commit()
+    other = _stored_document(db_session, other_tenant.id, test_user.id, ["secret"])
+    unstored = _stored_document(db_session, test_user.tenant_id, test_user.id, None)
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    
+    for document in (other, unstored):
+        response = client.get(f"/api/v1/documents/{document.id}/text", headers=headers)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
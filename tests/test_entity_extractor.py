@@ -0,0 +1,82 @@
+"""
+Tests for the single-pass entity extraction engine.
+"""
+import random
+import pytest
+from app.services.entity_extractor import ChunkedScan, EntityAccumulator, EntityExtractor, limit_entities
+from app.services.document_processor import DocumentProcessor
+from benchmarks.corpus import synthetic_text
+from benchmarks.reference import legacy_extract_entities
+
+SAMPLE = (
+    "Invoice from Acme Holdings Group dated 2024-01-15, due March 3, 2024 or 15 Jan 2025.\n"
+    "Total: $1,234.56 (USD 980.00), 2,500 dollars, €75 and £1,200.50 payable to "
+    "billing@acme-corp.io or john.doe@example.com. Call 555-123-4567, (555) 987-6543 or "
+    "+44 20 7946 0958. See https://example.com/invoices/42 and HTTP://ignored.example. "
+    "Blue River Technologies Inc uses Kubernetes, machine learning and an API hosted by Google."
+)
+
+TOKENS = [
+    "Acme", "Group", "Co.", "inc", "Big Blue Systems", "$1,000", "12", "2024-01-15", "01/02/2024",
+    "May", "3,", "USD", "usd5", "dollars", ",", "(555)", "555.123.4567", "+1-555-1234", "x+1",
+    "a@b.co", "@", "http://ex.com/a", "IBM", "cloud", "AI", "data science", "\n", "é", "K", "1.5",
+]
+
+
+def test_engine_matches_reference_on_sample():
+    """Test the engine returns exactly what the per-pattern implementation returned."""
+    assert limit_entities(EntityExtractor().scan(SAMPLE)) == legacy_extract_entities(SAMPLE)
+
+
+def test_engine_matches_reference_on_random_text():
+    """Test parity on randomly assembled entity fragments and on synthetic prose."""
+    extractor = EntityExtractor()
+    rng = random.Random(42)
+    for _ in range(300):
+        text = "".join(rng.choice(TOKENS) + rng.choice([" ", "", "\n", ", ", ". ", "-"]) for _ in range(40))
+        assert limit_entities(extractor.scan(text)) == legacy_extract_entities(text)
+    text = synthetic_text(50_000, seed=7)
+    assert limit_entities(extractor.scan(text)) == legacy_extract_entities(text)
+
+
+@pytest.mark.parametrize("text", ["Straße İstanbul Acme Holdings Group 2024-01-15", "ſecurity and Cloud at Acme Big Co"])
+def test_engine_falls_back_when_case_folding_changes_offsets(text):
+    """Test texts whose lowercased copy does not line up still match the reference."""
+    assert limit_entities(EntityExtractor().scan(text)) == legacy_extract_entities(text)
+
+
+def test_extract_entities_without_nlp():
+    """Test DocumentProcessor.extract_entities keeps its output with the regex fallback."""
+    processor = DocumentProcessor()
+    processor.nlp = None
+    assert processor.extract_entities(SAMPLE) == legacy_extract_entities(SAMPLE)
+    assert processor.extract_entities("") == legacy_extract_entities("")
+
+
+def _chunked_entities(text, sizes, overlap):
+    scan = ChunkedScan(EntityExtractor(), overlap=overlap)
+    accumulator = EntityAccumulator()
+    position = 0
+    for size in sizes:
+        accumulator.add(scan.feed(text[position:position + size]))
+        position += size
+    accumulator.add(scan.feed(text[position:]))
+    accumulator.add(scan.finish())
+    return accumulator.result()
+
+
+def test_chunked_scan_keeps_matches_across_chunk_boundaries():
+    """Test cutting the text at every offset of the sample loses or splits no entity."""
+    expected = limit_entities(EntityExtractor().scan(SAMPLE))
+    for cut in range(1, len(SAMPLE)):
+        assert _chunked_entities(SAMPLE, [cut], overlap=64) == expected, cut
+
+
+def test_chunked_scan_matches_whole_text_in_any_chunking():
+    """Test random chunk sizes, including chunks shorter than the overlap."""
+    text = synthetic_text(40_000, seed=5)
+    expected = limit_entities(EntityExtractor().scan(text))
+    rng = random.Random(3)
+    for _ in range(5):
+        sizes = [rng.randint(1, 3000) for _ in range(60)]
+        assert _chunked_entities(text, sizes, overlap=128) == expected
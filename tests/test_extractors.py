@@ -0,0 +1,206 @@
+"""
+Tests for magic-byte extractor selection.
+"""
+import zipfile
+import pytest
+from app.services.extractors import EXTRACTORS, ExtractorRegistry, UnsupportedFormatError
+from app.services import document_processor
+from app.services.document_processor import DocumentProcessor
+from benchmarks.corpus import synthetic_pdf
+
+
+def test_content_decides_over_extension(tmp_path):
+    """Test a PDF uploaded as .txt is still read as PDF."""
+    path = synthetic_pdf(str(tmp_path / "report.txt"), pages=2, chars_per_page=400)
+    assert EXTRACTORS.sniff(path, "report.txt").name == "pdf"
+    pages = list(DocumentProcessor().iter_document_pages(path, "report.txt"))
+    assert len(pages) == 2
+
+
+@pytest.mark.parametrize("head, name", [
+    (b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR", "image"),
+    (b"\xff\xd8\xff\xe0\x00\x10JFIF", "image"),
+    (b"II*\x00\x08\x00\x00\x00", "image"),
+    (b"%PDF-1.7\n", "pdf"),
+    (b"BMW annual report, fiscal year 2023.", "text"),
+    (b"MZ is not an executable here.", "text"),
+    (b"plain notes", "text"),
+    (b"", "text"),
+    (b"\xff\xfeh\x00i\x00", "text"),
+])
+def test_identify_supported_formats(head, name):
+    """Test leading bytes pick the extractor, and short printable signatures need binary content."""
+    assert EXTRACTORS.identify(head, "upload.bin").name == name
+
+
+@pytest.mark.parametrize("head", [
+    b"PK\x03\x04\x14\x00\x06\x00",
+    b"\x1f\x8b\x08\x00\x00\x00\x00\x00",
+    b"\x7fELF\x02\x01\x01\x00",
+    b"MZ\x90\x00\x03\x00\x00\x00",
+    b"\x00\x01\x02\x03 random binary",
+])
+def test_identify_rejects_binaries(head):
+    """Test known binary formats and other binary data are rejected."""
+    with pytest.raises(UnsupportedFormatError):
+        EXTRACTORS.identify(head, "upload.txt")
+
+
+def test_docx_is_rejected_without_reading_it(tmp_path, monkeypatch):
+    """Test a zip-based upload fails fast instead of being scanned as text."""
+    path = tmp_path / "contract.docx"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", "<w:t>Contract</w:t>" * 1000)
+    processor = DocumentProcessor()
+    monkeypatch.setattr(processor, "iter_text_pages", lambda file_path: pytest.fail("read as text"))
+    with pytest.raises(UnsupportedFormatError, match="zip archive"):
+        processor.process_document(str(path), "contract.docx")
+
+
+def test_new_format_plugs_in():
+    """Test a registered format takes over its signature, longest match first."""
+    registry = ExtractorRegistry(default="text")
+    registry.register("text", lambda processor, path: iter(()), extensions=[".txt"])
+    registry.register_unsupported("zip archive", [b"PK\x03\x04"])
+    assert registry.identify(b"a,b\n1,2\n", "table.csv").name == "text"
+    registry.register("csv", lambda processor, path: iter(()), extensions=[".csv"])
+    registry.register("epub", lambda processor, path: iter(()), signatures=[(0, b"PK\x03\x04"), (30, b"mimetype")])
+    assert registry.identify(b"a,b\n1,2\n", "table.csv").name == "csv"
+    epub = b"PK\x03\x04" + b"\x00" * 26 + b"mimetypeapplication/epub+zip"
+    assert registry.identify(epub, "book.epub").name == "epub"
+    with pytest.raises(UnsupportedFormatError):
+        registry.identify(b"PK\x03\x04" + b"\x00" * 40, "archive.zip")
+
+
+def _pdf_with_info(tmp_path, name="report.pdf", user_password=None, **info):
+    from pypdf import PdfReader, PdfWriter
+    source = synthetic_pdf(str(tmp_path / f"plain-{name}"), pages=3, chars_per_page=300)
+    writer = PdfWriter(clone_from=PdfReader(source))
+    writer.add_metadata(info)
+    if user_password is not None:
+        writer.encrypt(user_password, owner_password="owner")
+    path = tmp_path / name
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def test_pdf_document_info_skips_text_extraction(tmp_path, monkeypatch):
+    """Test page count and document information come from the PDF structure alone."""
+    path = _pdf_with_info(
+        tmp_path, **{"/Title": "Annual Report", "/Producer": "Acme Writer 2.1", "/CreationDate": "D:20240115093000Z"}
+    )
+    processor = DocumentProcessor()
+    
+    def no_extraction(*args, **kwargs):
+        raise AssertionError("page text was extracted")
+    
+    monkeypatch.setattr(processor, "iter_pdf_pages", no_extraction)
+    info = processor.extract_document_info(path, "report.pdf")
+    
+    assert info["page_count"] == 3
+    assert info["title"] == "Annual Report"
+    assert info["producer"] == "Acme Writer 2.1"
+    assert info["created"].startswith("2024-01-15T09:30:00")
+    assert info["encrypted"] is False
+    assert processor.extract_document_info(__file__, "test.py") == {}
+
+
+def test_pdf_document_info_of_encrypted_pdfs(tmp_path):
+    """Test PDFs that open with an empty password are read, others only report that they are encrypted."""
+    processor = DocumentProcessor()
+    restricted = processor.extract_document_info(_pdf_with_info(tmp_path, "restricted.pdf", user_password=""), "a.pdf")
+    locked = processor.extract_document_info(_pdf_with_info(tmp_path, "locked.pdf", user_password="secret"), "b.pdf")
+    
+    assert restricted["encrypted"] is True and restricted["page_count"] == 3
+    assert locked["encrypted"] is True and "page_count" not in locked
+
+
+def _scanned_pdf(tmp_path, name="scan.pdf", pages=2):
+    from PIL import Image
+    images = [Image.new("RGB", (200, 260), "white") for _ in range(pages)]
+    path = tmp_path / name
+    images[0].save(path, "PDF", save_all=True, append_images=images[1:])
+    return str(path)
+
+
+def _mixed_pdf(tmp_path):
+    from pypdf import PdfReader, PdfWriter
+    writer = PdfWriter()
+    for source in (
+        synthetic_pdf(str(tmp_path / "first.pdf"), pages=1, chars_per_page=200, seed=1),
+        _scanned_pdf(tmp_path, "middle.pdf", pages=1),
+        synthetic_pdf(str(tmp_path / "last.pdf"), pages=1, chars_per_page=200, seed=2),
+    ):
+        for page in PdfReader(source).pages:
+            writer.add_page(page)
+    path = tmp_path / "mixed.pdf"
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    """OCR without tesseract: every rendered page reads as its pixel size."""
+    monkeypatch.setattr(document_processor, "OCR_AVAILABLE", True)
+    monkeypatch.setattr(document_processor, "ocr_image", lambda image: f"OCR {image.size[0]}x{image.size[1]}")
+    processor = DocumentProcessor()
+    processor.parallel_workers = 1
+    processor.ocr_dpi = 72
+    return processor
+
+
+def test_probe_classifies_pdfs(tmp_path):
+    """Test the probe tells text, scanned, mixed and password-protected PDFs apart from their structure."""
+    assert document_processor.probe_pdf(synthetic_pdf(str(tmp_path / "text.pdf"), pages=2)) == ("text", 2, [])
+    assert document_processor.probe_pdf(_scanned_pdf(tmp_path)) == ("scanned", 2, [0, 1])
+    assert document_processor.probe_pdf(_mixed_pdf(tmp_path)) == ("mixed", 3, [1])
+    locked = _pdf_with_info(tmp_path, "locked.pdf", user_password="secret")
+    assert document_processor.probe_pdf(locked).kind == "encrypted"
+
+
+def test_pdf_structure_is_read_once_per_document(tmp_path, monkeypatch):
+    """Test the document info shown before extraction and the probe routing extraction share one parse."""
+    reads = []
+    read_pdf_structure = document_processor.read_pdf_structure
+    
+    def counted(file_path):
+        reads.append(file_path)
+        return read_pdf_structure(file_path)
+    
+    monkeypatch.setattr(document_processor, "read_pdf_structure", counted)
+    path = synthetic_pdf(str(tmp_path / "report.pdf"), pages=3, chars_per_page=200)
+    processor = DocumentProcessor()
+    processor.nlp = None
+    processor.parallel_page_threshold = 0
+    info = processor.extract_document_info(path, "report.pdf")
+    analysis = processor.analyze_document(path, "report.pdf", document_info=info)
+    
+    assert reads == [path]
+    assert info["page_count"] == analysis.page_count == 3
+
+
+def test_scanned_pdf_goes_straight_to_ocr(tmp_path, monkeypatch, fake_ocr):
+    """Test a scanned PDF is rendered and OCRed without running the text extractors."""
+    def no_text_extraction(*args, **kwargs):
+        raise AssertionError("scanned PDF went through the text extractors")
+    
+    monkeypatch.setattr(document_processor, "iter_pdf_page_range", no_text_extraction)
+    assert list(fake_ocr.iter_pdf_pages(_scanned_pdf(tmp_path))) == ["OCR 200x260", "OCR 200x260"]
+
+
+def test_mixed_pdf_ocrs_only_image_pages(tmp_path, fake_ocr):
+    """Test only the image-only pages of a mixed PDF are OCRed, in page order."""
+    pages = list(fake_ocr.iter_pdf_pages(_mixed_pdf(tmp_path)))
+    
+    assert len(pages) == 3
+    assert pages[1] == "OCR 200x260"
+    assert pages[0] and not pages[0].startswith("OCR") and not pages[2].startswith("OCR")
+
+
+def test_password_protected_pdf_is_rejected(tmp_path):
+    """Test a PDF that needs a password fails fast instead of yielding empty text."""
+    path = _pdf_with_info(tmp_path, "locked.pdf", user_password="secret")
+    with pytest.raises(UnsupportedFormatError, match="encrypted pdf"):
+        list(DocumentProcessor().iter_pdf_pages(path))
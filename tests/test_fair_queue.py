@@ -0,0 +1,115 @@
+"""
+Tests for per-tenant fair scheduling of the document queue.
+"""
+from collections import defaultdict, deque
+from rq import Queue
+from app.services import queue_service
+from app.services.fair_queue import DeficitRoundRobin, FairQueue
+from app.services.queue_service import QueueService
+
+
+class _ListsAndSets:
+    """The Redis list and set commands FairQueue uses, in memory."""
+    
+    def __init__(self):
+        self.lists = defaultdict(deque)
+        self.sets = defaultdict(set)
+    
+    def pipeline(self, transaction=True):
+        return self
+    
+    def execute(self):
+        return []
+    
+    def rpush(self, key, value):
+        self.lists[key].append(value)
+    
+    def lpush(self, key, value):
+        self.lists[key].appendleft(value)
+    
+    def ltrim(self, key, start, end):
+        self.lists[key] = deque(list(self.lists[key])[start:end + 1])
+    
+    def lpop(self, key):
+        return self.lists[key].popleft() if self.lists[key] else None
+    
+    def sadd(self, key, value):
+        self.sets[key].add(value)
+    
+    def smembers(self, key):
+        return set(self.sets[key])
+    
+    def register_script(self, script):
+        def retire(keys, args):
+            if not self.lists[keys[1]]:
+                self.sets[keys[0]].discard(args[0])
+        return retire
+
+
+def _serve(scheduler, backlog, jobs):
+    """Tenants served for ``jobs`` jobs while ``backlog`` (tenant -> waiting jobs) lasts."""
+    served = []
+    for _ in range(jobs):
+        tenant = scheduler.next_tenant([tenant for tenant, waiting in backlog.items() if waiting])
+        if tenant is None:
+            break
+        backlog[tenant] -= 1
+        served.append(tenant)
+    return served
+
+
+def test_tenants_take_turns():
+    """Test a tenant with a long backlog does not hold up the others."""
+    served = _serve(DeficitRoundRobin(), {"big": 100, "a": 2, "b": 2}, 8)
+    assert served[:6] == ["a", "b", "big", "a", "b", "big"]
+    assert served[6:] == ["big", "big"]
+
+
+def test_weights_set_the_share_of_each_tenant():
+    """Test a tenant of weight 3 gets three jobs per job of a weight 1 tenant, and fractions carry over."""
+    served = _serve(DeficitRoundRobin({"7": 3, "8": 0.5}), {"7": 100, "9": 100, "8": 100}, 90)
+    assert served.count("7") == 3 * served.count("9")
+    assert served.count("9") == 2 * served.count("8")
+
+
+def test_new_tenant_joins_the_rotation():
+    """Test a tenant that starts uploading is served within one round."""
+    scheduler = DeficitRoundRobin()
+    backlog = {"big": 100, "other": 100}
+    _serve(scheduler, backlog, 5)
+    backlog["new"] = 1
+    assert "new" in _serve(scheduler, backlog, 3)
+
+
+def test_enqueue_routes_job_to_its_tenant(monkeypatch):
+    """Test a document job lands on its tenant's list and marks the tenant active."""
+    redis = _ListsAndSets()
+    monkeypatch.setattr(queue_service.express_queue, "connection", redis)
+    # Keep only the push; the rest of RQ's enqueue writes the job hash
+    monkeypatch.setattr(
+        Queue, "_enqueue_job",
+        lambda self, job, pipeline=None, at_front=False: self.push_job_id(job.id, pipeline=pipeline) or job
+    )
+    job_id = QueueService.enqueue_document_processing(5, 7)
+    
+    queue = queue_service.express_queue
+    assert list(redis.lists[queue.tenant_key("7")]) == [job_id]
+    assert redis.sets[queue.tenants_key] == {"7"}
+    assert not redis.lists[queue.key]
+
+
+def test_queue_pops_tenants_in_turn_and_retires_empty_ones():
+    """Test the fair queue interleaves tenants and forgets a tenant once its list is empty."""
+    redis = _ListsAndSets()
+    queue = FairQueue("documents", connection=redis, weights={})
+    for number in range(5):
+        queue._routes[f"big{number}"] = "1"
+        queue.push_job_id(f"big{number}")
+    queue._routes["small"] = "2"
+    queue.push_job_id("small")
+    
+    order = [queue.pop_job_id() for _ in range(6)]
+    assert order[:3] == ["big0", "small", "big1"]
+    assert sorted(order) == sorted(["small"] + [f"big{number}" for number in range(5)])
+    assert queue.pop_job_id() is None
+    assert redis.sets[queue.tenants_key] == set()
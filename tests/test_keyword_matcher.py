@@ -0,0 +1,35 @@
+"""
+Tests for the shared classification keyword matcher.
+"""
+import random
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.document_processor import DocumentProcessor
+from benchmarks.corpus import synthetic_text
+from benchmarks.reference import legacy_detect_document_type, legacy_categorize_content
+
+FRAGMENTS = [
+    "invoice", "Bill To", "amount", " due", "sub", "total", "receipt", "payment", " received", "Thank you",
+    " for your purchase", "agreement", "contract", "terms", " and conditions", "party", "API", "data", "base",
+    "server", "code", "software", "legal", "business", "market", "research", "thesis", "paper", " ", "\n", "x",
+]
+
+
+def test_matcher_matches_original_functions():
+    """Test type and categories from the shared matcher equal the original per-function scans."""
+    processor = DocumentProcessor()
+    rng = random.Random(5)
+    texts = ["", synthetic_text(30_000, seed=2)]
+    texts += ["".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 8))) for _ in range(3000)]
+    for text in texts:
+        for filename in ("upload.pdf", "march_report.txt"):
+            matched = processor.match_keywords(text)
+            assert processor.detect_document_type(text, filename, matched) == legacy_detect_document_type(text, filename)
+            assert processor._categorize_content(text, {}, matched) == legacy_categorize_content(text)
+
+
+def test_matcher_pending_groups():
+    """Test only pending groups are checked and overlapping keywords settle each other."""
+    matcher = KeywordMatcher({"total": ["subtotal", "total"], "terms": ["terms and conditions"], "short": ["terms"]})
+    assert matcher.match("the subtotal is due") == {"total"}
+    assert matcher.match("see terms and conditions", pending={"short"}) == {"short"}
+    assert matcher.match("nothing here") == set()
@@ -0,0 +1,98 @@
+"""
+Tests for sorting document jobs into express and bulk lanes.
+"""
+import time
+import types
+import pytest
+from rq.timeouts import JobTimeoutException, UnixSignalDeathPenalty
+from app.services import document_processor, lanes, queue_service
+from app.services.document_processor import DocumentProcessor
+from app.services.lanes import BULK, EXPRESS, JOB_OVERHEAD_SECONDS, classify, job_timeout, tiff_frame_count
+from app.services.stage_budget import total_budget
+from app.services.queue_service import QueueService
+from benchmarks.corpus import synthetic_image, synthetic_pdf
+
+
+@pytest.fixture
+def lane_limits(monkeypatch):
+    monkeypatch.setattr(lanes.settings, "express_max_bytes", 1024 * 1024)
+    monkeypatch.setattr(lanes.settings, "express_max_pages", 3)
+
+
+def test_large_files_go_to_bulk_lane(lane_limits, tmp_path):
+    """Test the file size alone decides for documents without pages to count."""
+    path = tmp_path / "receipt.txt"
+    path.write_text("Total: 12.50 EUR")
+    assert classify(path.stat().st_size, str(path), "text/plain") == EXPRESS
+    assert classify(2 * 1024 * 1024, str(path), "text/plain") == BULK
+
+
+def test_long_pdfs_go_to_bulk_lane(lane_limits, tmp_path):
+    """Test a small PDF with more pages than the express limit goes to the bulk lane."""
+    short = synthetic_pdf(str(tmp_path / "short.pdf"), pages=2, chars_per_page=100)
+    long = synthetic_pdf(str(tmp_path / "long.pdf"), pages=5, chars_per_page=100)
+    assert lanes.page_count(long) == 5
+    assert classify(100, short, "application/pdf") == EXPRESS
+    # Found by the file's signature, whatever type the client sent
+    assert classify(100, long, "application/octet-stream") == BULK
+
+
+def test_multi_page_tiffs_go_to_bulk_lane(lane_limits, tmp_path):
+    """Test the frames of a TIFF are counted from its directory chain."""
+    single = synthetic_image(str(tmp_path / "one.tiff"), chars_per_page=50, width=200, pages=1)
+    scan = synthetic_image(str(tmp_path / "scan.tiff"), chars_per_page=50, width=200, pages=5)
+    assert classify(100, single, "image/tiff") == EXPRESS
+    assert classify(100, scan, "image/tiff") == BULK
+    with open(scan, "rb") as f:
+        # Counting stops once the limit is passed
+        assert tiff_frame_count(f, limit=1) == 2
+
+
+def test_unreadable_file_is_classified_by_size(lane_limits, tmp_path):
+    """Test a missing file does not fail the upload."""
+    assert classify(100, str(tmp_path / "gone.pdf"), "application/pdf") == EXPRESS
+
+
+def test_bulk_job_uses_bulk_queue_and_timeout(monkeypatch):
+    """Test a bulk document is enqueued on the bulk lane under the bulk timeout."""
+    enqueued = []
+    
+    def enqueue(*args, **kwargs):
+        enqueued.append(kwargs)
+        return types.SimpleNamespace(id=kwargs["job_id"])
+    
+    monkeypatch.setattr(queue_service.bulk_queue, "enqueue", enqueue)
+    monkeypatch.setattr(lanes.settings, "bulk_job_timeout_seconds", 7200)
+    assert QueueService.enqueue_document_processing(5, 7, lane=BULK) == "doc_5_7"
+    assert enqueued[0]["job_timeout"] == 7200
+
+
+def test_lane_timeouts_leave_room_for_stage_budgets(monkeypatch):
+    """Test no lane's job timeout ends before every stage could use up its budget."""
+    for lane in (EXPRESS, BULK):
+        assert job_timeout(lane) >= total_budget() + JOB_OVERHEAD_SECONDS
+    monkeypatch.setattr(lanes.settings, "express_job_timeout_seconds", 300)
+    assert job_timeout(EXPRESS) >= 300 + 15 + 60 + JOB_OVERHEAD_SECONDS
+
+
+def test_hanging_express_extraction_saves_partial_result(monkeypatch, tmp_path):
+    """Test an extraction over budget is skipped under the express job timeout instead of killing the job."""
+    def hang(file_path, start, stop):
+        while True:
+            time.sleep(0.01)
+    
+    monkeypatch.setattr(lanes.settings, "express_job_timeout_seconds", 1)
+    monkeypatch.setattr(lanes.settings, "stage_budget_extraction_seconds", 1.5)
+    monkeypatch.setattr(document_processor, "extract_pdf_page_range", hang)
+    processor = DocumentProcessor()
+    processor.nlp = None
+    processor.parallel_page_threshold = 2
+    processor.parallel_workers = 2
+    path = synthetic_pdf(str(tmp_path / "receipt.pdf"), pages=4, chars_per_page=200)
+    
+    try:
+        with UnixSignalDeathPenalty(job_timeout(EXPRESS), JobTimeoutException):
+            metadata = processor.process_document(path, "receipt.pdf")
+    except JobTimeoutException:
+        pytest.fail("the job timeout killed the job before the extraction budget ran out")
+    assert metadata["skipped_stages"] == ["extraction"]
@@ -0,0 +1,85 @@
+"""
+Tests for sampled-window language detection.
+"""
+import random
+from collections import Counter
+from app.services.language_detector import LanguageDetector, WindowSampler
+from app.services.document_processor import DocumentProcessor
+
+GERMAN = (
+    "Die Gesellschaft verpflichtet sich, die vereinbarten Leistungen innerhalb der "
+    "genannten Frist zu erbringen. Der Vertrag kann von beiden Parteien mit einer Frist "
+    "von drei Monaten zum Ende eines Kalenderjahres gekündigt werden. Alle Änderungen "
+    "bedürfen der Schriftform und müssen von beiden Seiten unterzeichnet werden. "
+)
+ENGLISH_COVER = (
+    "CONFIDENTIAL. Prepared for the board of directors by the finance department. "
+    "This document and the information it contains are the property of the company. "
+)
+
+
+def test_sampler_does_not_depend_on_chunking():
+    """Test the same text keeps the same windows however it is fed."""
+    text = "".join(chr(ord("a") + i % 26) for i in range(50_000))
+    whole = WindowSampler(window_chars=100, samples=5, seed=7)
+    whole.feed(text)
+    rng = random.Random(1)
+    chunked = WindowSampler(window_chars=100, samples=5, seed=7)
+    pos = 0
+    while pos < len(text):
+        size = rng.randint(1, 700)
+        chunked.feed(text[pos:pos + size])
+        pos += size
+    assert chunked.windows() == whole.windows()
+    assert len(whole.windows()) == 5
+    assert all(len(window) == 100 for window in whole.windows())
+
+
+def test_sampler_spreads_across_the_text():
+    """Test windows are drawn from the whole text, not just its start."""
+    positions = Counter()
+    for seed in range(400):
+        sampler = WindowSampler(window_chars=1, samples=2, seed=seed)
+        sampler.feed("0123456789")
+        positions.update(sampler.windows())
+    # Each of the ten windows should be kept about 80 times out of 800
+    assert set(positions) == set("0123456789")
+    assert all(40 < count < 120 for count in positions.values())
+
+
+def test_short_text_uses_trailing_window():
+    """Test text shorter than one window is still sampled."""
+    sampler = WindowSampler(window_chars=300, samples=5)
+    sampler.feed("short text")
+    assert sampler.windows() == ["short text"]
+
+
+def test_detection_is_reproducible():
+    """Test repeated detection of the same text gives the same language."""
+    detector = LanguageDetector()
+    text = GERMAN * 20
+    assert {detector.detect(text) for _ in range(5)} == {"de"}
+
+
+def test_cover_page_does_not_decide_the_language():
+    """Test an English cover page in front of a German document still gives German."""
+    processor = DocumentProcessor()
+    text = ENGLISH_COVER * 6 + GERMAN * 40
+    assert processor.detect_language(text[:1000]) == "en"
+    assert processor.detect_language(text) == "de"
+
+
+def test_streamed_language_matches_whole_text(tmp_path):
+    """Test the language sampled page by page is the whole-text language."""
+    processor = DocumentProcessor()
+    processor.nlp = None
+    text = ENGLISH_COVER * 6 + GERMAN * 40
+    path = tmp_path / "vertrag.txt"
+    path.write_text(text, encoding="utf-8")
+    metadata = processor.process_document(str(path), "vertrag.txt")
+    assert metadata["language"] == processor.detect_language(text) == "de"
+
+
+def test_text_without_letters_defaults_to_english():
+    """Test windows that are mostly numbers do not vote."""
+    assert LanguageDetector().detect("12 34 56 78 90 " * 100) == "en"
@@ -0,0 +1,70 @@
+"""
+Tests for per-stage timings and worker metrics.
+"""
+import urllib.request
+from app.services.document_processor import DocumentProcessor
+from app.services.metrics import Counter, Histogram, start_metrics_server, render_metrics, STAGE_SECONDS
+from benchmarks.corpus import synthetic_pdf
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test buckets are cumulative and end in +Inf, with sum and count per label set."""
+    histogram = Histogram("test_seconds", "Test timings.", labelnames=("stage",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 3):
+        histogram.observe(value, stage="iter_pdf_pages")
+    histogram.observe(0.1, stage='odd"name')
+    lines = histogram.render().splitlines()
+    assert lines[:2] == ["# HELP test_seconds Test timings.", "# TYPE test_seconds histogram"]
+    assert 'test_seconds_bucket{stage="iter_pdf_pages",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{stage="iter_pdf_pages",le="1"} 3' in lines
+    assert 'test_seconds_bucket{stage="iter_pdf_pages",le="+Inf"} 4' in lines
+    assert 'test_seconds_sum{stage="iter_pdf_pages"} 4.05' in lines
+    assert 'test_seconds_count{stage="iter_pdf_pages"} 4' in lines
+    # Bucket bounds are inclusive, label values escaped
+    assert 'test_seconds_bucket{stage="odd\\"name",le="0.1"} 1' in lines
+
+
+def test_counter_renders_one_line_per_label_set():
+    """Test counters accumulate per label set and render as Prometheus counters."""
+    counter = Counter("test_lookups_total", "Test lookups.", labelnames=("result",))
+    counter.inc(result="hit")
+    counter.inc(result="hit")
+    counter.inc(result="miss")
+    assert counter.value(result="hit") == 2
+    assert counter.render().splitlines() == [
+        "# HELP test_lookups_total Test lookups.",
+        "# TYPE test_lookups_total counter",
+        'test_lookups_total{result="hit"} 2',
+        'test_lookups_total{result="miss"} 1',
+    ]
+
+
+def test_metadata_has_timings_per_processor_stage(tmp_path):
+    """Test every stage of a PDF job is timed under its function name."""
+    processor = DocumentProcessor()
+    processor.nlp = None
+    path = synthetic_pdf(str(tmp_path / "report.pdf"), pages=2, chars_per_page=600)
+    timings = processor.process_document(path, "report.pdf")["stage_timings"]
+    assert set(timings) == {
+        "iter_pdf_pages", "extract_document_info", "text_metrics", "extract_entities", "match_keywords",
+        "detect_language", "extract_organizations",
+    }
+    assert all(seconds >= 0 for seconds in timings.values())
+    for stage in timings:
+        assert callable(getattr(processor, stage))
+
+
+def test_metrics_endpoint_is_scrapeable():
+    """Test the worker metrics server serves the histograms on /metrics."""
+    STAGE_SECONDS.observe(0.2, stage="detect_language")
+    server = start_metrics_server(0, host="127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            body = response.read().decode("utf-8")
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert body == render_metrics()
+        assert 'document_stage_seconds_count{stage="detect_language"}' in body
+    finally:
+        server.shutdown()
+        server.server_close()
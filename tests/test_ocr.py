@@ -0,0 +1,74 @@
+"""
+Tests for OCR preprocessing, tiling and multi-page images.
+"""
+from PIL import Image, ImageDraw
+from app.services import ocr
+from app.services.document_processor import DocumentProcessor
+from benchmarks.corpus import synthetic_image
+
+
+def _striped(height=1000, width=300, band=40, gap=20):
+    """Black "text lines" of ``band`` rows separated by white gaps."""
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    for top in range(10, height, band + gap):
+        draw.rectangle((10, top, width - 10, top + band - 1), fill=0)
+    return image
+
+
+def test_preprocess_downscales_and_binarizes():
+    """Test scans above the target DPI are downscaled, and the result is black and white."""
+    image = Image.new("L", (1200, 800), 200)
+    ImageDraw.Draw(image).rectangle((100, 100, 600, 300), fill=60)
+    image.info["dpi"] = (600, 600)
+    
+    prepared = ocr.preprocess(image, target_dpi=300)
+    
+    assert prepared.mode == "1"
+    assert prepared.size == (600, 400)
+    assert prepared.getpixel((175, 100)) == 0 and prepared.getpixel((400, 300)) == 255
+    assert ocr.preprocess(Image.new("L", (100, 100), 255), target_dpi=300).size == (100, 100)
+    assert 60 <= ocr.otsu_threshold(image) < 200
+
+
+def test_tiles_are_cut_between_lines():
+    """Test tall images are cut only at white rows, and the tiles cover the image."""
+    image = _striped()
+    
+    tiles = ocr.split_tiles(image, tile_rows=300)
+    
+    assert len(tiles) == 3
+    assert sum(tile.height for tile in tiles) == image.height
+    top = 0
+    for tile in tiles[:-1]:
+        top += tile.height
+        assert image.getpixel((150, top)) == 255
+    assert ocr.split_tiles(image, tile_rows=800) == [image]
+
+
+def test_every_tiff_frame_is_ocred(tmp_path, monkeypatch):
+    """Test each frame of a multi-page TIFF becomes a page, with its tiles joined in order."""
+    path = synthetic_image(str(tmp_path / "scan.tiff"), chars_per_page=2500, pages=3, width=600)
+    monkeypatch.setattr(ocr, "ocr_image", lambda tile: f"{tile.width}x{tile.height}")
+    processor = DocumentProcessor()
+    processor.ocr_workers = 1
+    processor.ocr_tile_rows = 150
+    
+    pages = list(processor.iter_image_pages(path))
+    
+    assert len(pages) == 3
+    with Image.open(path) as image:
+        for number, page in enumerate(pages):
+            image.seek(number)
+            tile_heights = [int(tile.split("x")[1]) for tile in page.split("\n")]
+            assert len(tile_heights) > 1 and sum(tile_heights) == image.height
+
+
+def test_tiles_ocred_in_pool_keep_frame_order(tmp_path):
+    """Test frames split into tiles and OCRed in worker processes still come back one per frame."""
+    path = synthetic_image(str(tmp_path / "scan.tiff"), chars_per_page=1200, pages=3, width=500)
+    processor = DocumentProcessor()
+    processor.ocr_workers = 2
+    processor.ocr_tile_rows = 120
+    
+    assert len(list(processor.iter_image_pages(path))) == 3
@@ -0,0 +1,227 @@
+"""
+Tests for the queue backends' claim, acknowledge and redelivery semantics.
+"""
+import threading
+import time
+import fakeredis
+import pytest
+from app.services.fair_queue import FairQueue
+from app.services.queue_backends import CONSUMER_GROUP, InMemoryBackend, RedisStreamsBackend, RQBackend, _message
+
+JOB = "app.worker.process_document"
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return _Clock()
+
+
+@pytest.fixture
+def backend(clock):
+    return InMemoryBackend(visibility_timeout=60, clock=clock)
+
+
+@pytest.fixture
+def redis_connection():
+    return fakeredis.FakeRedis()
+
+
+def _streams(connection):
+    """A Redis Streams backend as one worker process has it; claims go stale after 0.2 seconds."""
+    return RedisStreamsBackend(connection, {"express": "document_express", "bulk": "document_bulk"},
+                               visibility_timeout=0.2, weights={})
+
+
+def _pending(connection, message):
+    """Consumer and delivery count of a pending stream entry, or None once it is acknowledged."""
+    entries = connection.xpending_range(message.location, CONSUMER_GROUP, message.message_id, message.message_id, 1)
+    return (entries[0]["consumer"].decode(), entries[0]["times_delivered"]) if entries else None
+
+
+def _enqueue(backend, queue, document_id, tenant_id=1):
+    return backend.enqueue(queue, JOB, (document_id, tenant_id), f"doc_{document_id}", tenant_id, 300)
+
+
+def test_acknowledged_job_is_gone(backend):
+    """Test a claimed job stays counted until it is acknowledged."""
+    _enqueue(backend, "express", 1)
+    message, = backend.claim(["express"], "worker-a")
+    assert message.args == (1, 1) and message.deliveries == 1
+    assert backend.job_status("doc_1")["status"] == "started"
+    assert backend.depth("express") == 1
+    
+    backend.ack(message)
+    assert backend.depth("express") == 0
+    assert backend.job_status("doc_1")["status"] == "finished"
+    assert backend.claim(["express"], "worker-b") == []
+
+
+def test_stale_claim_is_delivered_again(backend, clock):
+    """Test a job whose worker stopped extending its claim goes to another worker."""
+    _enqueue(backend, "express", 1)
+    first, = backend.claim(["express"], "worker-a")
+    clock.now = 59
+    assert backend.claim(["express"], "worker-b") == []
+    
+    clock.now = 61
+    again, = backend.claim(["express"], "worker-b")
+    assert again.job_id == first.job_id
+    assert again.deliveries == 2
+
+
+def test_extended_claim_is_not_taken_over(backend, clock):
+    """Test a worker that keeps extending its claim keeps its job."""
+    _enqueue(backend, "express", 1)
+    message, = backend.claim(["express"], "worker-a")
+    clock.now = 50
+    backend.extend([message], "worker-a")
+    clock.now = 100
+    assert backend.claim(["express"], "worker-b") == []
+
+
+def test_claim_takes_batches_from_first_queue_with_jobs(backend):
+    """Test queues are served in order and a batch comes from one queue, tenants taking turns."""
+    _enqueue(backend, "backfill", 10)
+    for document_id in (1, 2, 3):
+        _enqueue(backend, "express", document_id, tenant_id=1)
+    _enqueue(backend, "express", 4, tenant_id=2)
+    
+    batch = backend.claim(["bulk", "express", "backfill"], "worker-a", count=3)
+    assert [message.args[0] for message in batch] == [1, 4, 2]
+    assert [message.args[0] for message in backend.claim(["bulk", "express", "backfill"], "worker-a", count=3)] == [3]
+    assert [message.args[0] for message in backend.claim(["bulk", "express", "backfill"], "worker-a")] == [10]
+
+
+def test_blocking_claim_wakes_on_enqueue(backend):
+    """Test a waiting worker gets a job enqueued while it waits."""
+    timer = threading.Timer(0.1, lambda: _enqueue(backend, "express", 1))
+    timer.start()
+    messages = backend.claim(["express"], "worker-a", timeout=5)
+    timer.join()
+    assert [message.args for message in messages] == [(1, 1)]
+
+
+def test_stream_entry_fields_are_decoded():
+    """Test a stream entry as Redis returns it becomes a message."""
+    fields = {b"job_id": b"doc_5_7", b"func": JOB.encode(), b"args": b"[5, 7]", b"tenant_id": b"7", b"timeout": b"300"}
+    message = _message("bulk", "stream:document_bulk:tenant:7", b"1-0", fields, deliveries=2)
+    assert message.args == (5, 7) and message.tenant_id == 7
+    assert message.message_id == "1-0" and message.timeout == 300 and message.deliveries == 2
+
+
+def test_stream_claim_takes_new_entries_tenant_by_tenant(redis_connection):
+    """Test XREADGROUP claims new entries from the first queue with jobs, tenants taking turns."""
+    backend = _streams(redis_connection)
+    _enqueue(backend, "bulk", 10)
+    for document_id in (1, 2):
+        _enqueue(backend, "express", document_id, tenant_id=1)
+    _enqueue(backend, "express", 3, tenant_id=2)
+    
+    batch = backend.claim(["express", "bulk"], "worker-a", count=3)
+    assert [message.args[0] for message in batch] == [1, 3, 2]
+    assert all(message.deliveries == 1 for message in batch)
+    assert batch[1].location == "stream:document_express:tenant:2"
+    assert _pending(redis_connection, batch[0]) == ("worker-a", 1)
+    assert backend.job_status("doc_1")["status"] == "started"
+    assert backend.claim(["express"], "worker-b") == []
+    assert [message.args[0] for message in backend.claim(["express", "bulk"], "worker-b")] == [10]
+
+
+def test_stream_ack_removes_the_entry(redis_connection):
+    """Test XACK and XDEL remove an acknowledged entry and record how its job ended."""
+    backend = _streams(redis_connection)
+    _enqueue(backend, "express", 1)
+    _enqueue(backend, "express", 2)
+    done, failed = backend.claim(["express"], "worker-a", count=2)
+    assert backend.depth("express") == 2
+    
+    backend.ack(done)
+    backend.ack(failed, error="boom")
+    assert backend.depth("express") == 0
+    assert _pending(redis_connection, done) is None
+    assert redis_connection.xlen(done.location) == 0
+    assert backend.job_status("doc_1") == {"status": "finished", "result": None, "error": None}
+    assert backend.job_status("doc_2") == {"status": "failed", "result": None, "error": "boom"}
+
+
+def test_stream_stale_entry_is_reclaimed_and_counted(redis_connection):
+    """Test XPENDING IDLE finds entries of a dead worker and XCLAIM hands them over, counting deliveries."""
+    _enqueue(_streams(redis_connection), "express", 1)
+    first, = _streams(redis_connection).claim(["express"], "died-a")
+    survivor = _streams(redis_connection)
+    assert survivor.claim(["express"], "worker-b") == []
+    
+    time.sleep(0.25)
+    again, = survivor.claim(["express"], "worker-b")
+    assert again.message_id == first.message_id and again.args == (1, 1)
+    assert again.deliveries == 2
+    assert _pending(redis_connection, again) == ("worker-b", 2)
+    
+    time.sleep(0.25)
+    third, = _streams(redis_connection).claim(["express"], "worker-c")
+    assert third.deliveries == 3
+
+
+def test_stream_extend_keeps_the_claim(redis_connection):
+    """Test extending resets the idle time without counting a delivery."""
+    owner = _streams(redis_connection)
+    _enqueue(owner, "express", 1)
+    message, = owner.claim(["express"], "worker-a")
+    time.sleep(0.15)
+    owner.extend([message], "worker-a")
+    time.sleep(0.1)
+    assert _streams(redis_connection).claim(["express"], "worker-b") == []
+    assert _pending(redis_connection, message) == ("worker-a", 1)
+
+
+def test_stream_extend_leaves_reclaimed_entry_alone(redis_connection):
+    """Test a slow worker extending its claim does not take back an entry another worker reclaimed."""
+    slow = _streams(redis_connection)
+    _enqueue(slow, "express", 1)
+    message, = slow.claim(["express"], "worker-a")
+    time.sleep(0.25)
+    reclaimed, = _streams(redis_connection).claim(["express"], "worker-b")
+    
+    slow.extend([message], "worker-a")
+    assert _pending(redis_connection, reclaimed) == ("worker-b", 2)
+
+
+def test_stream_release_keeps_consumer_with_pending_entries(redis_connection):
+    """Test a worker leaving with claimed entries does not take them down with its consumer."""
+    leaving = _streams(redis_connection)
+    _enqueue(leaving, "express", 1)
+    message, = leaving.claim(["express"], "worker-a")
+    leaving.release("worker-a")
+    assert _pending(redis_connection, message) == ("worker-a", 1)
+    
+    time.sleep(0.25)
+    survivor = _streams(redis_connection)
+    again, = survivor.claim(["express"], "worker-b")
+    assert again.deliveries == 2
+    survivor.ack(again)
+    leaving.release("worker-a")
+    assert [consumer["name"] for consumer in redis_connection.xinfo_consumers(message.location, CONSUMER_GROUP)] == [
+        b"worker-b"
+    ]
+
+
+def test_rq_job_status_finds_jobs_of_every_queue(redis_connection):
+    """Test job status looks jobs up by id, not only on the first queue."""
+    queues = {
+        "express": FairQueue("document_express", connection=redis_connection, weights={}),
+        "bulk": FairQueue("document_bulk", connection=redis_connection, weights={}),
+    }
+    backend = RQBackend(queues)
+    backend.enqueue("bulk", JOB, (5, 7), "doc_5_7", 7, 3600)
+    
+    assert backend.job_status("doc_5_7")["status"] == "queued"
+    assert backend.depth("bulk") == 1
+    assert backend.job_status("doc_missing") == {"status": "not_found"}
@@ -1,7 +1,11 @@
 """
 Tests for service layer.
 """
+import hashlib
+import io
+import types
 import pytest
+from app.config import settings
 from app.services.auth_service import AuthService
 from app.services.document_service import DocumentService
 from app.models.document import DocumentStatus
@@ -34,3 +38,14 @@ def test_jwt_token_invalid():
     decoded = AuthService.decode_token("invalid_token")
     assert decoded is None
 
+
+def test_save_uploaded_file_hashes_content(tmp_path, monkeypatch):
+    """Test uploads are hashed while they are written to storage."""
+    monkeypatch.setattr(settings, "storage_path", str(tmp_path))
+    content = b"invoice total $10.00\n" * 100_000
+    upload = types.SimpleNamespace(filename="invoice.txt", file=io.BytesIO(content))
+    file_path, stored_filename, content_hash = DocumentService.save_uploaded_file(upload, tenant_id=1, user_id=1)
+    assert content_hash == hashlib.sha256(content).hexdigest()
+    assert stored_filename.endswith(".txt")
+    with open(file_path, "rb") as f:
+        assert f.read() == content
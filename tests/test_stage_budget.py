@@ -0,0 +1,110 @@
+"""
+Tests for per-stage time budgets and partial results.
+"""
+import signal
+import time
+import types
+import pytest
+import app.services.document_processor as document_processor
+from app.config import settings
+from app.services.document_processor import DocumentProcessor
+from app.services.extractors import EXTRACTORS
+from app.services.stage_budget import StageTimeout, remaining_seconds, time_limit
+from benchmarks.corpus import synthetic_pdf, synthetic_text
+
+
+def _hang():
+    while True:
+        time.sleep(0.01)
+
+
+def _hang_page_range(file_path, start, stop):
+    _hang()
+
+
+def test_time_limit_interrupts_and_is_not_swallowed():
+    """Test a stage over budget is interrupted even through ``except Exception``."""
+    start = time.monotonic()
+    with pytest.raises(StageTimeout):
+        with time_limit(0.2):
+            try:
+                _hang()
+            except Exception:
+                pass
+    assert time.monotonic() - start < 2
+
+
+def test_time_limit_restores_job_timeout_alarm():
+    """Test the queue's job timeout alarm keeps running around a stage."""
+    signal.setitimer(signal.ITIMER_REAL, 30)
+    try:
+        with time_limit(5):
+            assert remaining_seconds() <= 5
+        remaining, _ = signal.getitimer(signal.ITIMER_REAL)
+        assert 25 < remaining <= 30
+        assert remaining_seconds() is None
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def test_slow_extraction_keeps_analyzed_pages(tmp_path, monkeypatch):
+    """Test pages extracted before the budget ran out still make it into the metadata."""
+    monkeypatch.setattr(settings, "stage_budget_extraction_seconds", 0.3)
+    processor = DocumentProcessor()
+    processor.nlp = None
+    
+    def slow_pages(processor, file_path):
+        yield "Invoice for consulting services. Total due: $1,200.00."
+        yield "Payment terms: net 30."
+        _hang()
+    
+    monkeypatch.setattr(EXTRACTORS.get("text"), "extract", slow_pages)
+    path = tmp_path / "invoice.txt"
+    path.write_text("unused", encoding="utf-8")
+    metadata = processor.process_document(str(path), "invoice.txt")
+    assert metadata["skipped_stages"] == ["extraction"]
+    assert metadata["page_count"] == 2
+    assert metadata["document_type"] == "invoice"
+    assert metadata["entities"]["amounts"] == ["$1,200.00"]
+
+
+def test_hanging_ner_is_skipped(tmp_path, monkeypatch):
+    """Test a hanging NER stage leaves the regex entities and is marked skipped."""
+    monkeypatch.setattr(settings, "stage_budget_ner_seconds", 0.3)
+    processor = DocumentProcessor()
+    processor.nlp = types.SimpleNamespace(pipe=lambda texts, **kwargs: _hang())
+    path = tmp_path / "notes.txt"
+    path.write_text("Contact jane@example.com about the contract.", encoding="utf-8")
+    metadata = processor.process_document(str(path), "notes.txt")
+    assert metadata["skipped_stages"] == ["ner"]
+    assert metadata["entities"]["emails"] == ["jane@example.com"]
+    assert metadata["entities"]["companies"] == []
+
+
+def test_skipped_language_is_unknown(tmp_path, monkeypatch):
+    """Test a language stage over budget reports no language instead of a guess."""
+    monkeypatch.setattr(settings, "stage_budget_language_seconds", 0.2)
+    processor = DocumentProcessor()
+    processor.nlp = None
+    monkeypatch.setattr(processor.language_detector, "vote", lambda windows: _hang())
+    path = tmp_path / "notes.txt"
+    path.write_text(synthetic_text(2000), encoding="utf-8")
+    metadata = processor.process_document(str(path), "notes.txt")
+    assert metadata["language"] is None
+    assert metadata["skipped_stages"] == ["language"]
+
+
+def test_stage_timeout_stops_pdf_worker_processes(tmp_path, monkeypatch):
+    """Test page ranges still extracting in the pool are not waited for."""
+    monkeypatch.setattr(settings, "stage_budget_extraction_seconds", 0.5)
+    monkeypatch.setattr(document_processor, "extract_pdf_page_range", _hang_page_range)
+    path = synthetic_pdf(str(tmp_path / "big.pdf"), pages=4, chars_per_page=200)
+    processor = DocumentProcessor()
+    processor.nlp = None
+    processor.parallel_page_threshold = 2
+    processor.parallel_workers = 2
+    start = time.monotonic()
+    metadata = processor.process_document(path, "big.pdf")
+    assert time.monotonic() - start < 5
+    assert metadata["skipped_stages"] == ["extraction"]
+    assert metadata["page_count"] == 0
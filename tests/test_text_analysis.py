@@ -0,0 +1,206 @@
+"""
+Tests for page-streaming document analysis.
+"""
+import random
+import tracemalloc
+import types
+import pytest
+from app.services.text_analysis import TextStats, DocumentAnalysis
+from app.services.entity_extractor import EntityAccumulator, EntityExtractor, limit_entities
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.document_processor import DocumentProcessor
+from app.services.extractors import PageContinuation
+from benchmarks.corpus import synthetic_pdf, synthetic_text
+from benchmarks.reference import legacy_text_stats
+
+
+def _whole_text_stats(text):
+    """The metrics as process_document computed them on the full text."""
+    sentences = [s.strip() for s in text.split('.') if s.strip()]
+    preview = text[:200].strip() + ("..." if len(text) > 200 else "")
+    summary = '. '.join(sentences[:3]) + '.' if len(sentences) >= 3 else preview
+    return len(text.split()), len(sentences), preview, summary[:300], len(text)
+
+
+def test_text_stats_match_whole_text_in_any_chunking():
+    """Test counts, preview and summary do not depend on where the text is split."""
+    rng = random.Random(3)
+    pieces = ["a", "word", " ", ".", "\n", "  ", "x" * 120, " " * 250, ".."]
+    for _ in range(2000):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 50)))
+        stats = TextStats()
+        pos = 0
+        while pos < len(text):
+            size = rng.randint(1, 40)
+            stats.feed(text[pos:pos + size])
+            pos += size
+        result = (stats.word_count, stats.sentence_count, stats.preview, stats.summary, stats.length)
+        assert result == _whole_text_stats(text)
+
+
+@pytest.mark.parametrize("window", [1, 5, 64])
+def test_fused_stats_match_legacy_across_windows(window, monkeypatch):
+    """Test the windowed pass gives the original statistics wherever windows split the text."""
+    monkeypatch.setattr(TextStats, "WINDOW_CHARS", window)
+    rng = random.Random(window)
+    pieces = ["word", " ", ".", ". .", "\n", "x" * 30, "  ", ".."]
+    texts = [synthetic_text(5000, seed=window)]
+    texts += ["".join(rng.choice(pieces) for _ in range(rng.randint(0, 60))) for _ in range(500)]
+    for text in texts:
+        stats = TextStats()
+        stats.feed(text)
+        assert stats.metrics() == legacy_text_stats(text)
+
+
+def test_processor_text_metrics_match_streamed_stats():
+    """Test the text_metrics stage gives the same statistics for a whole text as fed page by page."""
+    text = "Invoice from Globex. Total due in thirty days. " * 50
+    stats = TextStats()
+    for start in range(0, len(text), 97):
+        stats.feed(text[start:start + 97])
+    assert DocumentProcessor().text_metrics(text) == stats.metrics()
+
+
+def test_entity_accumulator_matches_one_limit():
+    """Test merging matches page by page keeps the same limited result."""
+    extractor = EntityExtractor()
+    pages = [synthetic_text(4000, seed=seed) for seed in range(6)]
+    accumulator = EntityAccumulator()
+    for page in pages:
+        accumulator.add(extractor.scan(page))
+    combined = {category: [] for category in accumulator.values}
+    for page in pages:
+        for category, values in extractor.scan(page).items():
+            combined[category].extend(values)
+    assert accumulator.result() == limit_entities(combined)
+
+
+def test_analysis_counts_empty_pages():
+    """Test pages without text count as pages but add no separator."""
+    analysis = DocumentAnalysis(EntityExtractor(), KeywordMatcher({"financial": ["invoice"]}))
+    for page in ["", "Invoice one.", "", "two."]:
+        analysis.add_page(page)
+    assert analysis.page_count == 4
+    assert analysis.head == "Invoice one.\n\ntwo."
+    assert analysis.keywords.matched == {"financial"}
+
+
+def test_pdf_pages_are_streamed(tmp_path):
+    """Test PDF pages come out of a generator, one item per page."""
+    path = synthetic_pdf(str(tmp_path / "doc.pdf"), pages=3, chars_per_page=600)
+    pages = DocumentProcessor().iter_pdf_pages(path)
+    assert isinstance(pages, types.GeneratorType)
+    assert len(list(pages)) == 3
+
+
+def test_streamed_pdf_metadata_matches_full_text(tmp_path):
+    """Test streamed processing reports what the full extracted text gives."""
+    processor = DocumentProcessor()
+    processor.nlp = None
+    path = synthetic_pdf(str(tmp_path / "report.pdf"), pages=4, chars_per_page=1500)
+    text, page_count = processor.extract_text_from_pdf(path)
+    metadata = processor.process_document(path, "scan.pdf")
+    
+    word_count, sentence_count, preview, summary, length = _whole_text_stats(text)
+    assert metadata["page_count"] == page_count == 4
+    assert metadata["word_count"] == word_count
+    assert metadata["sentence_count"] == sentence_count
+    assert metadata["extracted_text_preview"] == preview
+    assert metadata["summary"] == summary
+    assert metadata["text_length"] == length
+    assert metadata["document_type"] == processor.detect_document_type(text, "scan.pdf")
+    assert metadata["content_categories"] == processor._categorize_content(text, metadata["entities"])
+
+
+def test_text_file_metadata_matches_full_text(tmp_path):
+    """Test single-page text files give the same entities as the whole-text path."""
+    processor = DocumentProcessor()
+    processor.nlp = None
+    text = synthetic_text(20_000, seed=11)
+    path = tmp_path / "notes.txt"
+    path.write_text(text, encoding="utf-8")
+    metadata = processor.process_document(str(path), "notes.txt")
+    assert metadata["entities"] == processor.extract_entities(text)
+    assert metadata["page_count"] == 1
+
+
+def test_long_text_file_is_read_in_chunks(tmp_path):
+    """Test a text file longer than a chunk gives the same metadata as reading it whole."""
+    processor = DocumentProcessor()
+    processor.nlp = None
+    # Windows line endings are still translated, even where a chunk ends between \r and \n
+    text = synthetic_text(60_000, seed=12).replace("\n", "\r\n")
+    path = tmp_path / "export.log"
+    path.write_bytes(text.encode("utf-8"))
+    whole = processor.process_document(str(path), "export.log")
+    
+    processor.text_chunk_chars = 997
+    pages = list(processor.iter_text_pages(str(path)))
+    assert len(pages) > 50
+    assert not isinstance(pages[0], PageContinuation)
+    assert all(isinstance(page, PageContinuation) for page in pages[1:])
+    assert "".join(pages) == text.replace("\r\n", "\n")
+    chunked = processor.process_document(str(path), "export.log")
+    for key in ("processing_time_seconds", "stage_timings"):
+        whole.pop(key, None)
+        chunked.pop(key, None)
+    assert chunked == whole
+    assert chunked["page_count"] == 1
+
+
+def test_keywords_found_across_chunk_boundary():
+    """Test a keyword split between a page and its continuation still matches."""
+    analysis = DocumentAnalysis(EntityExtractor(), KeywordMatcher({"financial": ["invoice"]}))
+    analysis.add_page("Please find the inv")
+    analysis.add_page(PageContinuation("oice attached."))
+    assert analysis.keywords.matched == {"financial"}
+    assert analysis.page_count == 1
+    assert analysis.head == "Please find the invoice attached."
+
+
+def test_long_text_file_memory_is_bounded(tmp_path):
+    """Test peak memory while analyzing a text file follows the chunk size, not the file size."""
+    processor = DocumentProcessor()
+    processor.nlp = None
+    processor.text_chunk_chars = 64 * 1024
+    path = tmp_path / "big.txt"
+    block = synthetic_text(250_000, seed=13)
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(8):
+            f.write(block)
+    tracemalloc.start()
+    try:
+        analysis = processor.analyze_document(str(path), "big.txt")
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert analysis.text_length == 8 * len(block)
+    # Reading the 2 MB file whole peaks at over 30 MB
+    assert peak < 4 * 1024 * 1024
+
+
+def test_parallel_pdf_pages_keep_page_order(tmp_path):
+    """Test large PDFs split across a process pool come back in page order."""
+    path = synthetic_pdf(str(tmp_path / "big.pdf"), pages=7, chars_per_page=400)
+    sequential = DocumentProcessor()
+    sequential.parallel_page_threshold = 0
+    parallel = DocumentProcessor()
+    parallel.parallel_page_threshold = 5
+    parallel.parallel_workers = 2
+    parallel.parallel_range_pages = 2
+    assert list(parallel.iter_pdf_pages(path)) == list(sequential.iter_pdf_pages(path))
+
+
+def test_small_pdf_stays_in_process(tmp_path, monkeypatch):
+    """Test PDFs below the page threshold never start a process pool."""
+    import app.services.document_processor as document_processor
+    
+    def no_pool(*args, **kwargs):
+        raise AssertionError("process pool used below the threshold")
+    
+    monkeypatch.setattr(document_processor, "Pool", no_pool)
+    path = synthetic_pdf(str(tmp_path / "small.pdf"), pages=2, chars_per_page=400)
+    processor = DocumentProcessor()
+    processor.parallel_page_threshold = 5
+    processor.parallel_workers = 4
+    assert len(list(processor.iter_pdf_pages(path))) == 2
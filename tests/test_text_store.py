@@ -0,0 +1,90 @@
+"""
+Tests for the per-page text store.
+"""
+import pytest
+from app.services import text_store
+from app.services.extractors import PageContinuation
+from app.services.text_store import TextStore, TextStoreError
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(text_store.settings, "storage_path", str(tmp_path))
+    return tmp_path
+
+
+def _store(pages, tenant_id=1, document_id=7):
+    with TextStore.writer(tenant_id, document_id) as writer:
+        for page in pages:
+            writer.add_page(page)
+
+
+def test_pages_roundtrip_and_ranges(storage):
+    """Test stored pages read back whole or as any page range, empty pages included."""
+    pages = [f"Page {number} — ünïcode text. " * 50 for number in range(10)]
+    pages[3] = ""
+    _store(pages)
+    
+    assert TextStore.page_count(1, 7) == 10
+    assert list(TextStore.iter_pages(1, 7)) == pages
+    assert list(TextStore.iter_pages(1, 7, start=2, stop=5)) == pages[2:5]
+    assert list(TextStore.iter_pages(1, 7, start=8, stop=50)) == pages[8:]
+    assert list(TextStore.iter_pages(1, 7, start=6, stop=6)) == []
+    assert TextStore.path_for(1, 7).stat().st_size < sum(len(page) for page in pages) / 5
+
+
+def test_long_pages_are_written_and_read_in_chunks(storage):
+    """Test continuation chunks extend their page, and long pages read back in chunks."""
+    chunks = [f"chunk {number} ünïcode " * 300 for number in range(5)]
+    with TextStore.writer(1, 7) as writer:
+        writer.add_page("first page")
+        writer.add_page(chunks[0])
+        for chunk in chunks[1:]:
+            writer.add_page(PageContinuation(chunk))
+        writer.add_page("")
+    
+    assert TextStore.page_count(1, 7) == 3
+    assert list(TextStore.iter_pages(1, 7)) == ["first page", "".join(chunks), ""]
+    pieces = list(TextStore.iter_pages(1, 7, chunk_size=1000))
+    assert pieces[0] == "first page"
+    assert not isinstance(pieces[1], PageContinuation) and pieces[-1] == ""
+    assert all(isinstance(piece, PageContinuation) for piece in pieces[2:-1])
+    # A character split between two chunks goes with the second
+    assert all(len(piece.encode("utf-8")) <= 1003 for piece in pieces)
+    assert "".join(pieces[1:-1]) == "".join(chunks)
+
+
+def test_aborted_write_keeps_previous_text(storage):
+    """Test a failed write leaves neither a partial file nor a temporary one behind."""
+    _store(["old"])
+    with pytest.raises(RuntimeError):
+        with TextStore.writer(1, 7) as writer:
+            writer.add_page("new")
+            raise RuntimeError("extraction failed")
+    
+    assert list(TextStore.iter_pages(1, 7)) == ["old"]
+    assert [path.name for path in TextStore.path_for(1, 7).parent.iterdir()] == ["7.pages"]
+
+
+def test_copy_shares_text_of_identical_document(storage):
+    """Test a copied document reads the same pages, and replacing the source leaves the copy alone."""
+    _store(["first", "second"])
+    assert TextStore.copy(1, 7, 9)
+    _store(["rewritten"])
+    
+    assert list(TextStore.iter_pages(1, 9)) == ["first", "second"]
+    assert not TextStore.copy(1, 404, 10)
+    assert not TextStore.exists(1, 10)
+
+
+def test_missing_or_damaged_text(storage):
+    """Test reading text that is missing or not a stored text file raises TextStoreError."""
+    assert not TextStore.exists(1, 8)
+    with pytest.raises(TextStoreError):
+        list(TextStore.iter_pages(1, 8))
+    
+    _store(["text"], document_id=8)
+    path = TextStore.path_for(1, 8)
+    path.write_bytes(path.read_bytes()[:-3])
+    with pytest.raises(TextStoreError):
+        TextStore.page_count(1, 8)
@@ -0,0 +1,608 @@
+"""
+Tests for the background worker.
+"""
+import time
+import types
+import fakeredis
+import pytest
+from contextlib import contextmanager
+from sqlalchemy import event
+from app import worker
+from app.services import document_processor
+from app.models.document import Document, DocumentStatus
+from app.models.tenant import Tenant
+from app.services.document_processor import DocumentProcessor, PROCESSOR_VERSION
+from app.services.metrics import JOB_SECONDS, STAGE_SECONDS, render_metrics
+from app.services.queue_backends import InMemoryBackend, RedisStreamsBackend
+from app.services.result_cache import ResultCache
+from app.services.text_store import TextStore
+
+
+def test_processor_reused_across_jobs(monkeypatch):
+    """Test the worker builds one processor per process and reuses it."""
+    monkeypatch.setattr(worker, "_processor", None)
+    first = worker.get_processor()
+    second = worker.get_processor()
+    assert first is second
+    assert first.model_load_seconds >= 0
+
+
+def test_job_timings_exclude_model_load():
+    """Test job timings report model loading separately."""
+    timings = worker._job_timings(job_start=0.0, model_load_seconds=0.5)
+    assert timings["model_load_seconds"] == 0.5
+    assert "job_seconds" in timings
+
+
+def test_start_worker_runs_pool_with_warm_processor(monkeypatch):
+    """Test the default start builds the processor once, then hands over to the worker pool."""
+    pools = []
+    
+    class _Pool:
+        def __init__(self, **kwargs):
+            self.kwargs = kwargs
+            pools.append(self)
+        
+        def run(self):
+            self.processor_loaded = worker._processor is not None
+    
+    monkeypatch.setattr(worker, "WorkerPool", _Pool)
+    monkeypatch.setattr(worker.settings, "worker_processes", 0)
+    monkeypatch.setattr(worker.settings, "worker_max_jobs", 50)
+    monkeypatch.setattr(worker, "_processor", None)
+    worker.start_worker()
+    
+    pool, = pools
+    assert pool.processor_loaded
+    assert pool.kwargs["processes"] == 0 and pool.kwargs["max_jobs"] == 50
+    assert pool.kwargs["target"] is worker.run_pool_worker
+
+
+
+def test_pool_workers_share_cpus_with_their_process_pools(monkeypatch):
+    """Test each pool worker's PDF and OCR pools get its share of the CPUs unless sized explicitly."""
+    monkeypatch.setattr(worker.os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(worker.settings, "pdf_parallel_workers", 0)
+    monkeypatch.setattr(worker.settings, "ocr_workers", 0)
+    processor = types.SimpleNamespace(parallel_workers=0, ocr_workers=0)
+    worker.share_cpus(processor, 0)
+    assert (processor.parallel_workers, processor.ocr_workers) == (1, 1)
+    worker.share_cpus(processor, 2)
+    assert (processor.parallel_workers, processor.ocr_workers) == (4, 4)
+    
+    monkeypatch.setattr(worker.settings, "ocr_workers", 3)
+    worker.share_cpus(processor, 4)
+    assert (processor.parallel_workers, processor.ocr_workers) == (2, 3)
+
+
+def test_pool_workers_are_split_between_lanes(monkeypatch):
+    """Test express-only workers leave at least one worker for the bulk lane."""
+    monkeypatch.setattr(worker.settings, "worker_express_processes", 2)
+    assert [worker.lane_queues(slot, 4) for slot in range(4)] == [
+        ["express"], ["express"], ["bulk", "express", "backfill"], ["bulk", "express", "backfill"]
+    ]
+    assert worker.lane_queues(0, 2) == ["express"]
+    assert worker.lane_queues(1, 2) == ["bulk", "express", "backfill"]
+    # A lone worker serves every lane, express first
+    assert worker.lane_queues(0, 1) == ["express", "bulk", "backfill"]
+
+
+class _Entity:
+    label_ = "ORG"
+    
+    def __init__(self, text):
+        self.text = text
+
+
+class _FakeNLP:
+    """Stands in for a spaCy pipeline and records how it was called."""
+    
+    def __init__(self):
+        self.pipe_calls = []
+    
+    def _doc(self, text):
+        return types.SimpleNamespace(ents=[_Entity(word) for word in text.split() if word.istitle()])
+    
+    def __call__(self, text, disable=()):
+        raise AssertionError("documents in a batch should not get their own NER call")
+    
+    def pipe(self, texts, batch_size=None, disable=()):
+        texts = list(texts)
+        self.pipe_calls.append((texts, batch_size, list(disable)))
+        return (self._doc(text) for text in texts)
+
+
+@pytest.fixture
+def batch_worker_env(db_session, test_tenant, test_user, monkeypatch, tmp_path):
+    @contextmanager
+    def test_db_context():
+        yield db_session
+    
+    monkeypatch.setattr(worker, "get_db_context", test_db_context)
+    monkeypatch.setattr(worker.settings, "storage_path", str(tmp_path / "storage"))
+    processor = DocumentProcessor()
+    processor.nlp = _FakeNLP()
+    monkeypatch.setattr(worker, "_processor", processor)
+    return processor
+
+
+def _add_document(db_session, tenant, user, path, name):
+    document = Document(
+        filename=name,
+        original_filename=name,
+        file_path=str(path),
+        file_size=1,
+        tenant_id=tenant.id,
+        uploaded_by_user_id=user.id
+    )
+    db_session.add(document)
+    db_session.commit()
+    return document
+
+
+def test_document_batch_runs_ner_once(batch_worker_env, db_session, test_tenant, test_user, tmp_path):
+    """Test a batch runs NER in one nlp.pipe call and reports each document separately."""
+    first = tmp_path / "a.txt"
+    first.write_text("Contract with Acme Widgets for cloud hosting.", encoding="utf-8")
+    second = tmp_path / "b.txt"
+    second.write_text("Invoice from Globex Industries, total $1,200.00.", encoding="utf-8")
+    documents = [
+        _add_document(db_session, test_tenant, test_user, first, "a.txt"),
+        _add_document(db_session, test_tenant, test_user, tmp_path / "missing.txt", "missing.txt"),
+        _add_document(db_session, test_tenant, test_user, second, "b.txt"),
+    ]
+    items = [(document.id, test_tenant.id) for document in documents] + [(9999, test_tenant.id)]
+    
+    outcomes = worker.process_document_batch(items)
+    
+    nlp = batch_worker_env.nlp
+    assert len(nlp.pipe_calls) == 1
+    texts, batch_size, disabled = nlp.pipe_calls[0]
+    assert len(texts) == 2 and batch_size == 2
+    assert "parser" in disabled and "lemmatizer" in disabled
+    
+    assert outcomes[0]["status"] == "completed"
+    assert outcomes[0]["metadata"]["entities"]["companies"] == ["Acme", "Contract", "Widgets"]
+    assert isinstance(outcomes[1], FileNotFoundError)
+    assert outcomes[2]["metadata"]["document_type"] == "invoice"
+    assert isinstance(outcomes[3], ValueError)
+    for document in documents:
+        db_session.refresh(document)
+    assert [document.status for document in documents] == [
+        DocumentStatus.COMPLETED, DocumentStatus.FAILED, DocumentStatus.COMPLETED
+    ]
+
+
+def test_batch_status_changes_are_written_in_bulk(batch_worker_env, db_session, test_tenant, test_user, tmp_path):
+    """Test a batch claims its documents with one UPDATE and writes every outcome in one more."""
+    documents = []
+    for number in range(4):
+        path = tmp_path / f"doc{number}.txt"
+        path.write_text(f"Invoice {number} from Globex Industries.", encoding="utf-8")
+        documents.append(_add_document(db_session, test_tenant, test_user, path, path.name))
+    documents.append(_add_document(db_session, test_tenant, test_user, tmp_path / "missing.txt", "missing.txt"))
+    other_tenant = Tenant(name="Other", slug="other", is_active=True)
+    db_session.add(other_tenant)
+    db_session.commit()
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0].upper())
+    
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        outcomes = worker.process_document_batch(
+            [(document.id, test_tenant.id) for document in documents] + [(documents[0].id, other_tenant.id)]
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    
+    # Claiming the batch, then completed and failed documents as one executemany each
+    assert statements.count("UPDATE") == 3
+    assert [outcome["status"] for outcome in outcomes[:4]] == ["completed"] * 4
+    assert isinstance(outcomes[4], FileNotFoundError)
+    # A document is never claimed under another tenant
+    assert isinstance(outcomes[5], ValueError)
+    for document in documents:
+        db_session.refresh(document)
+    assert [document.status for document in documents] == [DocumentStatus.COMPLETED] * 4 + [DocumentStatus.FAILED]
+    assert all(document.processed_at is not None for document in documents[:4])
+    assert documents[0].extracted_metadata["document_type"] == "invoice"
+    assert documents[0].processor_version == PROCESSOR_VERSION
+    assert documents[4].error_message.startswith("File not found")
+
+
+def test_unsupported_upload_fails_fast(batch_worker_env, db_session, test_tenant, test_user, tmp_path):
+    """Test a binary upload is marked failed with its format instead of being processed."""
+    path = tmp_path / "archive.txt"
+    path.write_bytes(b"PK\x03\x04" + bytes(range(256)) * 64)
+    document = _add_document(db_session, test_tenant, test_user, path, "archive.txt")
+    
+    outcomes = worker.process_document_batch([(document.id, test_tenant.id)])
+    
+    assert isinstance(outcomes[0], ValueError)
+    db_session.refresh(document)
+    assert document.status == DocumentStatus.FAILED
+    assert document.error_message == "Unsupported file format: zip archive"
+    assert batch_worker_env.nlp.pipe_calls == []
+
+
+def test_processed_documents_feed_stage_histograms(batch_worker_env, db_session, test_tenant, test_user, tmp_path):
+    """Test each processed document adds its stage timings to the worker histograms."""
+    STAGE_SECONDS.reset()
+    JOB_SECONDS.reset()
+    path = tmp_path / "notes.txt"
+    path.write_text("Meeting notes from Acme Widgets.", encoding="utf-8")
+    document = _add_document(db_session, test_tenant, test_user, path, "notes.txt")
+    
+    result = worker.process_document(document.id, test_tenant.id)
+    
+    for stage in result["metadata"]["stage_timings"]:
+        assert STAGE_SECONDS.count(stage=stage) == 1
+    assert STAGE_SECONDS.count(stage="iter_text_pages") == 1
+    assert JOB_SECONDS.count(cached="false") == 1
+
+
+def test_single_document_job_raises_on_failure(batch_worker_env, test_tenant):
+    """Test the one-document job still raises so RQ marks it failed."""
+    with pytest.raises(ValueError):
+        worker.process_document(9999, test_tenant.id)
+
+
+def test_identical_upload_reuses_metadata(batch_worker_env, db_session, test_tenant, test_user, tmp_path, monkeypatch):
+    """Test a second copy of a processed file reuses its metadata instead of being processed."""
+    ResultCache.reset_stats()
+    path = tmp_path / "contract.txt"
+    path.write_text("Agreement between Acme Widgets and Globex.", encoding="utf-8")
+    first = _add_document(db_session, test_tenant, test_user, path, "contract.txt")
+    second = _add_document(db_session, test_tenant, test_user, path, "copy.txt")
+    for document in (first, second):
+        document.content_hash = "a" * 64
+    db_session.commit()
+    
+    first_result = worker.process_document(first.id, test_tenant.id)
+    
+    def no_analysis(*args, **kwargs):
+        raise AssertionError("cached document was processed again")
+    
+    monkeypatch.setattr(batch_worker_env, "analyze_document", no_analysis)
+    second_result = worker.process_document(second.id, test_tenant.id)
+    
+    assert first_result["cached"] is False
+    assert second_result["cached"] is True
+    assert second_result["metadata"] == first_result["metadata"]
+    db_session.refresh(second)
+    assert second.status == DocumentStatus.COMPLETED
+    assert second.processor_version == PROCESSOR_VERSION
+    assert second.stage_results == first.stage_results
+    assert list(TextStore.iter_pages(test_tenant.id, second.id)) == [path.read_text(encoding="utf-8")]
+    assert ResultCache.stats() == {"hits": 1, "misses": 1, "hit_ratio": 0.5}
+    assert 'document_result_cache_lookups_total{result="hit"} 1' in render_metrics().splitlines()
+
+
+def test_partial_result_is_saved_but_not_reused(batch_worker_env, db_session, test_tenant, test_user, tmp_path, monkeypatch):
+    """Test a stage over budget still completes the document, without feeding the result cache."""
+    monkeypatch.setattr(worker.settings, "stage_budget_ner_seconds", 0.2)
+    
+    def hanging_pipe(texts, **kwargs):
+        while True:
+            time.sleep(0.01)
+    
+    monkeypatch.setattr(batch_worker_env.nlp, "pipe", hanging_pipe)
+    path = tmp_path / "contract.txt"
+    path.write_text("Agreement between Acme Widgets and Globex.", encoding="utf-8")
+    document = _add_document(db_session, test_tenant, test_user, path, "contract.txt")
+    document.content_hash = "b" * 64
+    db_session.commit()
+    
+    result = worker.process_document(document.id, test_tenant.id)
+    
+    assert result["metadata"]["skipped_stages"] == ["ner"]
+    db_session.refresh(document)
+    assert document.status == DocumentStatus.COMPLETED
+    assert document.processor_version == f"{PROCESSOR_VERSION}+partial"
+    copy = _add_document(db_session, test_tenant, test_user, path, "copy.txt")
+    copy.content_hash = "b" * 64
+    db_session.commit()
+    assert ResultCache.find_source(db_session, copy, PROCESSOR_VERSION) is None
+
+
+def test_pdf_document_info_is_shown_before_extraction(batch_worker_env, db_session, test_tenant, test_user, tmp_path, monkeypatch):
+    """Test a PDF's page count is stored as a partial result before its text is extracted."""
+    from benchmarks.corpus import synthetic_pdf
+    path = synthetic_pdf(str(tmp_path / "report.pdf"), pages=3, chars_per_page=300)
+    document = _add_document(db_session, test_tenant, test_user, path, "report.pdf")
+    seen_during_extraction = []
+    iter_pdf_pages = batch_worker_env.iter_pdf_pages
+    
+    def observed_extraction(file_path):
+        db_session.refresh(document)
+        seen_during_extraction.append((document.status, document.extracted_metadata))
+        yield from iter_pdf_pages(file_path)
+    
+    monkeypatch.setattr(batch_worker_env, "iter_pdf_pages", observed_extraction)
+    monkeypatch.setattr(document_processor.EXTRACTORS.get("pdf"), "extract", lambda processor, path: processor.iter_pdf_pages(path))
+    result = worker.process_document(document.id, test_tenant.id)
+    
+    status, preview = seen_during_extraction[0]
+    assert status == DocumentStatus.PROCESSING
+    assert preview["page_count"] == 3 and preview["processing_phase"] == "document_info"
+    assert "processing_phase" not in result["metadata"]
+    assert result["metadata"]["document_info"]["page_count"] == 3
+    assert result["metadata"]["page_count"] == 3
+
+
+def test_failed_document_drops_its_preview(batch_worker_env, db_session, test_tenant, test_user, tmp_path, monkeypatch):
+    """Test a document failing after its document info preview was stored keeps no partial metadata."""
+    from benchmarks.corpus import synthetic_pdf
+    path = synthetic_pdf(str(tmp_path / "report.pdf"), pages=2, chars_per_page=300)
+    document = _add_document(db_session, test_tenant, test_user, path, "report.pdf")
+    
+    def broken_analysis(*args, **kwargs):
+        raise ValueError("extraction failed")
+    
+    monkeypatch.setattr(batch_worker_env, "analyze_document", broken_analysis)
+    with pytest.raises(ValueError):
+        worker.process_document(document.id, test_tenant.id)
+    
+    db_session.refresh(document)
+    assert document.status == DocumentStatus.FAILED
+    assert document.error_message == "extraction failed"
+    assert document.extracted_metadata == {}
+
+
+def test_reprocess_reruns_only_stale_stages(batch_worker_env, db_session, test_tenant, test_user, tmp_path, monkeypatch):
+    """Test reprocessing reruns a stage whose version changed over the stored text, reusing the rest."""
+    path = tmp_path / "invoice.txt"
+    path.write_text("Invoice from Globex Industries, total $1,200.00. Contact billing@globex.com.", encoding="utf-8")
+    document = _add_document(db_session, test_tenant, test_user, path, "invoice.txt")
+    first = worker.process_document(document.id, test_tenant.id)
+    assert TextStore.exists(test_tenant.id, document.id)
+    assert worker.reprocess_document(document.id, test_tenant.id)["status"] == "unchanged"
+    
+    monkeypatch.setitem(document_processor.STAGE_VERSIONS, "extract_entities", "2")
+    path.unlink()  # the text must come from the store
+    batch_worker_env.nlp.pipe_calls.clear()
+    keyword_calls = []
+    monkeypatch.setattr(
+        document_processor.KEYWORD_MATCHER, "match", lambda text, pending=None: keyword_calls.append(text) or set()
+    )
+    
+    result = worker.reprocess_document(document.id, test_tenant.id)
+    
+    assert result["stages"] == ["extract_entities"]
+    assert result["metadata"]["entities"] == first["metadata"]["entities"]
+    assert result["metadata"]["document_type"] == first["metadata"]["document_type"] == "invoice"
+    assert keyword_calls == [] and batch_worker_env.nlp.pipe_calls == []
+    db_session.refresh(document)
+    assert document.stage_results["extract_entities"]["version"] == "2"
+    assert document.stage_results["match_keywords"]["version"] == "1"
+
+
+def test_reprocess_extracts_again_without_stored_text(batch_worker_env, db_session, test_tenant, test_user, tmp_path):
+    """Test documents processed before the text store existed are extracted and stored on reprocessing."""
+    path = tmp_path / "memo.txt"
+    path.write_text("Memo to Acme Widgets about the quarterly report.", encoding="utf-8")
+    document = _add_document(db_session, test_tenant, test_user, path, "memo.txt")
+    document.status = DocumentStatus.COMPLETED
+    db_session.commit()
+    
+    result = worker.reprocess_document(document.id, test_tenant.id)
+    
+    assert result["stages"] == list(document_processor.STAGE_VERSIONS)
+    assert list(TextStore.iter_pages(test_tenant.id, document.id)) == [path.read_text(encoding="utf-8")]
+    db_session.refresh(document)
+    assert DocumentProcessor.stale_stages(document.stage_results) == []
+
+
+def test_stream_worker_processes_and_acknowledges_jobs(batch_worker_env, db_session, test_tenant, test_user, tmp_path):
+    """Test a stream worker runs a batch of document jobs and acknowledges each."""
+    backend = InMemoryBackend(visibility_timeout=60)
+    documents = []
+    for name in ("a.txt", "b.txt"):
+        path = tmp_path / name
+        path.write_text("Contract with Acme Widgets.", encoding="utf-8")
+        documents.append(_add_document(db_session, test_tenant, test_user, path, name))
+        backend.enqueue("express", worker.DOCUMENT_JOB, (documents[-1].id, test_tenant.id),
+                        f"doc_{documents[-1].id}", test_tenant.id, 300)
+    
+    worker.StreamWorker(backend, ["express"], name="test", batch_size=4).work(burst=True)
+    
+    assert len(batch_worker_env.nlp.pipe_calls) == 1
+    assert backend.depth("express") == 0
+    for document in documents:
+        db_session.refresh(document)
+        assert document.status == DocumentStatus.COMPLETED
+        assert backend.job_status(f"doc_{document.id}")["status"] == "finished"
+
+
+def test_batch_time_limit_adds_up_job_limits(batch_worker_env, db_session, test_tenant, test_user, tmp_path, monkeypatch):
+    """Test a batch runs under the sum of its jobs' timeouts, not the limit of one job."""
+    limits = []
+    
+    class RecordingDeathPenalty(worker.UnixSignalDeathPenalty):
+        def __init__(self, timeout, *args, **kwargs):
+            limits.append(timeout)
+            super().__init__(timeout, *args, **kwargs)
+    
+    monkeypatch.setattr(worker, "UnixSignalDeathPenalty", RecordingDeathPenalty)
+    backend = InMemoryBackend()
+    for number, timeout in enumerate((300, 3600)):
+        path = tmp_path / f"doc{number}.txt"
+        path.write_text(f"Invoice {number} from Globex Industries.", encoding="utf-8")
+        document = _add_document(db_session, test_tenant, test_user, path, path.name)
+        backend.enqueue("bulk", worker.DOCUMENT_JOB, (document.id, test_tenant.id), f"doc_{number}", test_tenant.id, timeout)
+    
+    worker.StreamWorker(backend, ["bulk"], name="w", batch_size=2).work(burst=True)
+    
+    assert limits == [3900]
+    assert worker._batch_timeout([300, -1]) == -1
+
+
+def test_interrupted_batch_keeps_finished_documents(batch_worker_env, db_session, test_tenant, test_user, tmp_path, monkeypatch):
+    """Test a timeout during NER fails only the unfinished documents, and job and document status agree."""
+    from rq.timeouts import JobTimeoutException
+    cached_path = tmp_path / "contract.txt"
+    cached_path.write_text("Agreement between Acme Widgets and Globex.", encoding="utf-8")
+    source = _add_document(db_session, test_tenant, test_user, cached_path, "contract.txt")
+    copy = _add_document(db_session, test_tenant, test_user, cached_path, "copy.txt")
+    for document in (source, copy):
+        document.content_hash = "c" * 64
+    db_session.commit()
+    worker.process_document(source.id, test_tenant.id)
+    path = tmp_path / "b.txt"
+    path.write_text("Invoice from Globex Industries.", encoding="utf-8")
+    fresh = _add_document(db_session, test_tenant, test_user, path, "b.txt")
+    backend = InMemoryBackend()
+    for document in (copy, fresh):
+        backend.enqueue("express", worker.DOCUMENT_JOB, (document.id, test_tenant.id), f"doc_{document.id}", test_tenant.id, 300)
+    
+    def timed_out_ner(analyses):
+        raise JobTimeoutException("Task exceeded maximum timeout value (300 seconds)")
+    
+    monkeypatch.setattr(batch_worker_env, "run_ner", timed_out_ner)
+    worker.StreamWorker(backend, ["express"], name="w", batch_size=2).work(burst=True)
+    
+    db_session.refresh(copy)
+    db_session.refresh(fresh)
+    assert copy.status == DocumentStatus.COMPLETED
+    assert backend.job_status(f"doc_{copy.id}")["status"] == "finished"
+    assert fresh.status == DocumentStatus.FAILED
+    assert fresh.error_message.startswith("Task exceeded maximum timeout")
+    assert backend.job_status(f"doc_{fresh.id}")["status"] == "failed"
+
+
+def test_timeout_during_extraction_stops_the_batch(batch_worker_env, db_session, test_tenant, test_user, tmp_path, monkeypatch):
+    """Test a job timeout during one document's extraction fails the rest of the batch instead of running on."""
+    from rq.timeouts import JobTimeoutException
+    documents = []
+    for number in range(3):
+        path = tmp_path / f"doc{number}.txt"
+        path.write_text(f"Invoice {number} from Globex Industries.", encoding="utf-8")
+        documents.append(_add_document(db_session, test_tenant, test_user, path, path.name))
+    analyze_document = batch_worker_env.analyze_document
+    extracted = []
+    
+    def slow_second_document(file_path, filename, **kwargs):
+        extracted.append(filename)
+        if len(extracted) == 2:
+            raise JobTimeoutException("Task exceeded maximum timeout value (300 seconds)")
+        return analyze_document(file_path, filename, **kwargs)
+    
+    monkeypatch.setattr(batch_worker_env, "analyze_document", slow_second_document)
+    outcomes = worker.process_document_batch([(document.id, test_tenant.id) for document in documents])
+    
+    assert extracted == ["doc0.txt", "doc1.txt"]
+    assert all(isinstance(outcome, JobTimeoutException) for outcome in outcomes)
+    for document in documents:
+        db_session.refresh(document)
+        assert document.status == DocumentStatus.FAILED
+        assert document.error_message.startswith("Task exceeded maximum timeout")
+
+
+def test_job_of_dead_worker_is_processed_by_another(batch_worker_env, db_session, test_tenant, test_user, tmp_path):
+    """Test a job claimed by a worker that died is redelivered once its claim goes stale."""
+    now = [0.0]
+    backend = InMemoryBackend(visibility_timeout=60, clock=lambda: now[0])
+    path = tmp_path / "a.txt"
+    path.write_text("Contract with Acme Widgets.", encoding="utf-8")
+    document = _add_document(db_session, test_tenant, test_user, path, "a.txt")
+    backend.enqueue("express", worker.DOCUMENT_JOB, (document.id, test_tenant.id), "doc", test_tenant.id, 300)
+    backend.claim(["express"], "died-mid-job")
+    
+    worker.StreamWorker(backend, ["express"], name="survivor").work(burst=True)
+    assert backend.depth("express") == 1
+    now[0] = 61
+    worker.StreamWorker(backend, ["express"], name="survivor").work(burst=True)
+    
+    db_session.refresh(document)
+    assert document.status == DocumentStatus.COMPLETED
+    assert backend.depth("express") == 0
+
+
+def test_job_delivered_too_often_fails_document(batch_worker_env, db_session, test_tenant, test_user, tmp_path):
+    """Test a job that keeps taking its worker down fails its document instead of running again."""
+    now = [0.0]
+    backend = InMemoryBackend(visibility_timeout=60, clock=lambda: now[0])
+    document = _add_document(db_session, test_tenant, test_user, tmp_path / "a.txt", "a.txt")
+    backend.enqueue("express", worker.DOCUMENT_JOB, (document.id, test_tenant.id), "doc", test_tenant.id, 300)
+    for attempt in range(2):
+        backend.claim(["express"], f"died-{attempt}")
+        now[0] += 61
+    
+    worker.StreamWorker(backend, ["express"], name="survivor", max_deliveries=2).work(burst=True)
+    
+    db_session.refresh(document)
+    assert document.status == DocumentStatus.FAILED
+    assert "interrupted 2 times" in document.error_message
+    assert backend.job_status("doc")["status"] == "failed"
+
+
+def test_stream_job_delivered_too_often_fails_document(batch_worker_env, db_session, test_tenant, test_user, tmp_path):
+    """Test on Redis Streams, a job reclaimed from dead workers too often fails its document and is acknowledged."""
+    connection = fakeredis.FakeRedis()
+    queue_names = {"express": "document_express"}
+    document = _add_document(db_session, test_tenant, test_user, tmp_path / "a.txt", "a.txt")
+    RedisStreamsBackend(connection, queue_names, visibility_timeout=0.1).enqueue(
+        "express", worker.DOCUMENT_JOB, (document.id, test_tenant.id), "doc", test_tenant.id, 300
+    )
+    for attempt in range(2):
+        RedisStreamsBackend(connection, queue_names, visibility_timeout=0.1).claim(["express"], f"died-{attempt}")
+        time.sleep(0.15)
+    
+    backend = RedisStreamsBackend(connection, queue_names, visibility_timeout=0.1)
+    worker.StreamWorker(backend, ["express"], name="survivor", max_deliveries=2).work(burst=True)
+    
+    db_session.refresh(document)
+    assert document.status == DocumentStatus.FAILED
+    assert "interrupted 2 times" in document.error_message
+    assert backend.job_status("doc")["status"] == "failed"
+    assert backend.depth("express") == 0
+
+
+def test_stream_jobs_survive_a_worker_error(batch_worker_env, db_session, test_tenant, test_user, tmp_path, monkeypatch):
+    """Test a worker leaving on an error keeps its claimed job pending, so another worker processes it."""
+    connection = fakeredis.FakeRedis()
+    queue_names = {"express": "document_express"}
+    path = tmp_path / "a.txt"
+    path.write_text("Contract with Acme Widgets.", encoding="utf-8")
+    document = _add_document(db_session, test_tenant, test_user, path, "a.txt")
+    failing = RedisStreamsBackend(connection, queue_names, visibility_timeout=0.1)
+    failing.enqueue("express", worker.DOCUMENT_JOB, (document.id, test_tenant.id), "doc", test_tenant.id, 300)
+    
+    def broken_ack(message, error=None):
+        raise ConnectionError("XACK failed")
+    
+    monkeypatch.setattr(failing, "ack", broken_ack)
+    with pytest.raises(ConnectionError):
+        worker.StreamWorker(failing, ["express"], name="failing").work(burst=True)
+    assert failing.depth("express") == 1
+    
+    time.sleep(0.15)
+    backend = RedisStreamsBackend(connection, queue_names, visibility_timeout=0.1)
+    worker.StreamWorker(backend, ["express"], name="survivor").work(burst=True)
+    db_session.refresh(document)
+    assert document.status == DocumentStatus.COMPLETED
+    assert backend.depth("express") == 0
+
+
+def test_result_cache_respects_tenant_and_version(db_session, test_tenant, test_user):
+    """Test cached results are never shared across tenants or processor versions."""
+    other_tenant = Tenant(name="Other", slug="other", is_active=True)
+    db_session.add(other_tenant)
+    db_session.commit()
+    source = _add_document(db_session, test_tenant, test_user, "/tmp/a.txt", "a.txt")
+    source.content_hash = "b" * 64
+    source.status = DocumentStatus.COMPLETED
+    source.extracted_metadata = {"word_count": 3}
+    source.processor_version = PROCESSOR_VERSION
+    same_tenant = _add_document(db_session, test_tenant, test_user, "/tmp/b.txt", "b.txt")
+    other = _add_document(db_session, other_tenant, test_user, "/tmp/c.txt", "c.txt")
+    for document in (same_tenant, other):
+        document.content_hash = "b" * 64
+    db_session.commit()
+    
+    assert ResultCache.find_source(db_session, same_tenant, PROCESSOR_VERSION).id == source.id
+    assert ResultCache.find_source(db_session, other, PROCESSOR_VERSION) is None
+    assert ResultCache.find_source(db_session, same_tenant, "older") is None
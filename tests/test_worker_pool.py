@@ -0,0 +1,145 @@
+"""
+Tests for the pre-forked worker pool.
+"""
+import os
+import signal
+import threading
+import time
+import pytest
+from app import worker_pool
+from app.worker_pool import RecyclingMixin, WorkerPool, resident_memory_mb
+
+
+class _FakeWorker:
+    def __init__(self, queues):
+        self.queues = queues
+        self._stop_requested = False
+    
+    def handle_job_success(self, job):
+        pass
+    
+    def handle_job_failure(self, job):
+        pass
+    
+    def execute_job(self, jobs, outcomes):
+        for job, ok in zip(jobs, outcomes):
+            self.handle_job_success(job) if ok else self.handle_job_failure(job)
+
+
+class _RecyclingWorker(RecyclingMixin, _FakeWorker):
+    pass
+
+
+@pytest.fixture
+def fast_pool(monkeypatch):
+    monkeypatch.setattr(worker_pool, "POLL_SECONDS", 0.05)
+    monkeypatch.setattr(worker_pool, "RESTART_DELAY_SECONDS", 0.0)
+
+
+def _run_for(pool, seconds):
+    timer = threading.Timer(seconds, pool.stop)
+    timer.start()
+    try:
+        pool.run()
+    finally:
+        timer.cancel()
+
+
+def _lines(path):
+    return path.read_text().split() if path.exists() else []
+
+
+def test_worker_stops_after_max_jobs():
+    """Test a worker asks to stop once it has run max_jobs jobs, failed ones included."""
+    worker = _RecyclingWorker(["documents"], max_jobs=3)
+    worker.execute_job(["a", "b"], [True, False])
+    assert not worker._stop_requested
+    worker.execute_job(["c"], [True])
+    assert worker._stop_requested
+    assert worker.jobs_done == 3
+
+
+def test_worker_stops_past_memory_limit(monkeypatch):
+    """Test a worker asks to stop after a job leaves it above the memory limit."""
+    worker = _RecyclingWorker(["documents"], max_memory_mb=500)
+    monkeypatch.setattr(worker_pool, "resident_memory_mb", lambda: 400.0)
+    worker.execute_job(["a"], [True])
+    assert not worker._stop_requested
+    monkeypatch.setattr(worker_pool, "resident_memory_mb", lambda: 600.0)
+    worker.execute_job(["b"], [True])
+    assert worker._stop_requested
+
+
+def test_limits_of_zero_never_recycle():
+    """Test the default limits keep a worker running."""
+    worker = _RecyclingWorker(["documents"])
+    worker.execute_job(["job"] * 50, [True] * 50)
+    assert not worker._stop_requested
+
+
+def test_resident_memory_is_measured():
+    """Test the memory reading is plausible for a Python process."""
+    assert 5 < resident_memory_mb() < 100_000
+
+
+def _retiring_child(path):
+    def target(slot, max_jobs, max_memory_mb):
+        with open(path, "a") as f:
+            f.write(f"{slot}:{os.getpid()}\n")
+    return target
+
+
+def test_pool_replaces_retired_workers(fast_pool, tmp_path):
+    """Test every child that exits is replaced in its slot, by a new process."""
+    path = tmp_path / "started"
+    pool = WorkerPool(processes=2, target=_retiring_child(path), shutdown_timeout=5)
+    _run_for(pool, 1.0)
+    
+    started = _lines(path)
+    assert pool.restarts >= 2
+    assert len(started) >= 4
+    assert {line.split(":")[0] for line in started} == {"0", "1"}
+    assert len(set(started)) == len(started)
+
+
+def _serving_child(path):
+    def target(slot, max_jobs, max_memory_mb):
+        def on_term(signum, frame):
+            with open(path, "a") as f:
+                f.write(f"stopped-{slot}\n")
+            os._exit(0)
+        
+        signal.signal(signal.SIGTERM, on_term)
+        while True:
+            time.sleep(0.01)
+    return target
+
+
+def test_pool_stops_workers_with_sigterm(fast_pool, tmp_path):
+    """Test stopping the pool sends each long-lived child SIGTERM and waits for it."""
+    path = tmp_path / "stopped"
+    pool = WorkerPool(processes=3, target=_serving_child(path), shutdown_timeout=5)
+    _run_for(pool, 0.5)
+    
+    assert sorted(_lines(path)) == ["stopped-0", "stopped-1", "stopped-2"]
+    assert pool.restarts == 0
+
+
+def test_pool_kills_workers_that_ignore_shutdown(fast_pool, tmp_path):
+    """Test children still running at the shutdown timeout are killed."""
+    def stubborn(slot, max_jobs, max_memory_mb):
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        while True:
+            time.sleep(0.01)
+    
+    pool = WorkerPool(processes=1, target=stubborn, shutdown_timeout=0.2)
+    start = time.monotonic()
+    _run_for(pool, 0.3)
+    assert time.monotonic() - start < 5
+
+
+def test_pool_defaults_to_one_process_per_cpu(monkeypatch):
+    """Test density follows the core count unless configured."""
+    monkeypatch.setattr(worker_pool.os, "cpu_count", lambda: 6)
+    assert WorkerPool(target=lambda *args: None).processes == 6
+    assert WorkerPool(processes=2, target=lambda *args: None).processes == 2